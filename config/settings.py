@@ -257,6 +257,50 @@ CACHES = {
     }
 }
 
+# multiple-choice question bank size per quiz, as a multiple of question_count
+QUIZ_QUESTION_BANK_FACTOR = 5
+
+# store a seed per multiple-choice question and render it on demand instead of saving it
+QUIZ_LAZY_MC_QUESTIONS = False
+
+# verse ranges kept in memory per process for the question generators
+VERSE_WINDOW_CACHE_SIZE = 32
+
+# seconds per generated question assumed for templates that have not been timed yet
+QUESTION_GENERATION_SECONDS = 0.01
+# seconds each process sums its generator timings before folding them into the shared averages
+QUESTION_GENERATION_COST_FLUSH_SECONDS = 60
+
+# reject multiple-choice quizzes whose verse range cannot fill question_count
+QUIZ_CAPACITY_CHECK = True
+
+# workers generating the subtypes of a multiple-choice quiz concurrently; 0 or 1 generates them in turn
+QUIZ_GENERATION_WORKERS = 0
+# subtypes with CPU-bound similarity scans, generated in worker processes instead of threads
+QUIZ_GENERATION_PROCESS_SUBTYPES = (16, 17)
+
+# generate the questions of a new participation in a celery task; clients wait on the ready endpoint
+QUIZ_ASYNC_PROVISIONING = False
+# participations of one quiz provisioned at the same time
+QUIZ_PROVISIONING_CONCURRENCY = 4
+# seconds a participation waits for a provisioning slot before it is marked failed
+QUIZ_PROVISIONING_DEADLINE = 60 * 30
+# longest wait in seconds the ready endpoint allows
+QUIZ_READY_MAX_WAIT = 20
+
+# minutes before a quiz starts that participations are prepared in advance; 0 disables the pool
+QUIZ_POOL_LEAD_MINUTES = 10
+# pool size bounds; in between it follows the joins of recent quizzes of the same category
+QUIZ_POOL_MIN_SIZE = 5
+QUIZ_POOL_MAX_SIZE = 200
+# recent quizzes, and minutes after their start, counted as joins when sizing the pool
+QUIZ_POOL_HISTORY = 10
+QUIZ_POOL_JOIN_WINDOW_MINUTES = 15
+
+# answer keys kept in memory per process in front of the shared cache, and their lifetime in seconds
+ANSWER_KEY_CACHE_SIZE = 2048
+ANSWER_KEY_LOCAL_TTL = 30
+
 CELERY_BEAT_SCHEDULE = {
     'activate_quizzes': {
         'task': 'exam.tasks.activate_due_quizzes',
@@ -266,6 +310,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'exam.tasks.deactivate_due_quizzes',
         'schedule': 60.0,
     },
+    'prepare_participation_pools': {
+        'task': 'exam.tasks.prepare_participation_pools',
+        'schedule': 60.0,
+    },
     'close_current_week_competition' : {
         'task': 'competition.tasks.closing_the_current_week_and_its_divisions',
         'schedule': crontab(hour='23', minute='59', day_of_week='Fri'),
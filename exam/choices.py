@@ -45,3 +45,17 @@ class ProvinceChoices(models.TextChoices):
 class ParticipationStatus(models.TextChoices):
     INCOMPLETE = 'incomplete', 'ناتمام'
     COMPLETED = 'completed', 'کامل شده'
+
+
+class ProvisioningStatus(models.TextChoices):
+    READY = 'ready', 'آماده'
+    PROVISIONING = 'provisioning', 'در حال آماده‌سازی'
+    FAILED = 'failed', 'ناموفق'
+
+
+class DistractorKind(models.TextChoices):
+    FIRST_WORD = 'first_word', 'کلمه اول'
+    LAST_WORD = 'last_word', 'کلمه آخر'
+    TRANSLATION = 'translation', 'ترجمه'
+    VERSE_TEXT = 'verse_text', 'متن آیه'
+    VERSE_REFERENCE = 'verse_reference', 'نشانی آیه'
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exam.choices import QuizCategory
+from exam.services.generation_benchmark import SIZES, benchmark_generation, results_as_dicts, compare_results
+
+
+class Command(BaseCommand):
+    help = 'Time the question generators per template on small, medium and juz-sized verse ranges'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', choices=['existing', 'synthetic'], default='existing',
+                            help='Benchmark the verses in the database or a generated corpus.')
+        parser.add_argument('--fixture', action='append', dest='fixtures', default=[],
+                            help='Fixture loaded before the run (can be repeated).')
+        parser.add_argument('--size', action='append', dest='sizes', choices=list(SIZES),
+                            help='Only benchmark the given range size (can be repeated).')
+        parser.add_argument('--category', action='append', dest='categories', choices=QuizCategory.values,
+                            help='Only benchmark the given quiz category (can be repeated).')
+        parser.add_argument('--start-verse', type=int, help='First verse id of the ranges (existing corpus).')
+        parser.add_argument('--questions', type=int, default=20, help='Questions requested per template.')
+        parser.add_argument('--repeat', type=int, default=1, help='Runs per case; the median time is reported.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the in-process verse, distractor and id caches between runs.')
+        parser.add_argument('--build-index', action='store_true', default=None,
+                            help='Rebuild the distractor index first (always done for the synthetic corpus).')
+        parser.add_argument('--json', dest='json_path', help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', help='JSON file of an earlier run to compare against.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)['results']
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+
+        sizes = {name: SIZES[name] for name in options['sizes']} if options['sizes'] else SIZES
+        results = benchmark_generation(
+            corpus=options['corpus'],
+            fixtures=options['fixtures'],
+            sizes=sizes,
+            categories=options['categories'],
+            question_count=options['questions'],
+            repeat=options['repeat'],
+            warm=options['warm'],
+            start_verse_id=options['start_verse'],
+            build_index=options['build_index'],
+        )
+        changes = compare_results(results, baseline) if baseline is not None else {}
+
+        header = f'{"case":<24}{"size":<8}{"verses":>7}{"ms":>10}{"queries":>9}{"rows":>7}{"peak KiB":>10}'
+        if baseline is not None:
+            header += f'{"Δ time":>9}{"Δ queries":>11}'
+        self.stdout.write(header)
+        for result in results:
+            if result.error:
+                self.stdout.write(f'{result.case:<24}{result.size:<8}{result.verses:>7}  '
+                                  + self.style.ERROR(result.error))
+                continue
+            line = (f'{result.case:<24}{result.size:<8}{result.verses:>7}{result.seconds * 1000:>10.1f}'
+                    f'{result.queries:>9}{result.rows:>7}{result.peak_kib:>10.0f}')
+            change = changes.get((result.case, result.size))
+            if change:
+                seconds = f'{change["seconds"]:+.0%}' if change['seconds'] is not None else '-'
+                line += f'{seconds:>9}{change["queries"]:>+11}'
+            self.stdout.write(line)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump({'options': {key: options[key] for key in ('corpus', 'questions', 'repeat', 'warm')},
+                           'results': results_as_dicts(results)}, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["json_path"]}.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from exam.choices import DistractorKind
+from exam.services.distractor_index import build_distractor_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed distractor candidates used by the multiple-choice generators'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', dest='kinds', choices=DistractorKind.values,
+                            help='Only rebuild the given distractor kind (can be repeated).')
+        parser.add_argument('--window', type=int, default=20,
+                            help='How many verses before and after each verse are considered.')
+        parser.add_argument('--size', type=int, default=12, help='Candidates kept per verse and kind.')
+
+    def handle(self, *args, **options):
+        written = build_distractor_index(kinds=options['kinds'], window=options['window'], size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f'{written} distractor index rows written.'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:08
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBankItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=500)),
+                ('options', models.JSONField()),
+                ('correct_option', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(4)])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_bank', to='exam.quiz')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bank_items', to='exam.questiontemplate')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='bank_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='questions', to='exam.questionbankitem'),
+        ),
+    ]
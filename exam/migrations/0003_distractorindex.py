@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0002_question_bank'),
+        ('quran', '0006_translatorcoverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistractorIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('first_word', 'کلمه اول'), ('last_word', 'کلمه آخر'), ('translation', 'ترجمه'), ('verse_text', 'متن آیه'), ('verse_reference', 'نشانی آیه')], max_length=20)),
+                ('candidates', models.JSONField(default=list)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('verse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distractors', to='quran.verse')),
+            ],
+            options={
+                'unique_together': {('verse', 'kind')},
+            },
+        ),
+    ]
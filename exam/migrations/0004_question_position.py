@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0003_distractorindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='position',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='multiplechoicequestion',
+            index=models.Index(fields=['participation', 'position'], name='exam_multip_partici_08b6bb_idx'),
+        ),
+    ]
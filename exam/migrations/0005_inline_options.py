@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:15
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0004_question_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multiplechoiceanswer',
+            name='selected_number',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(4)]),
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='correct_option',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(4)]),
+        ),
+        migrations.AddField(
+            model_name='multiplechoicequestion',
+            name='option_texts',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
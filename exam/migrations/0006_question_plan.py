@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0005_inline_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multiplechoiceparticipation',
+            name='question_plan',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
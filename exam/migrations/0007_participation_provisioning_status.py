@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0006_question_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baseparticipation',
+            name='provisioning_status',
+            field=models.CharField(choices=[('ready', 'آماده'), ('provisioning', 'در حال آماده\u200cسازی'), ('failed', 'ناموفق')], default='ready', max_length=20),
+        ),
+    ]
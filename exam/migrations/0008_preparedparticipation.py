@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0007_participation_provisioning_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreparedParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('questions', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prepared_participations', to='exam.quiz')),
+            ],
+        ),
+    ]
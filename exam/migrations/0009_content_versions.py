@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0008_preparedparticipation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='baseparticipation',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='matchingchunk',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orderingchunk',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='typingquestion',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.3 on 2026-10-19 19:03
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def _duplicate_keys(model, fields):
+    # rows without the leading field belong to the other key of the table
+    return (model.objects.filter(**{f'{fields[0]}__isnull': False})
+            .values(*fields).annotate(rows=Count('id')).filter(rows__gt=1)
+            .values_list(*fields))
+
+
+def number_question_positions(apps, schema_editor):
+    # questions created before positions existed all sit at position 0
+    MultipleChoiceQuestion = apps.get_model('exam', 'MultipleChoiceQuestion')
+    participation_ids = {participation_id for participation_id, _ in
+                         _duplicate_keys(MultipleChoiceQuestion, ['participation', 'position'])}
+    for participation_id in participation_ids:
+        questions = list(MultipleChoiceQuestion.objects.filter(participation_id=participation_id)
+                         .order_by('position', 'id'))
+        for position, question in enumerate(questions, start=1):
+            question.position = position
+        MultipleChoiceQuestion.objects.bulk_update(questions, ['position'])
+
+
+# rows pointing at a chunk or typing question: (model, foreign key, fields unique together with it)
+DEPENDENTS = {
+    'MatchingChunk': [('MatchingParticipationChunkProgress', 'chunk', ['participation'])],
+    'TypingQuestion': [('TypingSubmittedAnswer', 'question', [])],
+}
+
+
+def merge_duplicate_steps(apps, schema_editor):
+    """
+    Concurrent regenerations could leave two rows for a step. The newest one is
+    kept and the progress and answers recorded against the others move to it;
+    when a participation has progress on both, nothing is changed and the
+    conflicting keys are reported instead.
+    """
+    merges = []
+    for model_name, fields in (('OrderingChunk', ['quiz', 'version', 'step_index']),
+                               ('MatchingChunk', ['quiz', 'version', 'step_index']),
+                               ('TypingQuestion', ['quiz', 'version', 'template', 'step_index']),
+                               ('TypingQuestion', ['participation', 'step_index'])):
+        model = apps.get_model('exam', model_name)
+        for key in _duplicate_keys(model, fields):
+            ids = list(model.objects.filter(**dict(zip(fields, key))).order_by('-id').values_list('id', flat=True))
+            merges.append((model_name, dict(zip(fields, key)), ids[0], ids[1:]))
+
+    conflicts = []
+    for model_name, key, keep_id, drop_ids in merges:
+        for dependent_name, fk, unique_with in DEPENDENTS.get(model_name, []):
+            if not unique_with:
+                continue
+            dependent = apps.get_model('exam', dependent_name)
+            rows = dependent.objects.filter(**{f'{fk}_id__in': [keep_id, *drop_ids]})
+            clashing = (rows.values(*unique_with).annotate(rows=Count('id')).filter(rows__gt=1)
+                        .values_list(*unique_with))
+            conflicts += [f'{model_name} {key}: {dependent_name} {dict(zip(unique_with, values))}'
+                          for values in clashing]
+    if conflicts:
+        raise RuntimeError('Duplicate steps hold progress of the same participation; merge them by hand '
+                           'before migrating:\n' + '\n'.join(conflicts))
+
+    for model_name, key, keep_id, drop_ids in merges:
+        for dependent_name, fk, _ in DEPENDENTS.get(model_name, []):
+            (apps.get_model('exam', dependent_name).objects
+             .filter(**{f'{fk}_id__in': drop_ids}).update(**{f'{fk}_id': keep_id}))
+        apps.get_model('exam', model_name).objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0010_content_version_not_editable'),
+    ]
+
+    operations = [
+        migrations.RunPython(number_question_positions, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_steps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='matchingchunk',
+            constraint=models.UniqueConstraint(fields=('quiz', 'version', 'step_index'), name='exam_matchingchunk_step_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='multiplechoicequestion',
+            constraint=models.UniqueConstraint(fields=('participation', 'position'), name='exam_mcq_participation_position_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderingchunk',
+            constraint=models.UniqueConstraint(fields=('quiz', 'version', 'step_index'), name='exam_orderingchunk_step_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='typingquestion',
+            constraint=models.UniqueConstraint(fields=('quiz', 'version', 'template', 'step_index'), name='exam_typingquestion_quiz_step_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='typingquestion',
+            constraint=models.UniqueConstraint(fields=('participation', 'step_index'), name='exam_typingquestion_participation_step_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='multiplechoicequestion',
+            name='exam_multip_partici_08b6bb_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-19 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0011_natural_key_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preparedparticipation',
+            name='pool_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='pool_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,9 +1,11 @@
+from collections import namedtuple
+
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, connection
 
 from quran.models import Verse
-from .choices import QuizCategory, ProvinceChoices, ParticipationStatus
+from .choices import QuizCategory, ProvinceChoices, ParticipationStatus, DistractorKind, ProvisioningStatus
 
 
 class QuizSubtype(models.Model):
@@ -57,6 +59,11 @@ class Quiz(models.Model):
     top_three_bonus = models.PositiveIntegerField(null=True, blank=True)
     top_ten_bonus = models.PositiveIntegerField(null=True, blank=True)
     chunk_size = models.PositiveIntegerField(default=7)
+    # the chunk set participations start on; earlier sets stay while participations still use them.
+    # Only the regeneration task moves it, with a queryset update.
+    content_version = models.PositiveIntegerField(default=0, editable=False)
+    # moved whenever the participation pool is discarded; prepared participations of older versions are not claimed
+    pool_version = models.PositiveIntegerField(default=0, editable=False)
 
 
 class BaseParticipation(models.Model):
@@ -71,18 +78,84 @@ class BaseParticipation(models.Model):
     deadline = models.DateTimeField(null=True, blank=True)
     status = models.CharField(choices=ParticipationStatus.choices, default=ParticipationStatus.INCOMPLETE,
                               max_length=20)
+    provisioning_status = models.CharField(choices=ProvisioningStatus.choices, default=ProvisioningStatus.READY,
+                                           max_length=20)
+    content_version = models.PositiveIntegerField(default=0, editable=False)
 
 
 class MultipleChoiceParticipation(models.Model):
     participation = models.OneToOneField(BaseParticipation, on_delete=models.CASCADE,
                                          related_name='multiple_choice_participation')
     not_answered = models.PositiveSmallIntegerField(default=0)
+    # corpus generation and [template_id, verse_ids, seed] per question when questions are rendered on demand
+    question_plan = models.JSONField(null=True, blank=True)
+
+    @property
+    def is_planned(self):
+        return self.question_plan is not None
+
+
+class QuestionBankItem(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='question_bank')
+    template = models.ForeignKey(QuestionTemplate, on_delete=models.CASCADE, related_name='bank_items')
+    title = models.CharField(max_length=500)
+    options = models.JSONField()
+    correct_option = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class PreparedParticipation(models.Model):
+    """
+    Questions generated ahead of a quiz start for one future participant,
+    claimed by the first participation that needs them.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='prepared_participations')
+    # multiple-choice: [template_id, title, option_texts, correct_option] per question;
+    # typing: [template_id, title, answer] per question, in step order
+    questions = models.JSONField()
+    # the quiz's pool_version when the questions were generated
+    pool_version = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+# read-only option of a question whose options are stored inline; ``id`` is the option number
+InlineOption = namedtuple('InlineOption', ['id', 'number', 'text', 'is_correct'])
 
 
 class MultipleChoiceQuestion(models.Model):
     title = models.CharField(max_length=500)
     template = models.ForeignKey(QuestionTemplate, on_delete=models.CASCADE, related_name='questions')
     participation = models.ForeignKey(MultipleChoiceParticipation, on_delete=models.CASCADE, related_name='questions')
+    bank_item = models.ForeignKey(QuestionBankItem, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='questions')
+    position = models.PositiveSmallIntegerField(default=0)
+    # option texts in display order; empty for questions created with ``Option`` rows
+    option_texts = models.JSONField(default=list, blank=True)
+    correct_option = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                      validators=[MinValueValidator(1), MaxValueValidator(4)])
+
+    class Meta:
+        # the natural key ``bulk_insert_graph`` reads inserted questions back by
+        constraints = [
+            models.UniqueConstraint(fields=['participation', 'position'], name='exam_mcq_participation_position_uniq'),
+        ]
+
+    @property
+    def has_inline_options(self):
+        return bool(self.option_texts)
+
+    def set_options(self, texts, correct_option):
+        self.option_texts = list(texts)
+        self.correct_option = correct_option
+
+    def get_options(self):
+        """The options of the question, inline ones or the legacy ``Option`` rows."""
+        if self.has_inline_options:
+            return [
+                InlineOption(id=number, number=number, text=text, is_correct=number == self.correct_option)
+                for number, text in enumerate(self.option_texts, start=1)
+            ]
+        return list(self.options.all())
 
 
 class Option(models.Model):
@@ -96,6 +169,8 @@ class MultipleChoiceAnswer(models.Model):
     participation = models.ForeignKey(MultipleChoiceParticipation, on_delete=models.CASCADE, related_name='answers')
     question = models.ForeignKey(MultipleChoiceQuestion, on_delete=models.CASCADE)
     selected_option = models.ForeignKey(Option, on_delete=models.SET_NULL, null=True, blank=True)
+    selected_number = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                       validators=[MinValueValidator(1), MaxValueValidator(4)])
     submitted_at = models.DateTimeField(auto_now_add=True)
     is_correct = models.BooleanField(null=True, blank=True)
 
@@ -137,6 +212,12 @@ class OrderingChunk(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='chunks')
     correct_order = models.JSONField(models.CharField(max_length=200))
     step_index = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'version', 'step_index'], name='exam_orderingchunk_step_uniq'),
+        ]
 
 
 class MatchingParticipation(models.Model):
@@ -150,10 +231,16 @@ class MatchingParticipation(models.Model):
 class MatchingChunk(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='matching_chunks')
     step_index = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
     left_items = models.JSONField()
     right_items = models.JSONField()
     correct_matches = models.JSONField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'version', 'step_index'], name='exam_matchingchunk_step_uniq'),
+        ]
+
 
 class MatchingParticipationChunkProgress(models.Model):
     participation = models.ForeignKey(MatchingParticipation, on_delete=models.CASCADE, related_name='chunk_progress')
@@ -180,9 +267,20 @@ class TypingQuestion(models.Model):
     title = models.TextField()
     answer = models.JSONField()
     step_index = models.PositiveIntegerField(default=0)
+    # content version of quiz-level questions
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # quiz-level questions have no participation and the other way round; NULLs never collide
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'version', 'template', 'step_index'],
+                                    name='exam_typingquestion_quiz_step_uniq'),
+            models.UniqueConstraint(fields=['participation', 'step_index'],
+                                    name='exam_typingquestion_participation_step_uniq'),
+        ]
+
 
 class TypingSubmittedAnswer(models.Model):
     question = models.ForeignKey(TypingQuestion, on_delete=models.CASCADE, null=True, blank=True,
@@ -190,3 +288,14 @@ class TypingSubmittedAnswer(models.Model):
     text = models.TextField()
     is_correct = models.BooleanField(default=False)
     submitted_at = models.DateTimeField(auto_now_add=True)
+
+
+class DistractorIndex(models.Model):
+    verse = models.ForeignKey(Verse, on_delete=models.CASCADE, related_name='distractors')
+    kind = models.CharField(max_length=20, choices=DistractorKind.choices)
+    # ranked best first: [arabic, clean] pairs for word kinds, verse ids otherwise
+    candidates = models.JSONField(default=list)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('verse', 'kind')
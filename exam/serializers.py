@@ -1,14 +1,18 @@
 import random
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
 from exam.choices import QuizCategory
-from exam.models import Quiz, QuizSubtype, BaseParticipation, MultipleChoiceQuestion, Option, MultipleChoiceAnswer, \
+from exam.models import Quiz, QuizSubtype, BaseParticipation, MultipleChoiceQuestion, \
     QuizLeaderboard, MultipleChoiceParticipation, OrderingChunk, OrderingParticipation, MatchingParticipation, \
     MatchingChunk, TypingQuestion, TypingParticipation
+from exam.services.capacity import estimate_capacity
+from exam.services.mc_review import review_questions
+from exam.services.quiz_content import content_ready
 from quran.models import Verse
 
 User = get_user_model()
@@ -54,7 +58,7 @@ class UpdateCreateQuizSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Quiz
-        exclude = ['is_active', 'creator', 'auto_generate', 'is_public']
+        exclude = ['is_active', 'creator', 'auto_generate', 'is_public', 'pool_version']
 
     def validate(self, data):
         start_verse = data['start_verse']
@@ -105,6 +109,14 @@ class UpdateCreateQuizSerializer(serializers.ModelSerializer):
             if category == 'typing' and subtypes and subtypes[0] == 13:
                 max_questions = end_verse.id - start_verse.id + 1
                 data['question_count'] = min(question_count, max_questions)
+            if category == 'multiple_choice' and getattr(settings, 'QUIZ_CAPACITY_CHECK', True):
+                report = estimate_capacity(start_verse.id, end_verse.id, subtypes, question_count)
+                if not report['feasible']:
+                    capacity = sum(subtype['capacity'] for subtype in report['subtypes'])
+                    raise serializers.ValidationError({
+                        'question_count': f'The verse range can produce about {capacity} distinct questions '
+                                          f'for the selected subtypes; choose a wider range or fewer questions.'
+                    })
         else:
             if len(subtypes) > 1:
                 raise serializers.ValidationError({
@@ -139,6 +151,29 @@ class UpdateCreateQuizSerializer(serializers.ModelSerializer):
 
         return quiz
 
+    def update(self, instance, validated_data):
+        # the regeneration task and pool discards move these with queryset updates; a full save writes them back
+        instance.refresh_from_db(fields=['content_version', 'pool_version'])
+        return super().update(instance, validated_data)
+
+
+class QuizCapacitySerializer(serializers.Serializer):
+    start_verse = VerseInputSerializer(required=True)
+    end_verse = VerseInputSerializer(required=True)
+    subtypes = serializers.PrimaryKeyRelatedField(
+        queryset=QuizSubtype.objects.filter(category=QuizCategory.MULTIPLE_CHOICE),
+        many=True,
+        allow_empty=False,
+    )
+    question_count = serializers.IntegerField(min_value=1, max_value=100)
+
+    def validate(self, data):
+        if data['start_verse'].id > data['end_verse'].id:
+            raise serializers.ValidationError({
+                'verse_range': 'Start verse must be smaller than end verse'
+            })
+        return data
+
 
 # base participation serializers
 class BaseParticipationSerializer(serializers.ModelSerializer):
@@ -148,10 +183,10 @@ class BaseParticipationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BaseParticipation
-        fields = ['id', 'user', 'correct_answers', 'wrong_answers', 'total_score', 'status', 'quiz', 'questions_link',
-                  'sub_participation']
-        read_only_fields = ['correct_answers', 'wrong_answers', 'submitted_at', 'total_score', 'status', 'quiz',
-                            'sub_participation']
+        fields = ['id', 'user', 'correct_answers', 'wrong_answers', 'total_score', 'status', 'provisioning_status',
+                  'quiz', 'questions_link', 'sub_participation']
+        read_only_fields = ['correct_answers', 'wrong_answers', 'submitted_at', 'total_score', 'status',
+                            'provisioning_status', 'quiz', 'sub_participation']
 
     def get_questions_link(self, obj: BaseParticipation):
         category = obj.quiz.category
@@ -217,6 +252,8 @@ class CreateParticipationSerializer(serializers.ModelSerializer):
     def validate_quiz(self, quiz):
         if not quiz.is_active:
             raise serializers.ValidationError("This quiz is not active.")
+        if not content_ready(quiz):
+            raise serializers.ValidationError("This quiz is still being prepared, please try again shortly.")
         return quiz
 
     def validate(self, data):
@@ -234,72 +271,32 @@ class CreateParticipationSerializer(serializers.ModelSerializer):
 
 
 # multiple choice serializers
-class OptionSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Option
-        fields = ['id', 'number', 'text']
+class OptionSerializer(serializers.Serializer):
+    # serializes both ``Option`` rows and the inline options of a question
+    id = serializers.IntegerField(read_only=True)
+    number = serializers.IntegerField(read_only=True)
+    text = serializers.CharField(read_only=True)
 
 
 class MultipleChoiceQuestionSerializer(serializers.ModelSerializer):
-    options = OptionSerializer(read_only=True, many=True)
+    options = OptionSerializer(source='get_options', read_only=True, many=True)
 
     class Meta:
         model = MultipleChoiceQuestion
         fields = ['id', 'title', 'options']
 
 
+class PlannedQuestionSerializer(MultipleChoiceQuestionSerializer):
+    # planned questions are not saved yet and are answered by position
+    id = serializers.IntegerField(source='position', read_only=True)
+
+
 class MultipleChoiceParticipationSerializer(serializers.ModelSerializer):
     class Meta:
         model = MultipleChoiceParticipation
         fields = ['id', 'participation', 'not_answered']
 
 
-class SingleAnswerSerializer(serializers.Serializer):
-    question_id = serializers.IntegerField(required=True)
-    selected_option_id = serializers.IntegerField(allow_null=True, required=True)
-
-    def validate_question_id(self, value):
-        valid_ids = self.context.get('valid_question_ids')
-        if value not in valid_ids:
-            raise serializers.ValidationError('Invalid question id for this participation.')
-        return value
-
-    def validate(self, attrs):
-        question_id = attrs['question_id']
-        selected_option_id = attrs.get('selected_option_id')
-        if selected_option_id is not None:
-            option_map = self.context['valid_option_map']
-            valid_options = option_map.get(question_id, set())
-            if selected_option_id not in valid_options:
-                raise serializers.ValidationError({
-                    'selected_option_id': f'Invalid option for the given question with ID {question_id}. The options are {", ".join(map(str, valid_options))}.'
-                })
-        return attrs
-
-
-class AnswerSubmissionSerializer(serializers.Serializer):
-    answers = SingleAnswerSerializer(many=True, required=True)
-
-    def validate_answers(self, value):
-        expected_count = self.context.get('expected_question_count')
-        actual_count = len(value)
-
-        if actual_count != expected_count:
-            raise serializers.ValidationError({
-                'answers': f'Expected {expected_count} answers (including unanswered), but got {actual_count}.'
-            })
-
-        seen = set()
-        for item in value:
-            qid = item['question_id']
-            if qid in seen:
-                raise serializers.ValidationError({
-                    'answers': f'Duplicate answer for question ID {qid}'
-                })
-            seen.add(qid)
-        return value
-
-
 # review serializers
 class BaseParticipationReviewSerializer(serializers.ModelSerializer):
     time_spent = serializers.SerializerMethodField()
@@ -312,39 +309,6 @@ class BaseParticipationReviewSerializer(serializers.ModelSerializer):
         return participation.submitted_at - participation.started_at
 
 
-class OptionWithAnswerSerializer(serializers.ModelSerializer):
-    is_selected = serializers.SerializerMethodField()
-    is_correct = serializers.BooleanField()
-
-    class Meta:
-        model = Option
-        fields = ['id', 'number', 'text', 'is_correct', 'is_selected']
-
-    def get_is_selected(self, option):
-        question = self.context.get('question')
-        user_answers_id = self.context.get('user_answers_id')
-
-        return user_answers_id.get(question.id) == option.id
-
-
-class QuestionReviewSerializer(serializers.ModelSerializer):
-    options = serializers.SerializerMethodField()
-
-    class Meta:
-        model = MultipleChoiceQuestion
-        fields = ['id', 'title', 'options']
-
-    def get_options(self, question):
-        return OptionWithAnswerSerializer(
-            question.options.all(),
-            many=True,
-            context={
-                'question': question,
-                'user_answers_id': self.context.get('user_answers_id', {}),
-            }
-        ).data
-
-
 class MCParticipationReviewSerializer(serializers.ModelSerializer):
     questions = serializers.SerializerMethodField()
     time_spent = serializers.SerializerMethodField()
@@ -358,14 +322,7 @@ class MCParticipationReviewSerializer(serializers.ModelSerializer):
         return participation.submitted_at - participation.started_at
 
     def get_questions(self, participation):
-        answers = MultipleChoiceAnswer.objects.filter(participation=participation.multiple_choice_participation)
-        user_answers_id = {a.question.id: a.selected_option.id for a in answers}
-
-        return QuestionReviewSerializer(
-            participation.multiple_choice_participation.questions.all(),
-            many=True,
-            context={'user_answers_id': user_answers_id}
-        ).data
+        return review_questions(participation.multiple_choice_participation)
 
 
 # leader board serializer
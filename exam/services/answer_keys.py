@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404
+
+from exam.models import OrderingChunk, MatchingChunk, TypingQuestion
+from exam.services.mc_grading import answer_key_from_rows, load_answer_key
+
+CACHE_KEY = 'exam:answer_key:{key}'
+SHARED_TIMEOUT = 60 * 60 * 24
+
+# what grading and serving a step needs, in place of the chunk or question row
+OrderingStep = namedtuple('OrderingStep', ['id', 'step_index', 'correct_order'])
+MatchingStep = namedtuple('MatchingStep', ['id', 'step_index', 'left_items', 'right_items', 'correct_matches'])
+TypingStep = namedtuple('TypingStep', ['id', 'step_index', 'template_code', 'title', 'answer'])
+
+
+class AnswerKeyCache:
+    """
+    Answer keys in two tiers: a process-wide LRU of at most
+    ``ANSWER_KEY_CACHE_SIZE`` entries in front of the shared cache. Local
+    entries live ``ANSWER_KEY_LOCAL_TTL`` seconds, which bounds how long another
+    process can grade against a key invalidated here.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'ANSWER_KEY_CACHE_SIZE', 2048)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ANSWER_KEY_LOCAL_TTL', 30)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """The first of ``keys`` that either tier holds, as ``(key, value)``, or ``(None, None)``."""
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                cached = self._entries.get(key)
+                if cached and cached[0] > now:
+                    self._entries.move_to_end(key)
+                    return key, cached[1]
+
+        shared = cache.get_many([CACHE_KEY.format(key=key) for key in keys])
+        for key in keys:
+            value = shared.get(CACHE_KEY.format(key=key))
+            if value is not None:
+                self._remember(key, value)
+                return key, value
+        return None, None
+
+    def get(self, key):
+        return self.get_many([key])[1]
+
+    def set(self, key, value):
+        cache.set(CACHE_KEY.format(key=key), value, SHARED_TIMEOUT)
+        self._remember(key, value)
+
+    def set_on_commit(self, key, value):
+        """Stores ``value`` once the transaction creating the content it describes commits."""
+        transaction.on_commit(lambda: self.set(key, value))
+
+    def invalidate(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        cache.delete_many([CACHE_KEY.format(key=key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+answer_keys = AnswerKeyCache()
+
+
+def mc_key(mc_participation_id):
+    return f'mc:{mc_participation_id}'
+
+
+def mc_answer_key(mc_participation):
+    key = mc_key(mc_participation.id)
+    answer_key = answer_keys.get(key)
+    if answer_key is None:
+        answer_key = load_answer_key(mc_participation)
+        # a participation still being provisioned has no questions yet
+        if answer_key.question_ids:
+            answer_keys.set(key, answer_key)
+    return answer_key
+
+
+def remember_mc_answer_key(mc_participation, questions):
+    """Caches the key of freshly generated (saved) questions of a participation."""
+    if questions:
+        answer_keys.set_on_commit(mc_key(mc_participation.id), answer_key_from_rows(
+            (question.id, question.option_texts, question.correct_option) for question in questions))
+
+
+def ordering_step(quiz_id, version, step_index):
+    # chunk sets are never changed in place, so a new content version simply uses new keys
+    key = f'ordering:quiz:{quiz_id}:v{version}:{step_index}'
+    step = answer_keys.get(key)
+    if step is None:
+        row = (OrderingChunk.objects.filter(quiz_id=quiz_id, version=version, step_index=step_index)
+               .values_list(*OrderingStep._fields).first())
+        if row is None:
+            raise Http404('No OrderingChunk matches the given query.')
+        step = OrderingStep(*row)
+        answer_keys.set(key, step)
+    return step
+
+
+def matching_step(quiz_id, version, step_index):
+    key = f'matching:quiz:{quiz_id}:v{version}:{step_index}'
+    step = answer_keys.get(key)
+    if step is None:
+        row = (MatchingChunk.objects.filter(quiz_id=quiz_id, version=version, step_index=step_index)
+               .values_list(*MatchingStep._fields).first())
+        if row is None:
+            raise Http404('No MatchingChunk matches the given query.')
+        step = MatchingStep(*row)
+        answer_keys.set(key, step)
+    return step
+
+
+def typing_step(typing_participation, quiz_id, version, step_index):
+    """Question at a step: generated for the participation (subtype 13) or shared by the quiz."""
+    own_key = f'typing:participation:{typing_participation.id}:{step_index}'
+    quiz_key = f'typing:quiz:{quiz_id}:v{version}:{step_index}'
+    _, step = answer_keys.get_many([own_key, quiz_key])
+    if step is None:
+        row = (TypingQuestion.objects
+               .filter(Q(participation=typing_participation) | Q(quiz_id=quiz_id, version=version),
+                       step_index=step_index)
+               .values_list('participation_id', 'id', 'step_index', 'template__code', 'title', 'answer')
+               .first())
+        if row is None:
+            raise Http404('No TypingQuestion matches the given query.')
+        participation_id, *fields = row
+        step = TypingStep(*fields)
+        answer_keys.set(own_key if participation_id else quiz_key, step)
+    return step
+
+
+def invalidate_participation_keys(mc_participation_id=None, typing_participation_id=None, step_indexes=()):
+    """Drops the cached keys of the content a restart throws away."""
+    keys = [f'typing:participation:{typing_participation_id}:{step_index}' for step_index in step_indexes]
+    if mc_participation_id:
+        keys.append(mc_key(mc_participation_id))
+    answer_keys.invalidate(keys)
@@ -0,0 +1,115 @@
+import math
+from collections import defaultdict
+
+from exam.choices import DistractorKind
+from exam.models import DistractorIndex, QuestionTemplate
+from exam.services.question_factory.multiple_choice.generation_cost import seconds_per_question
+from exam.services.question_factory.multiple_choice.subtype_dispatcher import subtype_dispatch
+from exam.services.verse_window import verse_windows
+
+# distractor kind each single-verse template draws its wrong options from
+TEMPLATE_KINDS = {
+    10: DistractorKind.FIRST_WORD,
+    44: DistractorKind.FIRST_WORD,
+    20: DistractorKind.LAST_WORD,
+    43: DistractorKind.LAST_WORD,
+    30: DistractorKind.TRANSLATION,
+    42: DistractorKind.TRANSLATION,
+    31: DistractorKind.VERSE_TEXT,
+    45: DistractorKind.VERSE_TEXT,
+    40: DistractorKind.VERSE_REFERENCE,
+    41: DistractorKind.VERSE_REFERENCE,
+}
+
+# templates built from consecutive verses -> verses at the range edge that cannot start a question
+WINDOW_TEMPLATES = {50: 1, 51: 1, 53: 1, 54: 1, 52: 3}
+
+
+def _indexed_verses(verse_ids, kinds):
+    """``kind -> ids of verses with at least three indexed distractors``, or ``None`` when the index is empty."""
+    rows = (DistractorIndex.objects.filter(verse_id__in=verse_ids, kind__in=kinds)
+            .values_list('verse_id', 'kind', 'candidates'))
+    found = False
+    indexed = defaultdict(set)
+    for verse_id, kind, candidates in rows:
+        found = True
+        if len(candidates) >= 3:
+            indexed[kind].add(verse_id)
+    return indexed if found else None
+
+
+def template_capacity(code, verses, translated, indexed):
+    """Number of distinct questions a template can produce from the verses of a range."""
+    if code in WINDOW_TEMPLATES:
+        return max(len(verses) - WINDOW_TEMPLATES[code], 0)
+    kind = TEMPLATE_KINDS.get(code)
+    if kind is None or indexed is None:
+        return len(translated)
+    return sum(1 for verse in translated if verse.id in indexed[kind])
+
+
+def estimate_capacity(start_verse_id, end_verse_id, subtypes, question_count):
+    """
+    How many distinct multiple-choice questions each template of ``subtypes``
+    can produce for the verse range, whether every subtype can fill its share
+    of ``question_count`` and the expected generation time of one participation.
+
+    Counts come from the cached verse window and the distractor index (a
+    verse needs three indexed distractors); without an index every usable
+    verse is counted. Times are the measured moving averages per template.
+    """
+    window = verse_windows.get(start_verse_id, end_verse_id)
+    verses = window.verses()
+    translated = [verse for verse in verses if verse.prefetched_translation]
+    subtypes = list(subtypes)
+
+    templates_by_subtype = defaultdict(list)
+    for template in QuestionTemplate.objects.filter(subtype__in=subtypes).order_by('code'):
+        templates_by_subtype[template.subtype_id].append(template)
+
+    indexed = _indexed_verses([verse.id for verse in translated], list(set(TEMPLATE_KINDS.values())))
+    costs = seconds_per_question(t.code for templates in templates_by_subtype.values() for t in templates)
+    share = math.ceil(question_count / len(subtypes)) if subtypes else 0
+
+    report = {
+        'verse_count': len(verses),
+        'question_count': question_count,
+        'indexed': indexed is not None,
+        'feasible': bool(subtypes),
+        'expected_seconds': 0.0,
+        'subtypes': [],
+        'warnings': [],
+    }
+    if indexed is None:
+        report['warnings'].append('The distractor index is empty; capacities count every usable verse.')
+
+    for subtype in subtypes:
+        handler_factory = subtype_dispatch.get(subtype.code)
+        generator_map = handler_factory().generator_map if handler_factory else {}
+        templates = [t for t in templates_by_subtype.get(subtype.id, []) if t.code in generator_map]
+
+        entries = [
+            {'template': t.code, 'capacity': template_capacity(t.code, verses, translated, indexed),
+             'seconds_per_question': round(costs[t.code], 4)}
+            for t in templates
+        ]
+        capacity = sum(entry['capacity'] for entry in entries)
+        feasible = capacity >= share
+        report['subtypes'].append({
+            'subtype': subtype.code, 'requested': share, 'capacity': capacity,
+            'feasible': feasible, 'templates': entries,
+        })
+
+        if not entries:
+            report['warnings'].append(f'Subtype {subtype.code} has no template with a generator.')
+        for entry in entries:
+            if not entry['capacity']:
+                report['warnings'].append(
+                    f'Template {entry["template"]} of subtype {subtype.code} cannot produce questions in this range.')
+        if not feasible:
+            report['feasible'] = False
+        if entries:
+            report['expected_seconds'] += share * sum(e['seconds_per_question'] for e in entries) / len(entries)
+
+    report['expected_seconds'] = round(report['expected_seconds'], 3)
+    return report
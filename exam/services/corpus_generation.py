@@ -0,0 +1,47 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+# shared generation of the corpus the question generators read, moved on every change so all processes reload
+GENERATION_KEY = 'exam:corpus:generation'
+
+# seconds a process trusts the generation it read last, so hot paths do not hit the cache on every call
+CHECK_INTERVAL = 5
+
+
+class CorpusGeneration:
+    """
+    The shared generation of the verses, words and translations behind the
+    process caches of the question generators (verse windows, sampled id
+    arrays, distractor entries, the similar-word index). Each cache remembers the generation it was
+    built under and rebuilds once it moves; other processes see a move within
+    ``CHECK_INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+        self._checked_at = float('-inf')
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= CHECK_INTERVAL:
+            value = cache.get(GENERATION_KEY, 0)
+            with self._lock:
+                self._value, self._checked_at = value, now
+        return self._value
+
+    def bump(self):
+        if not cache.add(GENERATION_KEY, 1, None):
+            cache.incr(GENERATION_KEY)
+        with self._lock:
+            self._checked_at = float('-inf')
+
+
+corpus_generation = CorpusGeneration()
+
+
+def invalidate_corpus_caches():
+    """Makes every process rebuild what it cached from the corpus; call it once the change is committed."""
+    corpus_generation.bump()
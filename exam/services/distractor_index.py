@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+from django.db import DatabaseError, transaction
+
+from exam.choices import DistractorKind
+from exam.models import DistractorIndex
+from quran.models import Verse, Word, VerseTranslation, WordSearchTableMV, VerseString
+from quran.serializers import remove_diacritics_with_map
+
+# translator used by the multiple-choice translation questions
+TRANSLATOR_ID = 5
+
+WORD_KINDS = (DistractorKind.FIRST_WORD, DistractorKind.LAST_WORD)
+
+
+def _clean(text):
+    return remove_diacritics_with_map(text)[0] if text else ''
+
+
+def _boundary_words():
+    """``verse_id -> (first arabic, first clean, last arabic, last clean)``."""
+    try:
+        return {
+            row[0]: row[1:]
+            for row in WordSearchTableMV.objects.values_list(
+                'verse_id', 'first_word', 'first_word_clean', 'last_word', 'last_word_clean'
+            )
+        }
+    except DatabaseError:
+        # no search_table view on this backend: derive the words from Word
+        words = defaultdict(list)
+        rows = (Word.objects.filter(type=1, verse__isnull=False)
+                .order_by('verse_id', 'word_number').values_list('verse_id', 'arabic_text'))
+        for verse_id, arabic in rows.iterator(chunk_size=5000):
+            words[verse_id].append(arabic)
+        return {
+            verse_id: (texts[0], _clean(texts[0]), texts[-1], _clean(texts[-1]))
+            for verse_id, texts in words.items()
+        }
+
+
+def _verse_texts():
+    """Texts of the verses with at least two words, from the ``VerseString`` table."""
+    rows = VerseString.objects.values_list('verse_id', 'text', 'signature')
+    return {verse_id: text for verse_id, text, signature in rows.iterator(chunk_size=5000) if ' ' in signature}
+
+
+def _neighbours(position, count, window):
+    """Positions around ``position`` ordered by distance, alternating after/before."""
+    for distance in range(1, window + 1):
+        for candidate in (position + distance, position - distance):
+            if 0 <= candidate < count:
+                yield candidate
+
+
+def _rank_words(verse_ids, boundary, offset, window, size):
+    entries = {}
+    for position, verse_id in enumerate(verse_ids):
+        own = boundary.get(verse_id)
+        if not own or not own[offset + 1]:
+            continue
+        seen = {own[offset + 1]}
+        ranked = []
+        for neighbour in _neighbours(position, len(verse_ids), window):
+            other = boundary.get(verse_ids[neighbour])
+            if not other or not other[offset + 1] or other[offset + 1] in seen:
+                continue
+            seen.add(other[offset + 1])
+            ranked.append([other[offset], other[offset + 1]])
+            if len(ranked) >= size:
+                break
+        entries[verse_id] = ranked
+    return entries
+
+
+def _rank_verses(verse_ids, values, window, size):
+    """Nearby verses whose value (text, translation, ...) differs from the verse's own one."""
+    entries = {}
+    for position, verse_id in enumerate(verse_ids):
+        own = values.get(verse_id)
+        seen = {own}
+        ranked = []
+        for neighbour in _neighbours(position, len(verse_ids), window):
+            other_id = verse_ids[neighbour]
+            if other_id not in values or values[other_id] in seen:
+                continue
+            seen.add(values[other_id])
+            ranked.append(other_id)
+            if len(ranked) >= size:
+                break
+        entries[verse_id] = ranked
+    return entries
+
+
+def build_distractor_index(kinds=None, window=20, size=12, batch_size=2000):
+    """
+    Rebuilds the ranked distractor candidates of every verse for the given kinds
+    (all by default). Candidates are the nearest verses in mushaf order whose
+    first/last word, text, translation or reference differs from the verse's own,
+    so the closest (hardest) distractors come first.
+    Returns the number of rows written.
+    """
+    kinds = list(kinds or DistractorKind.values)
+    verse_ids = list(Verse.objects.order_by('id').values_list('id', flat=True))
+
+    entries_by_kind = {}
+    if any(kind in WORD_KINDS for kind in kinds):
+        boundary = _boundary_words()
+        if DistractorKind.FIRST_WORD in kinds:
+            entries_by_kind[DistractorKind.FIRST_WORD] = _rank_words(verse_ids, boundary, 0, window, size)
+        if DistractorKind.LAST_WORD in kinds:
+            entries_by_kind[DistractorKind.LAST_WORD] = _rank_words(verse_ids, boundary, 2, window, size)
+    if DistractorKind.TRANSLATION in kinds:
+        translations = dict(VerseTranslation.objects.filter(translator_id=TRANSLATOR_ID)
+                            .values_list('verse_id', 'text'))
+        entries_by_kind[DistractorKind.TRANSLATION] = _rank_verses(verse_ids, translations, window, size)
+    if DistractorKind.VERSE_TEXT in kinds:
+        entries_by_kind[DistractorKind.VERSE_TEXT] = _rank_verses(verse_ids, _verse_texts(), window, size)
+    if DistractorKind.VERSE_REFERENCE in kinds:
+        references = {verse_id: verse_id for verse_id in verse_ids}
+        entries_by_kind[DistractorKind.VERSE_REFERENCE] = _rank_verses(verse_ids, references, window, size)
+
+    written = 0
+    with transaction.atomic():
+        DistractorIndex.objects.filter(kind__in=kinds).delete()
+        for kind, entries in entries_by_kind.items():
+            rows = [DistractorIndex(verse_id=verse_id, kind=kind, candidates=candidates)
+                    for verse_id, candidates in entries.items() if candidates]
+            DistractorIndex.objects.bulk_create(rows, batch_size=batch_size)
+            written += len(rows)
+    return written
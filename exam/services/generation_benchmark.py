@@ -0,0 +1,306 @@
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from exam.choices import QuizCategory
+from exam.models import Quiz, QuizSubtype, QuestionTemplate, BaseParticipation, MultipleChoiceParticipation, \
+    MultipleChoiceQuestion, OrderingChunk, MatchingChunk, TypingParticipation, TypingQuestion
+from exam.services.distractor_index import TRANSLATOR_ID, build_distractor_index
+from exam.services.graph_writer import bulk_insert_graph
+from exam.services.question_factory.matching.matching_chunk_generator import MatchingChunkGenerator
+from exam.services.question_factory.multiple_choice.generation_cost import generation_cost_muted
+from exam.services.question_factory.multiple_choice.providers.distractor_index_provider import distractor_index
+from exam.services.question_factory.multiple_choice.subtype_dispatcher import subtype_dispatch, \
+    attach_inline_options
+from exam.services.question_factory.ordering.ordering_chunk_generator import ordering_subtype_dispatcher
+from exam.services.question_factory.typing.typing_question_generator import CommonTypingQuestionGenerator, \
+    MiddleWordTypingQuestionGenerator
+from exam.services.random_sampler import random_sampler
+from exam.services.verse_window import verse_windows, get_verse_window
+from exam.signals import create_chunks_for_quiz
+from quran.models import Surah, Verse, VerseText, Word, Translator, VerseTranslation
+from quran.services.verse_strings import rebuild_verse_strings
+
+# verses per benchmarked range; a juz has about 200
+SIZES = {'small': 10, 'medium': 50, 'juz': 200}
+
+ORDERING_SUBTYPES = (6, 7, 8)
+MATCHING_SUBTYPES = (9, 10, 11)
+TYPING_SUBTYPES = (12, 13, 14, 15)
+MIDDLE_WORD_SUBTYPE = 13
+
+# letters the synthetic words are made of; a small alphabet gives similar and repeated words
+SYNTHETIC_LETTERS = 'ابتثجحخدرسصعفقكلمنهوي'
+
+
+@dataclass
+class BenchmarkCase:
+    category: str
+    subtype: int
+    template: int = None
+
+    @property
+    def label(self):
+        return f'{self.category}:{self.subtype}' + (f':{self.template}' if self.template is not None else '')
+
+
+@dataclass
+class BenchmarkResult:
+    case: str
+    size: str
+    verses: int
+    seconds: float = 0.0
+    queries: int = 0
+    rows: int = 0
+    peak_kib: float = 0.0
+    error: str = ''
+
+
+def benchmark_cases(categories=None):
+    """Every multiple-choice template of ``subtype_dispatch`` and every ordering, matching and typing subtype."""
+    cases = []
+    for subtype_code, handler_factory in sorted(subtype_dispatch.items()):
+        for template_code in sorted(handler_factory().generator_map):
+            cases.append(BenchmarkCase(QuizCategory.MULTIPLE_CHOICE, subtype_code, template_code))
+    cases += [BenchmarkCase(QuizCategory.ORDERING, code) for code in ORDERING_SUBTYPES]
+    cases += [BenchmarkCase(QuizCategory.MATCHING, code) for code in MATCHING_SUBTYPES]
+    cases += [BenchmarkCase(QuizCategory.TYPING, code) for code in TYPING_SUBTYPES]
+    if categories:
+        cases = [case for case in cases if case.category in categories]
+    return cases
+
+
+def ensure_catalog(cases):
+    """Creates the subtypes and templates the cases need when the database lacks them."""
+    for case in cases:
+        subtype, _ = QuizSubtype.objects.get_or_create(
+            code=case.subtype, defaults={'category': case.category, 'title': f'benchmark {case.subtype}'})
+        if case.template is not None:
+            QuestionTemplate.objects.get_or_create(code=case.template, defaults={'subtype': subtype})
+        elif case.category == QuizCategory.TYPING and not subtype.templates.exists():
+            QuestionTemplate.objects.create(subtype=subtype, code=1000 + subtype.code)
+
+
+def seed_synthetic_corpus(verse_count, seed=0):
+    """
+    Writes one surah of ``verse_count`` generated verses with their words, text
+    variants, ``TRANSLATOR_ID`` translations and verse strings. Returns the verse ids.
+    """
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choices(SYNTHETIC_LETTERS, k=rng.randint(2, 6))) for _ in range(verse_count * 3)]
+    surah = Surah.objects.create(name='benchmark', arabic_name='benchmark', english_name='benchmark',
+                                 english_meaning='benchmark')
+    translator = Translator.objects.filter(id=TRANSLATOR_ID).first() or \
+        Translator.objects.create(id=TRANSLATOR_ID, name='benchmark')
+
+    verses, words, translations = [], [], []
+    for number in range(1, verse_count + 1):
+        verse_words = rng.choices(vocabulary, k=rng.randint(3, 15))
+        plain = ' '.join(verse_words)
+        text = VerseText.objects.create(plain=plain, semi_tashkeel=plain, simple_tashkeel=plain,
+                                        full_tashkeel=plain, persian_friendly=plain, fuzzy=plain)
+        verse = Verse.objects.create(text=text, verse_number=number, surah=surah, page_number=1 + number // 15,
+                                     section_number=1 + number // 50, juz=1)
+        verses.append(verse)
+        words += [Word(arabic_text=word, word_number=position, verse_number=number, verse=verse, surah=surah, type=1)
+                  for position, word in enumerate(verse_words, start=1)]
+        translations.append(VerseTranslation(verse=verse, translator=translator, surah=surah,
+                                             text=f'translation {number} {verse_words[0]}'))
+    Word.objects.bulk_create(words, batch_size=2000)
+    VerseTranslation.objects.bulk_create(translations, batch_size=2000)
+    verse_ids = [verse.id for verse in verses]
+    rebuild_verse_strings(verse_ids)
+    return verse_ids
+
+
+def clear_process_caches():
+    verse_windows.clear()
+    distractor_index.invalidate()
+    random_sampler.invalidate()
+
+
+@contextmanager
+def quiz_generation_muted():
+    """Keeps ``Quiz`` saves from generating chunks so the benchmark can time them itself."""
+    post_save.disconnect(create_chunks_for_quiz, sender=Quiz)
+    try:
+        yield
+    finally:
+        post_save.connect(create_chunks_for_quiz, sender=Quiz)
+
+
+def _create_quiz(case, user, start_id, end_id, question_count):
+    now = timezone.now()
+    with quiz_generation_muted():
+        quiz = Quiz.objects.create(
+            title=f'benchmark {case.label}', category=case.category, creator=user,
+            start_verse_id=start_id, end_verse_id=end_id, question_count=question_count,
+            quiz_start_datetime=now, quiz_end_datetime=now + timedelta(days=1), quiz_duration=3600,
+        )
+        quiz.subtypes.set(QuizSubtype.objects.filter(code=case.subtype))
+    return quiz
+
+
+def _participation(quiz, user):
+    return BaseParticipation.objects.create(user=user, quiz=quiz)
+
+
+def prepare_case(case, quiz, user):
+    """
+    Does the per-case setup that is not being measured and returns
+    ``(run, count_rows)``: the generation step and a count of the rows it wrote.
+    """
+    if case.category == QuizCategory.MULTIPLE_CHOICE:
+        subtype = quiz.subtypes.get()
+        template = QuestionTemplate.objects.get(code=case.template)
+        participation = MultipleChoiceParticipation.objects.create(participation=_participation(quiz, user))
+
+        def run():
+            result = subtype_dispatch[case.subtype]().dispatch(
+                quiz=quiz, participation=participation, templates=[template], count=quiz.question_count,
+                verses=get_verse_window(quiz).verses(), subtype=subtype)
+            questions = result.get('questions', [])
+            attach_inline_options(questions, result.get('options', []))
+            for position, question in enumerate(questions, start=1):
+                question.position = position
+            bulk_insert_graph(questions, ('participation_id', 'position'))
+
+        return run, lambda: MultipleChoiceQuestion.objects.filter(participation=participation).count()
+
+    if case.category == QuizCategory.ORDERING:
+        return (lambda: ordering_subtype_dispatcher(quiz, force_regenerate=True),
+                lambda: OrderingChunk.objects.filter(quiz=quiz).count())
+
+    if case.category == QuizCategory.MATCHING:
+        return (lambda: MatchingChunkGenerator(quiz, chunk_size=quiz.chunk_size).generate(),
+                lambda: MatchingChunk.objects.filter(quiz=quiz).count())
+
+    if case.subtype == MIDDLE_WORD_SUBTYPE:
+        participation = TypingParticipation.objects.create(participation=_participation(quiz, user))
+        return (lambda: MiddleWordTypingQuestionGenerator(participation).generate(),
+                lambda: TypingQuestion.objects.filter(participation=participation).count())
+
+    return (lambda: CommonTypingQuestionGenerator(quiz).generate(),
+            lambda: TypingQuestion.objects.filter(quiz=quiz).count())
+
+
+def _measure(case, user, start_id, end_id, question_count, warm, trace_memory):
+    """One rolled-back run of a case; returns ``(seconds, queries, rows, peak bytes)``."""
+    with transaction.atomic():
+        quiz = _create_quiz(case, user, start_id, end_id, question_count)
+        run, count_rows = prepare_case(case, quiz, user)
+        if not warm:
+            clear_process_caches()
+
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                run()
+                seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+
+        rows = count_rows()
+        transaction.set_rollback(True)
+    return seconds, len(queries), rows, peak
+
+
+def run_benchmark(cases, verse_ids, sizes, question_count=20, repeat=1, warm=False):
+    """
+    Runs every case on the first ``verses`` ids of ``verse_ids`` for each size.
+    Time is the median of ``repeat`` runs; peak memory comes from a separate
+    traced run so that tracing does not inflate the timings. The database
+    writes of every run are rolled back.
+    """
+    user = get_user_model().objects.create(phone_number=f'benchmark-{time.time_ns() % 10 ** 12}')
+    results = []
+    for size, verse_count in sizes.items():
+        ids = verse_ids[:verse_count]
+        for case in cases:
+            result = BenchmarkResult(case=case.label, size=size, verses=len(ids))
+            results.append(result)
+            if not ids:
+                result.error = 'no verses'
+                continue
+            try:
+                timings = []
+                for _ in range(max(repeat, 1)):
+                    seconds, result.queries, result.rows, _ = _measure(
+                        case, user, ids[0], ids[-1], question_count, warm, trace_memory=False)
+                    timings.append(seconds)
+                result.seconds = statistics.median(timings)
+                result.peak_kib = _measure(case, user, ids[0], ids[-1], question_count, warm,
+                                           trace_memory=True)[3] / 1024
+            except Exception as exc:
+                result.error = f'{type(exc).__name__}: {exc}'[:200]
+    return results
+
+
+@transaction.atomic
+def benchmark_generation(corpus='existing', fixtures=(), sizes=None, categories=None, question_count=20,
+                         repeat=1, warm=False, start_verse_id=None, build_index=None):
+    """
+    Benchmarks the question generators and returns a list of ``BenchmarkResult``.
+    ``corpus`` is ``'existing'`` (the verses in the database, optionally after
+    loading ``fixtures``) or ``'synthetic'`` (generated verses). The database
+    writes, corpus included, are rolled back; the timings are kept out of the
+    generation costs the capacity estimate reads from the shared cache.
+    """
+    sizes = sizes or SIZES
+    for fixture in fixtures:
+        call_command('loaddata', fixture, verbosity=0)
+
+    if corpus == 'synthetic':
+        verse_ids = seed_synthetic_corpus(max(sizes.values()))
+        if build_index is None:
+            build_index = True
+    else:
+        verses = Verse.objects.order_by('id')
+        if start_verse_id:
+            verses = verses.filter(id__gte=start_verse_id)
+        verse_ids = list(verses.values_list('id', flat=True)[:max(sizes.values())])
+    if build_index:
+        build_distractor_index()
+
+    cases = benchmark_cases(categories)
+    ensure_catalog(cases)
+    with generation_cost_muted():
+        results = run_benchmark(cases, verse_ids, sizes, question_count=question_count, repeat=repeat, warm=warm)
+
+    transaction.set_rollback(True)
+    clear_process_caches()
+    return results
+
+
+def results_as_dicts(results):
+    return [asdict(result) for result in results]
+
+
+def compare_results(results, baseline):
+    """Relative change of time and query count against a previous JSON report, keyed by case and size."""
+    previous = {(row['case'], row['size']): row for row in baseline}
+    changes = {}
+    for result in results:
+        before = previous.get((result.case, result.size))
+        if not before or result.error or before.get('error'):
+            continue
+        changes[(result.case, result.size)] = {
+            'seconds': (result.seconds - before['seconds']) / before['seconds'] if before['seconds'] else None,
+            'queries': result.queries - before['queries'],
+        }
+    return changes
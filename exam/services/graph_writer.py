@@ -0,0 +1,74 @@
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router
+from django.db.models import Q
+
+# natural keys matched per read-back query
+READ_BACK_BATCH = 500
+
+
+def _assign_primary_keys(model, parents, natural_key, using):
+    """
+    Fills ``pk`` of freshly inserted ``parents`` by reading them back through
+    their natural key, matching every key as a whole. The key must be backed by
+    a unique constraint, so no other row can answer for a parent.
+    """
+    keys = [tuple(getattr(parent, field) for field in natural_key) for parent in parents]
+    saved = {}
+    for start in range(0, len(keys), READ_BACK_BATCH):
+        batch = keys[start:start + READ_BACK_BATCH]
+        match = reduce(or_, (Q(**dict(zip(natural_key, key))) for key in batch))
+        saved.update(
+            (tuple(row[:-1]), row[-1])
+            for row in model._default_manager.using(using).filter(match).values_list(*natural_key, 'pk')
+        )
+
+    missing = [key for key in keys if key not in saved]
+    if missing:
+        raise RuntimeError(f'{len(missing)} inserted {model.__name__} rows could not be read back by '
+                           f'{natural_key}, e.g. {missing[0]}.')
+    for parent, key in zip(parents, keys):
+        parent.pk = saved[key]
+        parent._state.adding = False
+        parent._state.db = using
+
+
+def bulk_insert_graph(parents, natural_key, children=(), batch_size=1000):
+    """
+    Inserts a list of unsaved parent objects of one model and then their
+    children, each level with ``bulk_create``.
+
+    ``natural_key`` names the fields (attnames) that identify a parent among
+    the rows of its table, e.g. ``('participation_id', 'position')``, and must
+    be backed by a unique constraint. On backends whose ``bulk_create`` does
+    not return primary keys (MySQL), the parents are read back by that key.
+    ``children`` is an iterable of ``(objects, fk_name)`` pairs whose
+    ``fk_name`` points at one of the parents. Works the same on MySQL,
+    PostgreSQL and SQLite.
+    """
+    parents = list(parents)
+    if not parents:
+        return parents
+
+    model = type(parents[0])
+    using = router.db_for_write(model)
+
+    keys = {tuple(getattr(parent, field) for field in natural_key) for parent in parents}
+    if len(keys) != len(parents):
+        raise ValueError(f'{model.__name__} natural key {natural_key} is not unique within the batch.')
+
+    model._default_manager.using(using).bulk_create(parents, batch_size=batch_size)
+    if not connections[using].features.can_return_rows_from_bulk_insert or any(p.pk is None for p in parents):
+        _assign_primary_keys(model, parents, natural_key, using)
+
+    for objects, fk_name in children:
+        objects = list(objects)
+        if not objects:
+            continue
+        field = objects[0]._meta.get_field(fk_name)
+        for obj in objects:
+            setattr(obj, field.attname, getattr(obj, fk_name).pk)
+        type(objects[0])._default_manager.using(using).bulk_create(objects, batch_size=batch_size)
+
+    return parents
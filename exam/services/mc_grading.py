@@ -0,0 +1,119 @@
+from dataclasses import dataclass, field
+
+from rest_framework.exceptions import ValidationError
+
+from exam.models import MultipleChoiceQuestion, Option
+from exam.services.question_plan import get_planned_questions
+
+
+@dataclass
+class AnswerKey:
+    """
+    Valid and correct ``(question_id, option)`` pairs of a multiple-choice
+    participation. Options are numbers for inline questions and ``Option`` ids
+    for ``legacy_ids``; planned participations use positions as question ids.
+    """
+    question_ids: frozenset
+    valid: frozenset
+    correct: frozenset
+    legacy_ids: frozenset = field(default_factory=frozenset)
+
+
+def answer_key_from_rows(rows, legacy_options=()):
+    """
+    Builds the key from ``(question_id, option_texts, correct_option)`` rows and
+    the ``(question_id, option_id, is_correct)`` rows of legacy questions.
+    """
+    question_ids, valid, correct, legacy_ids = set(), set(), set(), set()
+    for question_id, option_texts, correct_option in rows:
+        question_ids.add(question_id)
+        if option_texts:
+            valid.update((question_id, number) for number in range(1, len(option_texts) + 1))
+            correct.add((question_id, correct_option))
+        else:
+            legacy_ids.add(question_id)
+    for question_id, option_id, is_correct in legacy_options:
+        valid.add((question_id, option_id))
+        if is_correct:
+            correct.add((question_id, option_id))
+    return AnswerKey(frozenset(question_ids), frozenset(valid), frozenset(correct), frozenset(legacy_ids))
+
+
+def load_answer_key(mc_participation):
+    """Answer key read in one query, plus one for ``Option`` rows when legacy questions exist."""
+    if mc_participation.is_planned:
+        return answer_key_from_rows((q.position, q.option_texts, q.correct_option)
+                                    for q in get_planned_questions(mc_participation))
+
+    rows = list(MultipleChoiceQuestion.objects.filter(participation=mc_participation)
+                .values_list('id', 'option_texts', 'correct_option'))
+    legacy_ids = [question_id for question_id, option_texts, _ in rows if not option_texts]
+    legacy_options = ()
+    if legacy_ids:
+        legacy_options = (Option.objects.filter(question_id__in=legacy_ids)
+                          .values_list('question_id', 'id', 'is_correct'))
+    return answer_key_from_rows(rows, legacy_options)
+
+
+def parse_answers(data, expected_count):
+    """
+    ``(question_id, selected_option_id)`` pairs of a submission, checked for
+    shape, count and duplicates; unanswered questions carry ``None``.
+    """
+    answers = data.get('answers') if hasattr(data, 'get') else None
+    if not isinstance(answers, list):
+        raise ValidationError({'answers': 'A list of answers is required.'})
+    try:
+        pairs = [
+            (int(answer['question_id']),
+             None if answer['selected_option_id'] is None else int(answer['selected_option_id']))
+            for answer in answers
+        ]
+    except (TypeError, KeyError, ValueError):
+        raise ValidationError({'answers': 'Each answer needs an integer question_id and a selected_option_id '
+                                          'that is an integer or null.'})
+
+    if len(pairs) != expected_count:
+        raise ValidationError({
+            'answers': f'Expected {expected_count} answers (including unanswered), but got {len(pairs)}.'
+        })
+    question_ids = [question_id for question_id, _ in pairs]
+    if len(set(question_ids)) != len(question_ids):
+        duplicates = sorted({qid for qid in question_ids if question_ids.count(qid) > 1})
+        raise ValidationError({'answers': f'Duplicate answer for question ID {", ".join(map(str, duplicates))}'})
+    return pairs
+
+
+@dataclass
+class Grading:
+    answered: list
+    correct: set
+    not_answered: int
+
+    @property
+    def correct_count(self):
+        return len(self.correct)
+
+    @property
+    def wrong_count(self):
+        return len(self.answered) - len(self.correct)
+
+
+def grade(key: AnswerKey, pairs):
+    """Validates ``pairs`` against ``key`` and grades them as a whole with set operations."""
+    unknown = {question_id for question_id, _ in pairs} - key.question_ids
+    if unknown:
+        raise ValidationError({
+            'question_id': f'Invalid question id for this participation: {", ".join(map(str, sorted(unknown)))}.'
+        })
+
+    answered = [pair for pair in pairs if pair[1] is not None]
+    invalid = set(answered) - key.valid
+    if invalid:
+        raise ValidationError({
+            'selected_option_id': 'Invalid option for the given question: ' + ', '.join(
+                f'{option} for question {question_id}' for question_id, option in sorted(invalid)) + '.'
+        })
+
+    return Grading(answered=answered, correct=set(answered) & key.correct,
+                   not_answered=len(pairs) - len(answered))
@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from exam.models import MultipleChoiceQuestion, MultipleChoiceAnswer, Option
+
+REVIEW_CACHE_KEY = 'exam:mc_review:{participation_id}'
+REVIEW_TIMEOUT = 60 * 60 * 24
+
+
+def review_questions(mc_participation):
+    """
+    Questions of a multiple-choice participation with their options, the
+    correct one and the one the participant picked, read as plain rows: one
+    query for the questions, one for the answers and, only for questions
+    created before options were stored inline, one for their ``Option`` rows.
+    """
+    questions = list(MultipleChoiceQuestion.objects.filter(participation=mc_participation)
+                     .order_by('position', 'id')
+                     .values_list('id', 'title', 'option_texts', 'correct_option'))
+    selected = {
+        question_id: selected_number or selected_option_id
+        for question_id, selected_option_id, selected_number in (
+            MultipleChoiceAnswer.objects.filter(participation=mc_participation)
+            .values_list('question_id', 'selected_option_id', 'selected_number'))
+    }
+
+    legacy_ids = [question_id for question_id, _, option_texts, _ in questions if not option_texts]
+    legacy_options = defaultdict(list)
+    if legacy_ids:
+        for question_id, *option in (Option.objects.filter(question_id__in=legacy_ids).order_by('id')
+                                     .values_list('question_id', 'id', 'number', 'text', 'is_correct')):
+            legacy_options[question_id].append(option)
+
+    review = []
+    for question_id, title, option_texts, correct_option in questions:
+        if option_texts:
+            # inline options are identified by their number
+            options = [(number, number, text, number == correct_option)
+                       for number, text in enumerate(option_texts, start=1)]
+        else:
+            options = legacy_options[question_id]
+        picked = selected.get(question_id)
+        review.append({
+            'id': question_id,
+            'title': title,
+            'options': [
+                {'id': option_id, 'number': number, 'text': text, 'is_correct': is_correct,
+                 'is_selected': picked == option_id}
+                for option_id, number, text, is_correct in options
+            ],
+        })
+    return review
+
+
+def get_cached_review(participation_id):
+    return cache.get(REVIEW_CACHE_KEY.format(participation_id=participation_id))
+
+
+def cache_review(participation_id, review):
+    """Stores the review of a submitted participation, which does not change anymore."""
+    cache.set(REVIEW_CACHE_KEY.format(participation_id=participation_id), review, REVIEW_TIMEOUT)
+
+
+def invalidate_review(participation_id):
+    cache.delete(REVIEW_CACHE_KEY.format(participation_id=participation_id))
@@ -3,7 +3,7 @@ from datetime import timedelta
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
-from exam.choices import ParticipationStatus
+from exam.choices import ParticipationStatus, ProvisioningStatus
 from exam.models import BaseParticipation
 
 
@@ -39,12 +39,17 @@ class BaseRestartService:
             status=ParticipationStatus.INCOMPLETE,
             started_at=timezone.now(),
             deadline=timezone.now() + timedelta(seconds=self.quiz.quiz_duration),
+            content_version=self.quiz.content_version,
         )
 
     def restart_existing_participation(self):
         self.old_participation.started_at = None
         self.old_participation.deadline = None
         self.old_participation.status = ParticipationStatus.INCOMPLETE
+        # restarts generate their questions in the request, which also ends a pending provisioning task
+        self.old_participation.provisioning_status = ProvisioningStatus.READY
+        # a restart starts over on the current chunks of the quiz
+        self.old_participation.content_version = self.quiz.content_version
         self.old_participation.correct_answers = 0
         self.old_participation.wrong_answers = 0
         self.old_participation.total_score = 0
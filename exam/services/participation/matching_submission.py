@@ -1,27 +1,21 @@
-from django.shortcuts import get_object_or_404
-
-from exam.models import MatchingParticipation, MatchingChunk, \
-    MatchingParticipationChunkProgress
+from exam.models import MatchingParticipation, MatchingParticipationChunkProgress
 from exam.serializers import BaseParticipationReviewSerializer, \
     MatchingChunkSerializer
+from exam.services.answer_keys import matching_step, MatchingStep
 from exam.services.participation.base_submission import BaseSubmissionService
 
 
 class MatchingSubmissionService(BaseSubmissionService):
     def __init__(self, participation: MatchingParticipation, pairs: list,
-                 chunk_progress: MatchingParticipationChunkProgress, chunk: MatchingChunk):
+                 chunk_progress: MatchingParticipationChunkProgress, chunk: MatchingStep):
         super().__init__(participation.participation)
         self.participation = participation
         self.pairs = pairs
         self.chunk_progress = chunk_progress
         self.chunk = chunk
 
-    def get_chunk(self) -> MatchingChunk:
-        return get_object_or_404(
-            MatchingChunk,
-            quiz=self.quiz,
-            step_index=self.participation.current_step
-        )
+    def get_chunk(self) -> MatchingStep:
+        return matching_step(self.quiz.id, self.base_participation.content_version, self.participation.current_step)
 
     def submit_answer(self) -> dict:
         self.check_deadline()
@@ -1,75 +1,53 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
-from exam.models import BaseParticipation, MultipleChoiceParticipation, MultipleChoiceQuestion, Option, \
-    MultipleChoiceAnswer
-from exam.serializers import AnswerSubmissionSerializer
+from exam.models import BaseParticipation, MultipleChoiceParticipation, MultipleChoiceAnswer
+from exam.services.answer_keys import mc_answer_key
+from exam.services.mc_grading import parse_answers, grade
 from exam.services.participation.base_submission import BaseSubmissionService
+from exam.services.question_plan import save_planned_questions
 
 
 class MCParticipationSubmissionService(BaseSubmissionService):
     def __init__(self, participation: BaseParticipation):
         super().__init__(participation)
         self.participation = get_object_or_404(MultipleChoiceParticipation, participation=participation)
+        # the review reads not_answered through the base participation
+        participation.multiple_choice_participation = self.participation
 
     def submit_answers(self, submitted_data):
         self.check_participation_status()
         self.check_deadline()
 
-        questions = MultipleChoiceQuestion.objects.filter(participation=self.participation).prefetch_related('options')
-        question_ids = {q.id for q in questions}
-        options = Option.objects.filter(question__in=questions)
+        key = mc_answer_key(self.participation)
+        # generation can fall short of question_count; the participation answers the questions it has
+        grading = grade(key, parse_answers(submitted_data, len(key.question_ids)))
 
-        option_map = {q.id: set() for q in questions}
-        correct_option_map = {}
-
-        for o in options:
-            option_map[o.question_id].add(o.id)
-            if o.is_correct:
-                correct_option_map[o.question_id] = o.id
-
-        serializer = AnswerSubmissionSerializer(
-            data=submitted_data,
-            context={
-                'valid_question_ids': question_ids,
-                'valid_option_map': option_map,
-                'expected_question_count': self.quiz.question_count
-            }
-        )
-        serializer.is_valid(raise_exception=True)
-        answers = serializer.validated_data['answers']
-
-        answers_to_submit = []
-        not_answered_count = 0
-
-        for answer in answers:
-            qid = answer['question_id']
-            selected_id = answer['selected_option_id']
-            correct_id = correct_option_map[qid]
-
-            if selected_id is None:
-                not_answered_count += 1
-                continue
+        with transaction.atomic():
+            if self.participation.is_planned:
+                # planned questions are addressed by their position; only the answered ones are saved
+                saved = save_planned_questions(self.participation, [qid for qid, _ in grading.answered])
+                question_id_map = {position: question.id for position, question in saved.items()}
+            else:
+                question_id_map = {}
 
-            is_correct = selected_id == correct_id
-            answers_to_submit.append(
+            MultipleChoiceAnswer.objects.bulk_create([
                 MultipleChoiceAnswer(
                     participation=self.participation,
-                    question_id=qid,
-                    selected_option_id=selected_id,
-                    is_correct=is_correct
+                    question_id=question_id_map.get(qid, qid),
+                    selected_option_id=selected_id if qid in key.legacy_ids else None,
+                    selected_number=None if qid in key.legacy_ids else selected_id,
+                    is_correct=(qid, selected_id) in grading.correct,
                 )
-            )
-
-            if is_correct:
-                self.base_participation.correct_answers += 1
-            else:
-                self.base_participation.wrong_answers += 1
-
-        MultipleChoiceAnswer.objects.bulk_create(answers_to_submit)
-        self.participation.not_answered = not_answered_count
-        self.participation.save()
-
-        self.complete_participation()
+                for qid, selected_id in grading.answered
+            ])
+            MultipleChoiceParticipation.objects.filter(id=self.participation.id).update(
+                not_answered=grading.not_answered)
+            self.participation.not_answered = grading.not_answered
+
+            self.base_participation.correct_answers += grading.correct_count
+            self.base_participation.wrong_answers += grading.wrong_count
+            self.complete_participation()
         self.update_leaderboard()
 
         return self.base_participation
@@ -1,7 +1,6 @@
-from django.shortcuts import get_object_or_404
-
-from exam.models import OrderingParticipation, OrderingChunk
+from exam.models import OrderingParticipation
 from exam.serializers import OrderingChunkSerializer, BaseParticipationReviewSerializer
+from exam.services.answer_keys import ordering_step, OrderingStep
 from exam.services.participation.base_submission import BaseSubmissionService
 
 
@@ -10,12 +9,8 @@ class OrderingSubmissionService(BaseSubmissionService):
         super().__init__(participation.participation)
         self.participation = participation
 
-    def get_chunk(self) -> OrderingChunk:
-        return get_object_or_404(
-            OrderingChunk,
-            quiz=self.quiz,
-            step_index=self.participation.current_step
-        )
+    def get_chunk(self) -> OrderingStep:
+        return ordering_step(self.quiz.id, self.base_participation.content_version, self.participation.current_step)
 
     def update_base_participation(self):
         self.base_participation.correct_answers = self.quiz.question_count
@@ -1,8 +1,9 @@
 from django.db.models import Count, Q
 
-from exam.models import TypingParticipation, TypingSubmittedAnswer, TypingQuestion
+from exam.models import TypingParticipation, TypingSubmittedAnswer
 from exam.serializers import BaseParticipationReviewSerializer, \
     TypingQuestionSerializer
+from exam.services.answer_keys import typing_step
 from exam.services.participation.base_submission import BaseSubmissionService
 
 
@@ -13,8 +14,8 @@ class TypingAnswerSubmissionService(BaseSubmissionService):
         self.question = self.get_current_question()
 
     def get_current_question(self):
-        return TypingQuestion.objects.get(Q(participation=self.participation) | Q(quiz=self.quiz),
-                                          step_index=self.participation.current_step)
+        return typing_step(self.participation, self.quiz.id, self.base_participation.content_version,
+                           self.participation.current_step)
 
     def submit(self, user_input):
         self.check_deadline()
@@ -29,7 +30,7 @@ class TypingAnswerSubmissionService(BaseSubmissionService):
             130: self._handle_single_word_answer,
             150: self._handle_single_word_answer,
             140: self._handle_full_verse_answer,
-        }.get(self.question.template.code)
+        }.get(self.question.template_code)
 
     def _handle_single_word_answer(self, question, user_input: str):
         correct_answers = question.answer
@@ -41,7 +42,7 @@ class TypingAnswerSubmissionService(BaseSubmissionService):
             is_correct = text in correct_answers
 
         TypingSubmittedAnswer.objects.create(
-            question=question,
+            question_id=question.id,
             text=text,
             is_correct=is_correct,
         )
@@ -66,7 +67,7 @@ class TypingAnswerSubmissionService(BaseSubmissionService):
 
         if not user_input or len(user_input) == 0:
             TypingSubmittedAnswer.objects.create(
-                question=question,
+                question_id=question.id,
                 text="",
                 is_correct=False,
             )
@@ -99,7 +100,7 @@ class TypingAnswerSubmissionService(BaseSubmissionService):
         is_fully_correct = len(wrong_words) == 0
 
         TypingSubmittedAnswer.objects.create(
-            question=question,
+            question_id=question.id,
             text=' '.join(user_input),
             is_correct=is_fully_correct,
         )
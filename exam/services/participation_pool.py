@@ -0,0 +1,158 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, F
+from django.utils import timezone
+
+from exam.choices import QuizCategory
+from exam.models import Quiz, PreparedParticipation, MultipleChoiceQuestion, TypingQuestion
+from exam.services.answer_keys import remember_mc_answer_key
+from exam.services.graph_writer import bulk_insert_graph
+from exam.services.question_plan import lazy_questions_enabled
+from exam.services.question_factory.multiple_choice.subtype_dispatcher import build_questions
+from exam.services.question_factory.typing.typing_question_generator import MiddleWordTypingQuestionGenerator
+
+POOL_LOCK_KEY = 'exam:participation_pool:lock:{quiz_id}'
+# prepared participations per expected participant, covering joins above the average
+POOL_HEADROOM = 1.2
+
+
+def pool_lead_time():
+    return timedelta(minutes=getattr(settings, 'QUIZ_POOL_LEAD_MINUTES', 10))
+
+
+def is_poolable(quiz):
+    """Quizzes whose participations get questions of their own, which are worth generating in advance."""
+    if quiz.category == QuizCategory.MULTIPLE_CHOICE:
+        # planned questions cost nothing to provision
+        return not lazy_questions_enabled()
+    if quiz.category == QuizCategory.TYPING:
+        subtype = quiz.subtypes.first()
+        return subtype is not None and subtype.code == 13
+    return False
+
+
+def expected_joins(quiz):
+    """
+    Average number of participants that started one of the last
+    ``QUIZ_POOL_HISTORY`` quizzes of the same category within
+    ``QUIZ_POOL_JOIN_WINDOW_MINUTES`` of its start, or ``None`` without history.
+    """
+    window = timedelta(minutes=getattr(settings, 'QUIZ_POOL_JOIN_WINDOW_MINUTES', 15))
+    history = (Quiz.objects
+               .filter(category=quiz.category, quiz_start_datetime__lt=timezone.now())
+               .exclude(id=quiz.id)
+               .order_by('-quiz_start_datetime')
+               .annotate(joins=Count('participations', filter=Q(
+                   participations__started_at__lt=F('quiz_start_datetime') + window)))
+               .values_list('joins', flat=True)[:getattr(settings, 'QUIZ_POOL_HISTORY', 10)])
+    joins = list(history)
+    if not joins:
+        return None
+    return sum(joins) / len(joins)
+
+
+def pool_target_size(quiz):
+    minimum = getattr(settings, 'QUIZ_POOL_MIN_SIZE', 5)
+    maximum = getattr(settings, 'QUIZ_POOL_MAX_SIZE', 200)
+    joins = expected_joins(quiz)
+    if joins is None:
+        return minimum
+    return max(minimum, min(maximum, math.ceil(joins * POOL_HEADROOM)))
+
+
+def acquire_pool_lock(quiz_id, timeout=60 * 10):
+    return cache.add(POOL_LOCK_KEY.format(quiz_id=quiz_id), 1, timeout)
+
+
+def release_pool_lock(quiz_id):
+    cache.delete(POOL_LOCK_KEY.format(quiz_id=quiz_id))
+
+
+def prepare_questions(quiz):
+    """Questions of one future participant in the ``PreparedParticipation.questions`` layout."""
+    if quiz.category == QuizCategory.MULTIPLE_CHOICE:
+        return [
+            [question.template_id, question.title, question.option_texts, question.correct_option]
+            for question in build_questions(quiz, participation=None)['questions']
+        ]
+    return [
+        [question.template_id, question.title, question.answer]
+        for question in MiddleWordTypingQuestionGenerator(quiz=quiz).build()
+    ]
+
+
+def fill_participation_pool(quiz, target=None, batch_size=20):
+    """Tops the pool of ``quiz`` up to ``target`` (default ``pool_target_size``); returns the number added."""
+    if not is_poolable(quiz):
+        return 0
+    version = Quiz.objects.filter(pk=quiz.pk).values_list('pool_version', flat=True).first()
+    if version is None:
+        return 0
+    # rows a fill added after the pool was discarded are never claimed
+    quiz.prepared_participations.exclude(pool_version=version).delete()
+
+    missing = ((target if target is not None else pool_target_size(quiz))
+               - quiz.prepared_participations.filter(pool_version=version).count())
+    added = 0
+    while added < missing:
+        batch = [
+            PreparedParticipation(quiz=quiz, questions=prepare_questions(quiz), pool_version=version)
+            for _ in range(min(batch_size, missing - added))
+        ]
+        if not Quiz.objects.filter(pk=quiz.pk, pool_version=version).exists():
+            # the quiz changed while the batch was generated
+            break
+        PreparedParticipation.objects.bulk_create(batch)
+        added += len(batch)
+    return added
+
+
+def discard_participation_pool(quiz):
+    """
+    Drops the prepared participations of ``quiz`` and moves its pool version,
+    so those a fill for the old settings still adds are not claimed.
+    """
+    Quiz.objects.filter(pk=quiz.pk).update(pool_version=F('pool_version') + 1)
+    quiz.refresh_from_db(fields=['pool_version'])
+    PreparedParticipation.objects.filter(quiz_id=quiz.pk).delete()
+
+
+def claim_prepared_questions(participation):
+    """
+    Moves the questions of one prepared participation of the quiz to
+    ``participation`` and returns whether the pool had one. Must run inside a
+    transaction: the claimed row is locked with ``SKIP LOCKED`` so concurrent
+    claims take different rows instead of waiting on each other.
+    """
+    quiz = participation.quiz
+    prepared = (PreparedParticipation.objects
+                .select_for_update(skip_locked=True)
+                .filter(quiz_id=quiz.id, pool_version=quiz.pool_version)
+                .order_by('id')
+                .first())
+    if prepared is None:
+        return False
+
+    if quiz.category == QuizCategory.MULTIPLE_CHOICE:
+        mc_participation = participation.multiple_choice_participation
+        questions = []
+        for position, (template_id, title, option_texts, correct_option) in enumerate(prepared.questions, start=1):
+            question = MultipleChoiceQuestion(title=title, template_id=template_id, participation=mc_participation,
+                                              position=position)
+            question.set_options(option_texts, correct_option)
+            questions.append(question)
+        bulk_insert_graph(questions, ('participation_id', 'position'))
+        remember_mc_answer_key(mc_participation, questions)
+    else:
+        typing_participation = participation.typing_participation
+        bulk_insert_graph([
+            TypingQuestion(participation=typing_participation, template_id=template_id, title=title, answer=answer,
+                           step_index=step_index)
+            for step_index, (template_id, title, answer) in enumerate(prepared.questions, start=1)
+        ], ('participation_id', 'step_index'))
+
+    prepared.delete()
+    return True
@@ -0,0 +1,153 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from exam.choices import QuizCategory, ProvisioningStatus
+from exam.models import BaseParticipation
+from exam.services.question_bank import provision_mc_questions
+from exam.services.question_factory.typing.typing_question_generator import MiddleWordTypingQuestionGenerator
+
+SLOT_KEY = 'exam:provisioning:slot:{quiz_id}:{slot}'
+READY_KEY = 'exam:provisioning:ready:{participation_id}'
+CREATE_KEY = 'exam:participation:create:{user_id}:{key}'
+SLOT_TIMEOUT = 60 * 5
+READY_TIMEOUT = 60 * 10
+CREATE_TIMEOUT = 60 * 60 * 24
+CREATE_LOCK_TIMEOUT = 60
+PENDING = 0
+
+
+def async_provisioning_enabled():
+    return getattr(settings, 'QUIZ_ASYNC_PROVISIONING', False)
+
+
+def has_generated_content(participation):
+    """Multiple-choice questions and subtype 13 typing questions are generated per participation."""
+    quiz = participation.quiz
+    if quiz.category == QuizCategory.MULTIPLE_CHOICE:
+        return True
+    if quiz.category == QuizCategory.TYPING:
+        subtype = quiz.subtypes.first()
+        return subtype is not None and subtype.code == 13
+    return False
+
+
+def provision_content(participation):
+    """Generates the questions of ``participation``; its subtype participation must exist."""
+    quiz = participation.quiz
+    if quiz.category == QuizCategory.MULTIPLE_CHOICE:
+        provision_mc_questions(quiz=quiz, participation=participation.multiple_choice_participation)
+    elif quiz.category == QuizCategory.TYPING:
+        MiddleWordTypingQuestionGenerator(participation.typing_participation).generate()
+
+
+def schedule_provisioning(participation):
+    """
+    Marks ``participation`` as provisioning and queues its generation once the
+    surrounding transaction commits.
+    """
+    participation.provisioning_status = ProvisioningStatus.PROVISIONING
+    participation.save(update_fields=['provisioning_status'])
+    _enqueue_provisioning(participation.id)
+
+
+def retry_provisioning(participation):
+    """
+    Queues a failed participation for provisioning again. Returns ``False`` when
+    it is not failed, e.g. because a concurrent request retried it already.
+    """
+    retried = (BaseParticipation.objects
+               .filter(id=participation.id, provisioning_status=ProvisioningStatus.FAILED)
+               .update(provisioning_status=ProvisioningStatus.PROVISIONING))
+    if not retried:
+        return False
+    participation.provisioning_status = ProvisioningStatus.PROVISIONING
+    _enqueue_provisioning(participation.id)
+    return True
+
+
+def _enqueue_provisioning(participation_id):
+    from exam.tasks import provision_participation
+
+    cache.delete(READY_KEY.format(participation_id=participation_id))
+    queued_at = time.time()
+    transaction.on_commit(lambda: provision_participation.delay(participation_id, queued_at))
+
+
+def provisioning_deadline():
+    """Seconds a participation may wait for a provisioning slot before it is marked failed."""
+    return getattr(settings, 'QUIZ_PROVISIONING_DEADLINE', 60 * 30)
+
+
+def slot_retry_countdown(retries):
+    """Backoff between attempts to get a slot: 2, 4, 8 ... seconds up to 30, with jitter."""
+    return min(2 ** (retries + 1), 30) * random.uniform(0.8, 1.2)
+
+
+def acquire_provisioning_slot(quiz_id):
+    """
+    One of the ``QUIZ_PROVISIONING_CONCURRENCY`` slots of ``quiz_id``, or
+    ``None`` when all are taken. Slots expire on their own so a killed worker
+    cannot hold one forever.
+    """
+    for slot in range(max(1, getattr(settings, 'QUIZ_PROVISIONING_CONCURRENCY', 4))):
+        key = SLOT_KEY.format(quiz_id=quiz_id, slot=slot)
+        if cache.add(key, 1, SLOT_TIMEOUT):
+            return key
+    return None
+
+
+def release_provisioning_slot(key):
+    cache.delete(key)
+
+
+def mark_provisioned(participation_id, provisioning_status):
+    """Stores the outcome and announces it to waiting clients once it is committed."""
+    BaseParticipation.objects.filter(id=participation_id).update(provisioning_status=provisioning_status)
+    transaction.on_commit(lambda: cache.set(READY_KEY.format(participation_id=participation_id),
+                                            provisioning_status, READY_TIMEOUT))
+
+
+def wait_until_ready(participation_id, timeout, interval=0.25):
+    """
+    Long-polls the provisioning state of a participation for up to ``timeout``
+    seconds. The task announces the outcome in the cache, so the database is
+    read only at the start and at the end of the wait.
+    """
+    provisioning_status = (BaseParticipation.objects.filter(id=participation_id)
+                           .values_list('provisioning_status', flat=True).first())
+    if provisioning_status != ProvisioningStatus.PROVISIONING:
+        return provisioning_status
+
+    deadline = time.monotonic() + min(timeout, getattr(settings, 'QUIZ_READY_MAX_WAIT', 20))
+    key = READY_KEY.format(participation_id=participation_id)
+    while time.monotonic() < deadline:
+        if cache.get(key) is not None:
+            break
+        time.sleep(interval)
+    return (BaseParticipation.objects.filter(id=participation_id)
+            .values_list('provisioning_status', flat=True).first())
+
+
+def claim_creation(user_id, key):
+    """
+    Reserves a participation-creation key of a user. Returns ``(claimed,
+    participation_id)``: a repeated key either maps to the participation it
+    created or, while that request is still running, to ``None``.
+    """
+    cache_key = CREATE_KEY.format(user_id=user_id, key=key)
+    if cache.add(cache_key, PENDING, CREATE_LOCK_TIMEOUT):
+        return True, None
+    participation_id = cache.get(cache_key)
+    return False, participation_id or None
+
+
+def record_creation(user_id, key, participation_id):
+    cache.set(CREATE_KEY.format(user_id=user_id, key=key), participation_id, CREATE_TIMEOUT)
+
+
+def release_creation(user_id, key):
+    cache.delete(CREATE_KEY.format(user_id=user_id, key=key))
@@ -0,0 +1,208 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from exam.models import QuestionBankItem, MultipleChoiceQuestion
+from exam.services.answer_keys import remember_mc_answer_key
+from exam.services.graph_writer import bulk_insert_graph
+from exam.services.question_plan import lazy_questions_enabled, provision_planned_questions
+from exam.services.question_factory.multiple_choice.subtype_dispatcher import build_questions, \
+    generate_questions
+from exam.services.question_factory.multiple_choice.utils import divide_and_spread_remainder
+
+BANK_IDS_CACHE_KEY = 'exam:question_bank:{quiz_id}'
+BANK_LOCK_KEY = 'exam:question_bank:lock:{quiz_id}'
+BANK_IDS_TIMEOUT = 60 * 10
+BANK_PENDING_KEY = 'exam:question_bank:pending:{quiz_id}'
+# set while a rebuild is requested and no fill has taken it over yet
+BANK_REBUILD_KEY = 'exam:question_bank:rebuild:{quiz_id}'
+PENDING_TIMEOUT = 60 * 10
+
+
+def bank_target_size(quiz):
+    return (quiz.question_count or 0) * getattr(settings, 'QUIZ_QUESTION_BANK_FACTOR', 5)
+
+
+def acquire_bank_lock(quiz_id, timeout=60 * 10):
+    return cache.add(BANK_LOCK_KEY.format(quiz_id=quiz_id), 1, timeout)
+
+
+def release_bank_lock(quiz_id):
+    cache.delete(BANK_LOCK_KEY.format(quiz_id=quiz_id))
+
+
+def clear_bank_pending(quiz_id):
+    """Called as the task starts, so fills requested from here on schedule another run."""
+    cache.delete(BANK_PENDING_KEY.format(quiz_id=quiz_id))
+
+
+def request_bank_rebuild(quiz_id):
+    cache.set(BANK_REBUILD_KEY.format(quiz_id=quiz_id), 1, PENDING_TIMEOUT)
+
+
+def take_bank_rebuild(quiz_id):
+    """Whether a rebuild was requested since the last fill took one over; takes it over."""
+    return bool(cache.delete(BANK_REBUILD_KEY.format(quiz_id=quiz_id)))
+
+
+def bank_rebuild_requested(quiz_id):
+    return cache.get(BANK_REBUILD_KEY.format(quiz_id=quiz_id)) is not None
+
+
+def invalidate_bank_ids(quiz_id):
+    cache.delete(BANK_IDS_CACHE_KEY.format(quiz_id=quiz_id))
+
+
+@transaction.atomic
+def fill_question_bank(quiz, rebuild=False, max_rounds=3):
+    """
+    Generates bank items for ``quiz`` until the bank holds ``bank_target_size``
+    distinct questions (by template and title). Generation is repeated at most
+    ``max_rounds`` times when duplicates keep it short of the target.
+    Returns the number of items added.
+    """
+    if rebuild:
+        QuestionBankItem.objects.filter(quiz=quiz).delete()
+
+    seen = set(QuestionBankItem.objects.filter(quiz=quiz).values_list('template_id', 'title'))
+    target = bank_target_size(quiz)
+    added = 0
+
+    for _ in range(max_rounds):
+        need = target - len(seen)
+        if need <= 0:
+            break
+        result = build_questions(quiz, participation=None, question_count=need)
+
+        items = []
+        for question in result['questions']:
+            key = (question.template_id, question.title)
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append(QuestionBankItem(
+                quiz=quiz,
+                template_id=question.template_id,
+                title=question.title,
+                options=question.option_texts,
+                correct_option=question.correct_option,
+            ))
+        if not items:
+            break
+        QuestionBankItem.objects.bulk_create(items)
+        added += len(items)
+
+    transaction.on_commit(lambda: invalidate_bank_ids(quiz.id))
+    return added
+
+
+def get_bank_ids(quiz):
+    """``(item_id, subtype_id)`` pairs of the quiz bank, cached for a few minutes."""
+    key = BANK_IDS_CACHE_KEY.format(quiz_id=quiz.id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(QuestionBankItem.objects.filter(quiz=quiz).values_list('id', 'template__subtype_id'))
+        cache.set(key, ids, BANK_IDS_TIMEOUT)
+    return ids
+
+
+def sample_bank_ids(quiz, rng=None):
+    """
+    Picks ``quiz.question_count`` distinct bank items keeping the subtype mix of
+    the on-demand generator; subtypes short of items are topped up from the others.
+    Returns ``None`` when the bank is smaller than the quiz.
+    """
+    rng = rng or random.Random()
+    count = quiz.question_count or 0
+    ids = get_bank_ids(quiz)
+    if count <= 0 or len(ids) < count:
+        return None
+
+    by_subtype = defaultdict(list)
+    for item_id, subtype_id in ids:
+        by_subtype[subtype_id].append(item_id)
+    subtype_ids = list(by_subtype)
+    rng.shuffle(subtype_ids)
+
+    chosen = []
+    rest = []
+    for subtype_id, share in zip(subtype_ids, divide_and_spread_remainder(count, len(subtype_ids))):
+        pool = by_subtype[subtype_id]
+        rng.shuffle(pool)
+        chosen.extend(pool[:share])
+        rest.extend(pool[share:])
+    if len(chosen) < count:
+        chosen.extend(rng.sample(rest, count - len(chosen)))
+    rng.shuffle(chosen)
+    return chosen
+
+
+def draw_questions(quiz, participation, rng=None):
+    """
+    Links a random subset of the quiz bank to a multiple-choice participation,
+    shuffling the option order per participant. Returns the created questions,
+    or ``None`` when the bank cannot cover the quiz yet.
+    """
+    rng = rng or random.Random()
+    item_ids = sample_bank_ids(quiz, rng)
+    if item_ids is None:
+        return None
+
+    items = QuestionBankItem.objects.in_bulk(item_ids)
+    if len(items) < len(item_ids):
+        # the bank was rebuilt since the ids were cached
+        invalidate_bank_ids(quiz.id)
+        return None
+
+    questions = []
+    for position, item_id in enumerate(item_ids, start=1):
+        item = items[item_id]
+        order = list(range(len(item.options)))
+        rng.shuffle(order)
+        question = MultipleChoiceQuestion(title=item.title, template_id=item.template_id,
+                                          participation=participation, bank_item=item, position=position)
+        question.set_options([item.options[index] for index in order], order.index(item.correct_option - 1) + 1)
+        questions.append(question)
+
+    bulk_insert_graph(questions, ('participation_id', 'position'))
+    return questions
+
+
+def schedule_bank_fill(quiz_id, rebuild=False):
+    """
+    Fills the bank of a quiz in a celery task once the transaction commits.
+    Requests committed before the task starts share a single run; a rebuild is
+    recorded apart, so the run that fills next (or the one already running)
+    performs it.
+    """
+    from exam.tasks import fill_quiz_question_bank
+
+    def enqueue():
+        if rebuild:
+            request_bank_rebuild(quiz_id)
+        if cache.add(BANK_PENDING_KEY.format(quiz_id=quiz_id), 1, PENDING_TIMEOUT):
+            fill_quiz_question_bank.delay(quiz_id)
+
+    transaction.on_commit(enqueue)
+
+
+def provision_mc_questions(quiz, participation):
+    """
+    Questions for a new multiple-choice participation: only planned when
+    ``QUIZ_LAZY_MC_QUESTIONS`` is on, else drawn from the quiz bank when it is
+    large enough, otherwise generated on demand while the bank is topped up in
+    the background.
+    """
+    if lazy_questions_enabled():
+        return provision_planned_questions(quiz, participation)
+    questions = draw_questions(quiz, participation)
+    if questions is not None:
+        result = {'message': '', 'questions': questions}
+    else:
+        schedule_bank_fill(quiz.id)
+        result = generate_questions(quiz=quiz, participation=participation)
+    remember_mc_answer_key(participation, result['questions'])
+    return result
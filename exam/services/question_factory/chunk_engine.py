@@ -0,0 +1,50 @@
+from exam.services.graph_writer import bulk_insert_graph
+
+
+# item extractors: the items a verse contributes to the chunks, in order
+def verse_words(verse):
+    return [word.arabic_text for word in verse.prefetched_words]
+
+
+def verse_start(verse):
+    words = verse.prefetched_words
+    return [words[0].arabic_text] if words and words[0].word_number == 1 else []
+
+
+def verse_end(verse):
+    words = verse.prefetched_words
+    return [words[-1].arabic_text] if words else []
+
+
+def iter_chunks(verses, extract, chunk_size, split_at_verse=False):
+    """
+    Streams the items ``extract`` takes from consecutive ``verses`` in chunks
+    of at most ``chunk_size``. With ``split_at_verse`` a chunk never holds
+    items of two verses.
+    """
+    chunk = []
+    for verse in verses:
+        if split_at_verse and chunk:
+            yield chunk
+            chunk = []
+        for item in extract(verse):
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_chunks(model, quiz, chunks, build, version):
+    """
+    Saves one ``model`` row per chunk of content ``version``, numbered from
+    step 1, in a single bulk insert. ``build`` maps the items of a chunk to the
+    row's content fields; chunks it maps to ``None`` are left out.
+    """
+    rows = []
+    for items in chunks:
+        fields = build(items)
+        if fields is not None:
+            rows.append(model(quiz=quiz, version=version, step_index=len(rows) + 1, **fields))
+    return bulk_insert_graph(rows, ('quiz_id', 'version', 'step_index'))
@@ -1,92 +1,72 @@
+from collections import defaultdict
+
 import shortuuid
 
 from exam.models import Quiz, MatchingChunk
-from quran.models import Verse
+from exam.services.question_factory.chunk_engine import iter_chunks, write_chunks
+from exam.services.verse_window import get_verse_window
+from quran.models import Word
+
+
+def _verse_info(verse):
+    return f"{verse.verse_number} آیه {verse.surah.name}سوره "
+
+
+# subtype code -> (left, right) of a verse with the texts of its words
+PAIR_EXTRACTORS = {
+    9: lambda verse, words: (words[0], _verse_info(verse)),
+    10: lambda verse, words: (words[-1], _verse_info(verse)),
+    11: lambda verse, words: (words[0], words[-1]),
+}
 
 
 class MatchingChunkGenerator:
-    def __init__(self, quiz: Quiz, chunk_size: int = 5):
+    def __init__(self, quiz: Quiz, chunk_size: int = 5, version: int = None):
         subtype = quiz.subtypes.first()
-        if subtype.code not in [9, 10, 11]:
+        if subtype.code not in PAIR_EXTRACTORS:
             raise ValueError(f"Unsupported matching subtype: {subtype.code}")
         self.quiz = quiz
         self.subtype_code = subtype.code
         self.chunk_size = chunk_size
-
-        self.verses = (
-            Verse.objects
-            .filter(id__gte=quiz.start_verse.id, id__lte=quiz.end_verse.id)
-            .select_related('surah')
-            .prefetch_related('words')
-            .order_by('surah_id', 'verse_number')
-        )
-        self.words = {v.id: list(v.words.all()) for v in self.verses}
+        self.version = quiz.content_version if version is None else version
+        self.verses = get_verse_window(quiz)
+        self.words = None
+
+    def _load_words(self):
+        # words of every type, as matching has always used; the window only holds type 1 words
+        words = defaultdict(list)
+        rows = (Word.objects
+                .filter(verse_id__gte=self.quiz.start_verse_id, verse_id__lte=self.quiz.end_verse_id)
+                .order_by('verse_id', 'id')
+                .values_list('verse_id', 'arabic_text'))
+        for verse_id, arabic in rows.iterator(chunk_size=5000):
+            words[verse_id].append(arabic)
+        return words
 
     def _get_left_right_pair(self, verse):
-        words = self.words[verse.id]
+        words = self.words.get(verse.id)
         if not words:
-            return None, None
-
-        start_word = words[0].arabic_text
-        end_word = words[-1].arabic_text
-        verse_info = f"{verse.verse_number} آیه {verse.surah.name}سوره "
-
-        if self.subtype_code == 9:
-            return start_word, verse_info
-        elif self.subtype_code == 10:
-            return end_word, verse_info
-        elif self.subtype_code == 11:
-            return start_word, end_word
-        return None, None
+            return []
+        left_text, right_text = PAIR_EXTRACTORS[self.subtype_code](verse, words)
+        return [(left_text, right_text)] if left_text and right_text else []
+
+    @staticmethod
+    def _build_chunk(pairs):
+        # equal texts on a side share one id
+        left_items, right_items, correct_matches = [], [], []
+        left_ids, right_ids = {}, {}
+        for left_text, right_text in pairs:
+            if left_text not in left_ids:
+                left_ids[left_text] = str(shortuuid.uuid()[:8])
+            if right_text not in right_ids:
+                right_ids[right_text] = str(shortuuid.uuid()[:8])
+            left_id, right_id = left_ids[left_text], right_ids[right_text]
+            left_items.append({"id": left_id, "text": left_text})
+            right_items.append({"id": right_id, "text": right_text})
+            correct_matches.append([left_id, right_id])
+        return {'left_items': left_items, 'right_items': right_items, 'correct_matches': correct_matches}
 
     def generate(self):
-        verses = list(self.verses)
-        total_chunks = (len(verses) + self.chunk_size - 1) // self.chunk_size
-
-        chunks_to_create = []
-
-        for i in range(total_chunks):
-            chunk_verses = verses[i * self.chunk_size: (i + 1) * self.chunk_size]
-
-            left_items = []
-            right_items = []
-            left_text_to_id = {}
-            right_text_to_id = {}
-
-            correct_matches = []
-
-            for verse in chunk_verses:
-                left_text, right_text = self._get_left_right_pair(verse)
-                if not left_text or not right_text:
-                    continue
-
-                if left_text not in left_text_to_id:
-                    left_id = str(shortuuid.uuid()[:8])
-                    left_text_to_id[left_text] = left_id
-                    left_items.append({"id": left_id, "text": left_text})
-                else:
-                    left_id = left_text_to_id[left_text]
-                    left_text_to_id[left_text] = left_id
-                    left_items.append({"id": left_id, "text": left_text})
-
-                if right_text not in right_text_to_id:
-                    right_id = str(shortuuid.uuid()[:8])
-                    right_text_to_id[right_text] = right_id
-                    right_items.append({"id": right_id, "text": right_text})
-                else:
-                    right_id = right_text_to_id[right_text]
-                    right_text_to_id[right_text] = right_id
-                    right_items.append({"id": right_id, "text": right_text})
-
-                correct_matches.append([left_id, right_id])
-
-            if left_items and right_items:
-                chunks_to_create.append(MatchingChunk(
-                    quiz=self.quiz,
-                    step_index=i + 1,
-                    left_items=left_items,
-                    right_items=right_items,
-                    correct_matches=correct_matches,
-                ))
-
-        MatchingChunk.objects.bulk_create(chunks_to_create)
+        self.words = self._load_words()
+        chunks = iter_chunks(self.verses, self._get_left_right_pair, self.chunk_size)
+        write_chunks(MatchingChunk, self.quiz, chunks, self._build_chunk, self.version)
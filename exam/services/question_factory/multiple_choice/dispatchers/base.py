@@ -1,3 +1,6 @@
+import time
+
+from exam.services.question_factory.multiple_choice.generation_cost import record_generation_cost
 from exam.services.question_factory.multiple_choice.utils import divide_and_spread_remainder
 
 
@@ -5,12 +8,17 @@ class BaseSubtypeDispatcher:
     def __init__(self, generator_map):
         self.generator_map = generator_map
 
-    def dispatch(self, quiz, participation, templates, count, verses, subtype):
+    def get_generator(self, template):
+        factory = self.generator_map.get(template.code)
+        return factory() if factory else None
+
+    def dispatch(self, quiz, participation, templates, count, verses, subtype, rng=None):
         counts = divide_and_spread_remainder(count, len(templates))
 
         all_questions = []
         all_options = []
         all_messages = []
+        all_shortfalls = []
         leftover = 0
 
         for i, template in enumerate(templates):
@@ -26,7 +34,10 @@ class BaseSubtypeDispatcher:
             if not generator_fn:
                 all_messages.append(f"No generator for template {template.code}")
                 continue
+            if rng is not None:
+                generator_fn.rng = rng
 
+            started = time.perf_counter()
             result = generator_fn.generate(
                 quiz=quiz,
                 participation=participation,
@@ -39,17 +50,23 @@ class BaseSubtypeDispatcher:
             questions = result.get('questions', [])
             options = result.get('options', [])
             message = result.get('message', '')
+            shortfall = result.get('shortfall')
 
             generated = len(questions)
+            record_generation_cost(template.code, time.perf_counter() - started, generated)
             leftover = max(target_count - generated, 0)
 
             all_questions.extend(questions)
             all_options.extend(options)
+            if shortfall:
+                all_shortfalls.append(shortfall)
             all_messages.append(
-                message if message else f"{generated} questions generated for subtype: {subtype.code}, template: {template.code}", )
+                message or (str(shortfall) if shortfall else
+                            f"{generated} questions generated for subtype: {subtype.code}, template: {template.code}"))
 
         return {
             'message': all_messages,
             'questions': all_questions,
-            'options': all_options
+            'options': all_options,
+            'shortfalls': all_shortfalls,
         }
@@ -0,0 +1,92 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+COST_CACHE_KEY = 'exam:generation_cost:{template_code}'
+
+# weight of the newest measurement in the moving average
+SMOOTHING = 0.2
+
+_muted = 0
+
+
+@contextmanager
+def generation_cost_muted():
+    """Keeps generator runs in this process, worker threads included, out of the shared averages."""
+    global _muted
+    _muted += 1
+    try:
+        yield
+    finally:
+        _muted -= 1
+
+
+class GenerationCostBuffer:
+    """
+    Sums the generator runs of this process per template and folds them into
+    the shared averages at most every ``QUESTION_GENERATION_COST_FLUSH_SECONDS``,
+    so generating a quiz does not read and write the cache per template.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        # the first run of a process is published right away
+        self._flushed_at = float('-inf')
+
+    def add(self, template_code, seconds, generated):
+        interval = getattr(settings, 'QUESTION_GENERATION_COST_FLUSH_SECONDS', 60)
+        with self._lock:
+            totals = self._totals.setdefault(template_code, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += generated
+            if time.monotonic() - self._flushed_at < interval:
+                return
+            pending = self._take()
+        self._publish(pending)
+
+    def flush(self):
+        with self._lock:
+            pending = self._take()
+        self._publish(pending)
+
+    def _take(self):
+        pending, self._totals = self._totals, {}
+        self._flushed_at = time.monotonic()
+        return pending
+
+    @staticmethod
+    def _publish(pending):
+        if not pending:
+            return
+        keys = {COST_CACHE_KEY.format(template_code=code): code for code in pending}
+        previous = cache.get_many(list(keys))
+        averages = {}
+        for key, code in keys.items():
+            seconds, generated = pending[code]
+            per_question = seconds / generated
+            if key in previous:
+                per_question = previous[key] * (1 - SMOOTHING) + per_question * SMOOTHING
+            averages[key] = per_question
+        cache.set_many(averages, None)
+
+
+generation_costs = GenerationCostBuffer()
+
+
+def record_generation_cost(template_code, seconds, generated):
+    """Adds one generator run to the seconds per question of a template."""
+    if not generated or _muted:
+        return
+    generation_costs.add(template_code, seconds, generated)
+
+
+def seconds_per_question(template_codes):
+    """Measured seconds per question of each template, or ``QUESTION_GENERATION_SECONDS`` when never measured."""
+    default = getattr(settings, 'QUESTION_GENERATION_SECONDS', 0.01)
+    keys = {COST_CACHE_KEY.format(template_code=code): code for code in template_codes}
+    measured = cache.get_many(list(keys))
+    return {code: measured.get(key, default) for key, code in keys.items()}
@@ -0,0 +1,71 @@
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import django
+from django.conf import settings
+
+
+def generation_workers():
+    return getattr(settings, 'QUIZ_GENERATION_WORKERS', 0)
+
+
+def process_subtypes():
+    """Subtype codes whose generation is CPU-bound and runs in worker processes."""
+    return set(getattr(settings, 'QUIZ_GENERATION_PROCESS_SUBTYPES', (16, 17)))
+
+
+def _init_process_worker():
+    django.setup()
+
+
+class GenerationPools:
+    """
+    Process-wide executors for multiple-choice generation, created on first use
+    with ``QUIZ_GENERATION_WORKERS`` workers each. Worker processes are spawned
+    rather than forked so they open their own database connections. Inside
+    daemonic processes (Celery prefork workers), which cannot have children,
+    the thread pool is used for every subtype.
+    """
+
+    def __init__(self):
+        self._threads = None
+        self._processes = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def processes_allowed():
+        return not multiprocessing.current_process().daemon
+
+    def threads(self):
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=generation_workers(),
+                                                   thread_name_prefix='question-generation')
+            return self._threads
+
+    def processes(self):
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=generation_workers(),
+                                                      mp_context=multiprocessing.get_context('spawn'),
+                                                      initializer=_init_process_worker)
+            return self._processes
+
+    def discard_processes(self):
+        """Drops a broken process pool so the next call starts a fresh one."""
+        with self._lock:
+            pool, self._processes = self._processes, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            pools = (self._threads, self._processes)
+            self._threads = self._processes = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+
+generation_pools = GenerationPools()
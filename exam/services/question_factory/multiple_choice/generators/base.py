@@ -1,9 +1,14 @@
 import random
 
 from exam.models import MultipleChoiceQuestion, Option
+from ..providers.distractor_index_provider import distractor_index
+from ..sampling import IndexSampler, attempt_budget, no_candidates
 
 
 class BaseQuestionGenerator:
+    # source of randomness; a seeded ``random.Random`` makes ``generate`` reproducible
+    rng = random
+
     def generate(self, quiz, participation, template, count, verses, subtype):
         valid_verses = [
             (
@@ -16,55 +21,50 @@ class BaseQuestionGenerator:
         ]
 
         if not valid_verses:
-            return {'message': 'No valid verses found'}
+            return {'message': 'No valid verses found', 'shortfall': no_candidates(subtype, template, count)}
+
+        distractor_index.warm(verse.id for verse, _, _ in valid_verses)
 
-        generated = 0
-        used_indices = set()
         questions = []
         options_to_create = []
+        sampler = IndexSampler(len(valid_verses), self.rng, attempt_budget(count))
 
-        while generated < count:
-            available_indices = list(set(range(len(valid_verses))) - used_indices)
-            if not available_indices:
-                available_indices = list(range(len(valid_verses)))
-                used_indices.clear()
-            random.shuffle(available_indices)
-
-            for idx in available_indices:
-                if generated >= count:
-                    break
-                verse, words_list, translation = valid_verses[idx]
-                correct_option = self.get_correct_options(verse, words_list, translation)
-                wrong_options = self.get_wrong_options(verse, correct_option, valid_verses, words_list)
-                if len(wrong_options) < 3:
-                    continue
-                correct_index = random.randint(0, 3)
-                question_title = self.get_question_title(verse, words_list, translation)
-                question = MultipleChoiceQuestion(
-                    title=question_title,
-                    participation=participation,
-                    template=template
-                )
-                questions.append(question)
-                for i in range(4):
-                    is_correct = (i == correct_index)
-                    text = correct_option if is_correct else wrong_options.pop()
-                    options_to_create.append(
-                        Option(
-                            number=i + 1,
-                            text=text,
-                            is_correct=is_correct,
-                            question=question
-                        )
+        for idx in sampler:
+            verse, words_list, translation = valid_verses[idx]
+            correct_option = self.get_correct_options(verse, words_list, translation)
+            wrong_options = self.get_wrong_options(verse, correct_option, valid_verses, words_list)
+            if len(wrong_options) < 3:
+                continue
+            correct_index = self.rng.randint(0, 3)
+            question_title = self.get_question_title(verse, words_list, translation)
+            question = MultipleChoiceQuestion(
+                title=question_title,
+                participation=participation,
+                template=template
+            )
+            questions.append(question)
+            for i in range(4):
+                is_correct = (i == correct_index)
+                text = correct_option if is_correct else wrong_options.pop()
+                options_to_create.append(
+                    Option(
+                        number=i + 1,
+                        text=text,
+                        is_correct=is_correct,
+                        question=question
                     )
-                used_indices.add(idx)
-                generated += 1
+                )
+            sampler.accept()
+            if sampler.accepted >= count:
+                break
 
+        shortfall = sampler.shortfall(subtype, template, count)
         if not questions:
             return {
-                'message': f'No questions generated for subtype: {subtype.code}, template: {template.code} due to insufficient valid options'}
+                'message': f'No questions generated for subtype: {subtype.code}, template: {template.code} due to insufficient valid options',
+                'shortfall': shortfall}
 
-        return {'questions': questions, 'options': options_to_create}
+        return {'questions': questions, 'options': options_to_create, 'shortfall': shortfall}
 
     def get_wrong_options(self, verse, correct_option, valid_verses, words_list):
         raise NotImplementedError()
@@ -1,4 +1,6 @@
+from exam.choices import DistractorKind
 from .base import BaseQuestionGenerator
+from ..providers.distractor_index_provider import distractor_index
 
 
 class VerseFirstWordGenerator(BaseQuestionGenerator):
@@ -18,6 +20,14 @@ class VerseFirstWordGenerator(BaseQuestionGenerator):
     def get_wrong_options(self, verse, correct_option, valid_verses, words_list):
         wrong_options = {'arabic': [], 'clean': []}
 
+        indexed = distractor_index.get_words(verse.id, DistractorKind.FIRST_WORD,
+                                             exclude_clean={words_list[0]['clean']}, rng=self.rng)
+        for arabic, clean in indexed:
+            wrong_options['arabic'].append(arabic)
+            wrong_options['clean'].append(clean)
+        if len(wrong_options['arabic']) >= 3:
+            return wrong_options['arabic'][:3]
+
         nearby_verses = [
             (v, words, _) for v, words, _ in valid_verses
             if v.id != verse.id and verse.id - 5 <= v.id <= verse.id + 5
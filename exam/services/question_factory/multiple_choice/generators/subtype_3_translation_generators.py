@@ -1,7 +1,9 @@
-import random
-
+from exam.choices import DistractorKind
+from exam.services.random_sampler import random_sampler
 from quran.models import Verse
+from quran.services.verse_strings import get_verse_strings, make_verse_strings
 from .base import BaseQuestionGenerator
+from ..providers.distractor_index_provider import distractor_index
 
 
 class VerseToTranslationGenerator(BaseQuestionGenerator):
@@ -14,7 +16,7 @@ class VerseToTranslationGenerator(BaseQuestionGenerator):
         if self.ask_from_number:
             question_title = question_title + f' سوره {verse.surah.name} آيه {verse.verse_number} '
         else:
-            question_title = question_title + ' '.join(word['arabic'] for word in words_list)
+            question_title = question_title + verse.strings.text
         return question_title
 
     def get_correct_options(self, verse, words_list, translation):
@@ -22,11 +24,16 @@ class VerseToTranslationGenerator(BaseQuestionGenerator):
 
     def get_wrong_options(self, verse, correct_option, valid_verses, words_list):
         wrong_options = []
+        for record in distractor_index.get_verses(verse.id, DistractorKind.TRANSLATION, require='translation',
+                                                  rng=self.rng):
+            if record['translation'] != correct_option and record['translation'] not in wrong_options:
+                wrong_options.append(record['translation'])
+
         attempts = 0
         max_attempts = len(valid_verses) + 10
 
         while len(wrong_options) < 3 and attempts < max_attempts:
-            idx = random.randint(0, len(valid_verses) - 1)
+            idx = self.rng.randint(0, len(valid_verses) - 1)
             other_verse, _, other_translation = valid_verses[idx]
             if (
                     other_verse.id != verse.id
@@ -39,7 +46,8 @@ class VerseToTranslationGenerator(BaseQuestionGenerator):
 
         if len(wrong_options) < 3:
             need_count = 3 - len(wrong_options)
-            extra_translations = self.extra_translations_provider.get_extra_translations(verse.id, need_count)
+            extra_translations = self.extra_translations_provider.get_extra_translations(verse.id, need_count,
+                                                                                         rng=self.rng)
             wrong_options.extend([t for t in extra_translations if t != correct_option and t not in wrong_options])
 
         return wrong_options[:3]
@@ -53,20 +61,26 @@ class TranslationToVerseGenerator(BaseQuestionGenerator):
         return f'متن زیر ترجمه کدام آیه است؟ {translation}'
 
     def get_correct_options(self, verse, words_list, translation):
-        return f' آیه{verse.verse_number} سوره {verse.surah.name}' if self.options_from_number else ' '.join(
-            word['arabic'] for word in words_list)
+        return verse.strings.reference_fa if self.options_from_number else verse.strings.text
 
     def get_wrong_options(self, verse, correct_option, valid_verses, words_list):
         wrong_options = []
+        kind = DistractorKind.VERSE_REFERENCE if self.options_from_number else DistractorKind.VERSE_TEXT
+        for record in distractor_index.get_verses(verse.id, kind, require=None if self.options_from_number else 'text',
+                                                  rng=self.rng):
+            temp_wrong = record['reference_fa'] if self.options_from_number else record['text']
+            if temp_wrong != correct_option and temp_wrong not in wrong_options:
+                wrong_options.append(temp_wrong)
+
         attempts = 0
         max_attempts = len(valid_verses) + 10
 
         while len(wrong_options) < 3 and attempts < max_attempts:
-            idx = random.randint(0, len(valid_verses) - 1)
-            other_verse, other_words, _ = valid_verses[idx]
+            idx = self.rng.randint(0, len(valid_verses) - 1)
+            other_verse, _, _ = valid_verses[idx]
             if other_verse.id != verse.id:
-                temp_wrong = f'آیه {other_verse.verse_number} سوره {other_verse.surah.name}' if self.options_from_number else ' '.join(
-                    word['arabic'] for word in other_words)
+                temp_wrong = other_verse.strings.reference_fa if self.options_from_number else \
+                    other_verse.strings.text
                 if temp_wrong != correct_option and temp_wrong not in wrong_options:
                     wrong_options.append(temp_wrong)
             attempts += 1
@@ -76,12 +90,13 @@ class TranslationToVerseGenerator(BaseQuestionGenerator):
             if self.options_from_number:
                 max_verse_number = max(v[0].verse_number for v in valid_verses)
                 extra_options = [
-                    f'آیه {max_verse_number + i + 1} سوره {verse.surah.name}'
+                    make_verse_strings((), verse.surah.name, max_verse_number + i + 1).reference_fa
                     for i in range(need_count)
                 ]
             else:
-                extra_verses = Verse.objects.exclude(id=verse.id).order_by('?')[:need_count]
-                extra_options = [' '.join(w.arabic_text for w in v.words.order_by('word_number')) for v in extra_verses]
+                ids = random_sampler.sample(Verse, need_count, exclude={verse.id}, rng=self.rng)
+                strings = get_verse_strings(ids)
+                extra_options = [strings[extra_id].text for extra_id in ids if extra_id in strings]
             wrong_options.extend([opt for opt in extra_options if opt != correct_option and opt not in wrong_options])
 
         return wrong_options[:3]
@@ -1,6 +1,6 @@
-import random
-
+from exam.choices import DistractorKind
 from .base import BaseQuestionGenerator
+from ..providers.distractor_index_provider import distractor_index
 
 
 class VerseDetailsGenerator(BaseQuestionGenerator):
@@ -12,36 +12,34 @@ class VerseDetailsGenerator(BaseQuestionGenerator):
         if self.ask_from_number:
             return f' سوره آیه مرتبط با شماره زیر را انتخاب کنید{verse.surah.name} آيه {verse.verse_number}'
         else:
-            return f'شماره آیه زیر چند است؟{" ".join(word['arabic'] for word in words_list)}'
+            return f'شماره آیه زیر چند است؟{verse.strings.text}'
 
     def get_correct_options(self, verse, words_list, translation):
-        return (
-            ' '.join(word['arabic'] for word in words_list)
-            if self.ask_from_number
-            else str(f" سوره {verse.surah.name} آيه {verse.verse_number}")
-        )
+        return verse.strings.text if self.ask_from_number else verse.strings.reference_ar
 
     def get_wrong_options(self, verse, correct_option, valid_verses, words_list):
         wrong_options = []
+        kind = DistractorKind.VERSE_TEXT if self.ask_from_number else DistractorKind.VERSE_REFERENCE
+        for record in distractor_index.get_verses(verse.id, kind, require='text' if self.ask_from_number else None,
+                                                  rng=self.rng):
+            temp = record['text'] if self.ask_from_number else record['reference_ar']
+            if temp != correct_option and temp not in wrong_options:
+                wrong_options.append(temp)
+
         attempts = 0
         max_attempts = len(valid_verses) + 10
 
         while len(wrong_options) < 3 and attempts < max_attempts:
-            idx = random.randint(0, len(valid_verses) - 1)
-            other_verse, other_words, _ = valid_verses[idx]
+            attempts += 1
+            idx = self.rng.randint(0, len(valid_verses) - 1)
+            other_verse, _, _ = valid_verses[idx]
             if other_verse.id == verse.id:
                 continue
 
-            temp = (
-                ' '.join(word['arabic'] for word in other_words)
-                if self.ask_from_number
-                else str(f" سوره {other_verse.surah.name} آيه {other_verse.verse_number}")
-            )
+            temp = other_verse.strings.text if self.ask_from_number else other_verse.strings.reference_ar
             if temp != correct_option and temp not in wrong_options:
                 wrong_options.append(temp)
 
-            attempts += 1
-
         if len(wrong_options) < 3:
             need_count = 3 - len(wrong_options)
             excludes = wrong_options.copy()
@@ -50,7 +48,8 @@ class VerseDetailsGenerator(BaseQuestionGenerator):
                 exclude=excludes,
                 count=need_count,
                 type='text' if self.ask_from_number else 'number',
-                verse_id=verse.id
+                verse_id=verse.id,
+                rng=self.rng,
             )
             wrong_options.extend([e for e in extras if e not in wrong_options])
 
@@ -1,12 +1,11 @@
+from exam.services.random_sampler import random_sampler
 from quran.models import VerseTranslation
 
 
 class DatabaseExtraTranslationProvider:
-    def get_extra_translations(self, verse_id, need_count=3):
-        queryset = VerseTranslation.objects.filter(
-            translator_id=5
-        ).exclude(
-            verse_id=verse_id
-        ).order_by('?')[:need_count].values_list('text', flat=True)
-
-        return queryset
+    def get_extra_translations(self, verse_id, need_count=3, rng=None):
+        # one extra row in case the verse's own translation is drawn
+        ids = random_sampler.sample(VerseTranslation, need_count + 1, rng=rng, translator_id=5)
+        rows = VerseTranslation.objects.filter(id__in=ids).values_list('id', 'verse_id', 'text')
+        texts = {pk: text for pk, row_verse_id, text in rows if row_verse_id != verse_id}
+        return [texts[pk] for pk in ids if pk in texts][:need_count]
@@ -1,46 +1,32 @@
+from exam.services.random_sampler import random_sampler
 from quran.models import Verse
+from quran.services.verse_strings import get_verse_strings
 
 
 class DatabaseExtraVerseDetailsProvider:
-    def get_extras(self, exclude, count, verse_id, type='text'):
+    def get_extras(self, exclude, count, verse_id, type='text', rng=None):
         if type == 'number':
-            verses = (
-                Verse.objects
-                .select_related('surah')
-                .filter(id_gte=verse_id - 10, id_lte=verse_id + 10)
-                .exclude(id=verse_id)
-                .order_by('?')[:count * 2]
-            )
-            result = []
-            for v in verses:
-                text = f" سوره {v.surah.name} آيه {v.verse_number}"
-                if text not in exclude and text not in result:
-                    print(exclude, text)
-                    result.append(text)
-                if len(result) >= count:
-                    break
-            return result
-
+            ids = random_sampler.sample_range(Verse, verse_id - 10, verse_id + 10, count * 2,
+                                              exclude={verse_id}, rng=rng)
+            field = 'reference_ar'
         elif type == 'text':
-            verses = (
-                Verse.objects
-                .prefetch_related('words')
-                .order_by('?')[:count * 2]
-            )
-            result = []
-            for v in verses:
-                text = ' '.join(
-                    w.arabic_text for w in sorted(v.words.all(), key=lambda w: w.word_number)
-                )
-                if text and text != exclude and text not in result:
-                    result.append(text)
-                if len(result) >= count:
-                    break
-            return result
-
+            ids = random_sampler.sample(Verse, count * 2, rng=rng)
+            field = 'text'
         else:
             raise ValueError("Unsupported type passed to get_extras(): must be 'text' or 'number'")
 
+        strings = get_verse_strings(ids)
+        result = []
+        for extra_id in ids:
+            if extra_id not in strings:
+                continue
+            text = getattr(strings[extra_id], field)
+            if text and text not in exclude and text not in result:
+                result.append(text)
+            if len(result) >= count:
+                break
+        return result
+
 
 class DatabaseExtraVerseProvider:
     def __init__(self, exclude_ids=None, max_count=20):
@@ -51,7 +37,7 @@ class DatabaseExtraVerseProvider:
         queryset = (
             Verse.objects
             .exclude(id__in=self.exclude_ids)
-            .values_list('text', flat=True)
-            .distinct()[:self.max_count]
+            .order_by('id')
+            .values_list('text__full_tashkeel', flat=True)[:self.max_count]
         )
         return list(queryset)
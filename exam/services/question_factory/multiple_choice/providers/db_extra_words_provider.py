@@ -1,6 +1,5 @@
-from difflib import SequenceMatcher
-
-from quran.models import Word, WordSearchTableMV
+from quran.models import Word
+from .similarity_index import word_similarity_index
 
 
 class DatabaseExtraWordsProvider:
@@ -18,50 +17,34 @@ class DatabaseExtraWordsProvider:
         )
 
         ordering = '-word_number' if reverse_ordering else 'word_number'
-        queryset = queryset.order_by(ordering).values_list('arabic_text', 'clean_arabic_text')
+        # ties are broken by id so that seeded generation picks the same words again
+        queryset = queryset.order_by(ordering, 'id').values_list('arabic_text', 'clean_arabic_text')
 
         return list(queryset[:need_count])
 
 
 class HardStartWordProvider:
-    def __init__(self):
-        self.mv_cache = None
-
-    def _get_mv_cache(self, exclude_verse_id=None):
-        if self.mv_cache is None:
-            self.mv_cache = {
-                row.verse_id: row
-                for row in WordSearchTableMV.objects.exclude(verse_id=exclude_verse_id)
-            }
-        return self.mv_cache
+    def __init__(self, index=None):
+        self.index = index or word_similarity_index
 
     def get_similar_first_words(self, verse_id, correct_word, second_word='', third_word='', need_count=3):
         wrong_words = {'arabic': [], 'clean': []}
-        mv_cache = self._get_mv_cache(exclude_verse_id=verse_id)
 
-        for row in mv_cache.values():
-            if second_word and row.second_word_clean != second_word:
-                continue
-            if third_word and row.third_word_clean != third_word:
+        for row_verse_id, arabic, clean in self.index.exact('first', second_word, third_word):
+            if row_verse_id == verse_id:
                 continue
-            if (
-                    row.first_word_clean
-                    and row.first_word_clean != correct_word
-                    and row.first_word_clean not in wrong_words['clean']
-            ):
-                wrong_words['clean'].append(row.first_word_clean)
-                wrong_words['arabic'].append(row.first_word)
+            if clean and clean != correct_word and clean not in wrong_words['clean']:
+                wrong_words['clean'].append(clean)
+                wrong_words['arabic'].append(arabic)
             if len(wrong_words['arabic']) >= need_count:
                 break
 
         if len(wrong_words['arabic']) < need_count:
-            for row in mv_cache.values():
-                if row.first_word_clean in wrong_words['clean'] or not row.first_word_clean:
+            for arabic, clean in self.index.similar('first', correct_word):
+                if clean in wrong_words['clean']:
                     continue
-                similarity = SequenceMatcher(None, row.first_word_clean, correct_word).ratio()
-                if similarity >= 0.7 and row.first_word_clean != correct_word:
-                    wrong_words['clean'].append(row.first_word_clean)
-                    wrong_words['arabic'].append(row.first_word)
+                wrong_words['clean'].append(clean)
+                wrong_words['arabic'].append(arabic)
                 if len(wrong_words['arabic']) >= need_count:
                     break
 
@@ -69,44 +52,27 @@ class HardStartWordProvider:
 
 
 class HardEndWordProvider:
-    def __init__(self):
-        self.mv_cache = None
-
-    def _get_mv_cache(self, exclude_verse_id=None):
-        if self.mv_cache is None:
-            self.mv_cache = {
-                row.verse_id: row
-                for row in WordSearchTableMV.objects.exclude(verse_id=exclude_verse_id)
-            }
-        return self.mv_cache
+    def __init__(self, index=None):
+        self.index = index or word_similarity_index
 
     def get_similar_last_words(self, verse_id, correct_word, second_last_word='', third_last_word='', need_count=3):
         wrong_words = {'arabic': [], 'clean': []}
-        mv_cache = self._get_mv_cache(exclude_verse_id=verse_id)
 
-        for row in mv_cache.values():
-            if second_last_word and row.second_word_clean != second_last_word:
-                continue
-            if third_last_word and row.third_word_clean != third_last_word:
+        for row_verse_id, arabic, clean in self.index.exact('last', second_last_word, third_last_word):
+            if row_verse_id == verse_id:
                 continue
-            if (
-                    row.last_word_clean
-                    and row.last_word_clean != correct_word
-                    and row.last_word_clean not in wrong_words['clean']
-            ):
-                wrong_words['clean'].append(row.last_word_clean)
-                wrong_words['arabic'].append(row.last_word)
+            if clean and clean != correct_word and clean not in wrong_words['clean']:
+                wrong_words['clean'].append(clean)
+                wrong_words['arabic'].append(arabic)
             if len(wrong_words['arabic']) >= need_count:
                 break
 
         if len(wrong_words['arabic']) < need_count:
-            for row in mv_cache.values():
-                if row.last_word_clean in wrong_words['clean'] or not row.last_word_clean:
+            for arabic, clean in self.index.similar('last', correct_word):
+                if clean in wrong_words['clean']:
                     continue
-                similarity = SequenceMatcher(None, row.last_word_clean, correct_word).ratio()
-                if similarity >= 0.7 and row.last_word_clean != correct_word:
-                    wrong_words['clean'].append(row.last_word_clean)
-                    wrong_words['arabic'].append(row.last_word)
+                wrong_words['clean'].append(clean)
+                wrong_words['arabic'].append(arabic)
                 if len(wrong_words['arabic']) >= need_count:
                     break
 
@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+
+from exam.choices import DistractorKind
+from exam.models import DistractorIndex
+from exam.services.corpus_generation import corpus_generation
+from exam.services.distractor_index import TRANSLATOR_ID
+from quran.models import Verse, VerseTranslation
+from quran.services.verse_strings import get_verse_strings
+
+
+class DistractorIndexProvider:
+    """
+    Process-wide view of the precomputed ``DistractorIndex``.
+
+    ``warm`` loads the index rows of a verse range and everything their
+    candidates point at (verse strings, reference, translation) in a fixed
+    number of queries; lookups afterwards are dictionary reads plus sampling.
+    Loaded entries expire after ``ttl`` seconds, and all of them once the corpus
+    generation moves, so a rebuilt index is picked up.
+    """
+
+    def __init__(self, ttl=60 * 30):
+        self.ttl = ttl
+        self._entries = {}
+        self._records = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _check_generation(self):
+        generation = corpus_generation.current()
+        if generation != self._generation:
+            with self._lock:
+                self._entries.clear()
+                self._records.clear()
+                self._generation = generation
+
+    def warm(self, verse_ids):
+        self._check_generation()
+        now = time.monotonic()
+        verse_ids = {verse_id for verse_id in verse_ids
+                     if self._entries.get(verse_id, (0, None))[0] <= now}
+        if not verse_ids:
+            return
+
+        entries = {verse_id: {} for verse_id in verse_ids}
+        for verse_id, kind, candidates in (DistractorIndex.objects
+                                           .filter(verse_id__in=verse_ids)
+                                           .values_list('verse_id', 'kind', 'candidates')):
+            entries[verse_id][kind] = candidates
+
+        referenced = {
+            candidate
+            for kinds in entries.values()
+            for kind, candidates in kinds.items()
+            if kind not in (DistractorKind.FIRST_WORD, DistractorKind.LAST_WORD)
+            for candidate in candidates
+        }
+        missing = {verse_id for verse_id in referenced
+                   if self._records.get(verse_id, (0, None))[0] <= now}
+        records = self._load_records(missing) if missing else {}
+
+        expires = now + self.ttl
+        with self._lock:
+            for verse_id, kinds in entries.items():
+                self._entries[verse_id] = (expires, kinds)
+            for verse_id, record in records.items():
+                self._records[verse_id] = (expires, record)
+
+    def _load_records(self, verse_ids):
+        strings = get_verse_strings(verse_ids)
+        translations = dict(VerseTranslation.objects.filter(translator_id=TRANSLATOR_ID, verse_id__in=verse_ids)
+                            .values_list('verse_id', 'text'))
+        records = {}
+        for verse_id, full_tashkeel, surah_name, verse_number in (
+                Verse.objects.filter(id__in=verse_ids)
+                .values_list('id', 'text__full_tashkeel', 'surah__name', 'verse_number')):
+            verse_strings = strings[verse_id]
+            records[verse_id] = {
+                'id': verse_id,
+                'text': verse_strings.text,
+                'reference_fa': verse_strings.reference_fa,
+                'reference_ar': verse_strings.reference_ar,
+                'full_tashkeel': full_tashkeel,
+                'surah_name': surah_name,
+                'verse_number': verse_number,
+                'translation': translations.get(verse_id),
+            }
+        return records
+
+    def _candidates(self, verse_id, kind):
+        self._check_generation()
+        entry = self._entries.get(verse_id)
+        if entry is None:
+            self.warm([verse_id])
+            entry = self._entries.get(verse_id)
+        return entry[1].get(kind, []) if entry else []
+
+    @staticmethod
+    def _sample(candidates, need_count, rng=None, spread=2):
+        """Random ``need_count`` picks among the ``need_count * spread`` best ranked candidates, kept in rank order."""
+        top = candidates[:need_count * spread]
+        if len(top) <= need_count:
+            return list(top)
+        picked = sorted((rng or random).sample(range(len(top)), need_count))
+        return [top[i] for i in picked]
+
+    def get_words(self, verse_id, kind, exclude_clean=(), need_count=3, rng=None):
+        """``(arabic, clean)`` distractors for a first/last word question."""
+        candidates = [tuple(c) for c in self._candidates(verse_id, kind) if c[1] not in exclude_clean]
+        return self._sample(candidates, need_count, rng)
+
+    def get_verses(self, verse_id, kind, need_count=3, exclude_ids=(), require=None, rng=None):
+        """
+        Records (``text``, ``reference_fa``, ``reference_ar``, ``full_tashkeel``,
+        ``surah_name``, ``verse_number``, ``translation``) of distractor verses; ``require`` drops records whose
+        given key is empty.
+        """
+        records = []
+        for candidate in self._candidates(verse_id, kind):
+            if candidate in exclude_ids:
+                continue
+            record = self._records.get(candidate)
+            if record is None or (require and not record[1].get(require)):
+                continue
+            records.append(record[1])
+        return self._sample(records, need_count, rng)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._records.clear()
+
+
+distractor_index = DistractorIndexProvider()
@@ -0,0 +1,193 @@
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+from exam.services.corpus_generation import corpus_generation
+from quran.models import WordSearchTableMV
+
+
+def _letters(word):
+    """The letters of ``word`` numbered by occurrence, so shared multisets become shared sets."""
+    seen = Counter()
+    letters = []
+    for letter in word:
+        seen[letter] += 1
+        letters.append((letter, seen[letter]))
+    return letters
+
+
+def _shared_letters(threshold, la, lb):
+    """Letters two words of lengths ``la`` and ``lb`` share at least when their ratio reaches ``threshold``."""
+    return math.ceil(threshold * (la + lb) / 2 - 1e-9)
+
+
+class _BoundaryWords:
+    """First or last words of every verse, bucketed by the two words next to them."""
+
+    def __init__(self):
+        self.entries = []
+        self.by_pair = defaultdict(list)
+        self.by_second = defaultdict(list)
+        self.by_third = defaultdict(list)
+        # distinct clean words in first-appearance order -> arabic form
+        self.vocabulary = {}
+        self.positions = {}
+        self.by_length = defaultdict(list)
+        # numbered letter -> word length -> vocabulary words indexed under it, and the rarity rank of each letter
+        self.by_letter = defaultdict(lambda: defaultdict(list))
+        self.letter_rank = {}
+        self.index_threshold = None
+        self.similar_cache = {}
+
+    def add(self, verse_id, arabic, clean, second, third):
+        entry = (verse_id, arabic, clean)
+        self.entries.append(entry)
+        self.by_pair[(second, third)].append(entry)
+        self.by_second[second].append(entry)
+        self.by_third[third].append(entry)
+        if clean and clean not in self.vocabulary:
+            self.vocabulary[clean] = arabic
+            self.positions[clean] = len(self.positions)
+            self.by_length[len(clean)].append(clean)
+
+    def build_letter_index(self, threshold):
+        """
+        Indexes every vocabulary word under the rarest letters it must share with
+        any word that reaches ``threshold`` against it; called once every word is added.
+        """
+        frequency = Counter(letter for clean in self.vocabulary for letter in _letters(clean))
+        ranked = sorted(frequency, key=lambda letter: (frequency[letter], letter))
+        self.letter_rank = {letter: rank for rank, letter in enumerate(ranked)}
+        self.index_threshold = threshold
+        for clean in self.vocabulary:
+            length = len(clean)
+            # the shortest word that can still reach the threshold asks for the fewest shared letters
+            shortest = max(1, math.ceil(threshold * length / (2 - threshold) - 1e-9))
+            for letter in self._rarest(clean, _shared_letters(threshold, shortest, length)):
+                self.by_letter[letter][length].append(clean)
+
+    def _rarest(self, word, required):
+        """The rarest letters of ``word``; a word sharing ``required`` letters with it has one of them."""
+        letters = sorted(_letters(word), key=lambda letter: self.letter_rank.get(letter, -1))
+        return letters if required <= 0 else letters[:len(word) - required + 1]
+
+    def candidates(self, word, lengths, threshold):
+        """
+        Vocabulary words of the given lengths that can reach ``threshold``.
+        ``SequenceMatcher`` only matches equal letters, so two words reaching it
+        share ``_shared_letters`` letters. The ``len - shared + 1`` rarest letters
+        of each of them then hold a shared one, so only those are indexed and
+        probed.
+        """
+        if threshold != self.index_threshold:
+            return [candidate for length in lengths for candidate in self.by_length[length]]
+        found = set()
+        for length in lengths:
+            for letter in self._rarest(word, _shared_letters(threshold, len(word), length)):
+                found.update(self.by_letter[letter].get(length, ()))
+        return found
+
+    def exact(self, second, third):
+        if second and third:
+            return self.by_pair.get((second, third), [])
+        if second:
+            return self.by_second.get(second, [])
+        if third:
+            return self.by_third.get(third, [])
+        return self.entries
+
+    def similar(self, word, threshold):
+        cached = self.similar_cache.get(word)
+        if cached is not None:
+            return cached
+
+        # ratio = 2M / (la + lb) <= 2 * min(la, lb) / (la + lb) bounds the usable lengths
+        length = len(word)
+        lengths = [l for l in self.by_length if 2 * min(l, length) >= threshold * (l + length)]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        matches = []
+        for candidate in (self.candidates(word, lengths, threshold) if lengths else ()):
+            if candidate == word:
+                continue
+            matcher.set_seq1(candidate)
+            if (matcher.real_quick_ratio() >= threshold
+                    and matcher.quick_ratio() >= threshold
+                    and matcher.ratio() >= threshold):
+                matches.append(candidate)
+        matches.sort(key=self.positions.__getitem__)
+
+        result = [(self.vocabulary[clean], clean) for clean in matches]
+        self.similar_cache[word] = result
+        return result
+
+
+class WordSimilarityIndex:
+    """
+    Process-wide index over the first/last words of ``WordSearchTableMV``.
+
+    The view is read with one query once per ``ttl``, and again as soon as the
+    corpus generation moves (see ``exam.services.corpus_generation``). Exact lookups go through
+    buckets keyed by the second/third (or second-last/third-last) word.
+    Approximate lookups return every word whose ``SequenceMatcher`` ratio to
+    the given word is at least ``threshold``. Candidates come from an inverted
+    index of letters (see ``_BoundaryWords.candidates``) and a length bound
+    before the matcher's ratios run, and results are memoised per word, so
+    repeated lookups are dictionary reads.
+    """
+
+    threshold = 0.7
+
+    def __init__(self, ttl=60 * 60 * 6):
+        self.ttl = ttl
+        self._sides = None
+        self._expires = 0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def _stale(self, generation):
+        return self._sides is None or self._expires <= time.monotonic() or self._generation != generation
+
+    def _get_side(self, side):
+        generation = corpus_generation.current()
+        if self._stale(generation):
+            with self._lock:
+                if self._stale(generation):
+                    self._sides = self._load()
+                    self._expires = time.monotonic() + self.ttl
+                    self._generation = generation
+        return self._sides[side]
+
+    def _load(self):
+        first, last = _BoundaryWords(), _BoundaryWords()
+        rows = WordSearchTableMV.objects.order_by('verse_id').values_list(
+            'verse_id',
+            'first_word', 'first_word_clean', 'second_word_clean', 'third_word_clean',
+            'last_word', 'last_word_clean', 'second_last_word_clean', 'third_last_word_clean',
+        )
+        for verse_id, f_arabic, f_clean, second, third, l_arabic, l_clean, second_last, third_last in rows:
+            first.add(verse_id, f_arabic, f_clean, second, third)
+            last.add(verse_id, l_arabic, l_clean, second_last, third_last)
+        first.build_letter_index(self.threshold)
+        last.build_letter_index(self.threshold)
+        return {'first': first, 'last': last}
+
+    def exact(self, side, second='', third=''):
+        """``(verse_id, arabic, clean)`` of verses whose neighbouring words match, in verse order."""
+        return self._get_side(side).exact(second, third)
+
+    def similar(self, side, word):
+        """``(arabic, clean)`` of distinct words similar to ``word``, in verse order."""
+        if not word:
+            return []
+        return self._get_side(side).similar(word, self.threshold)
+
+    def invalidate(self):
+        with self._lock:
+            self._sides = None
+
+
+word_similarity_index = WordSimilarityIndex()
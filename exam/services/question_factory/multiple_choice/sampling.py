@@ -0,0 +1,90 @@
+from dataclasses import dataclass, asdict
+
+# attempts a generator may spend per requested question before giving up
+ATTEMPTS_PER_QUESTION = 5
+
+NO_CANDIDATES = 'no_candidates'
+INFEASIBLE = 'infeasible'
+BUDGET_EXHAUSTED = 'budget_exhausted'
+
+
+@dataclass
+class Shortfall:
+    """Why a generator produced fewer questions than requested."""
+    subtype: int
+    template: int
+    requested: int
+    generated: int
+    attempts: int
+    reason: str
+
+    def as_dict(self):
+        return asdict(self)
+
+    def __str__(self):
+        return (f'{self.generated}/{self.requested} questions generated for subtype: {self.subtype}, '
+                f'template: {self.template} ({self.reason} after {self.attempts} attempts)')
+
+
+class IndexSampler:
+    """
+    Draws candidate indices ``0..size-1`` for a generator in random order.
+
+    The indices are shuffled once into a permutation that is read with a
+    cursor; when it is used up it is reshuffled in place, so every index is
+    tried once per pass and nothing is allocated while sampling. Iteration
+    stops after ``budget`` draws, or at the end of a pass in which no draw was
+    accepted with ``accept()``, since another pass over the same candidates
+    would fail the same way.
+    """
+
+    def __init__(self, size, rng, budget):
+        self.size = size
+        self.rng = rng
+        self.budget = budget
+        self.attempts = 0
+        self.accepted = 0
+        self.infeasible = False
+        self._order = list(range(size))
+        self._cursor = size
+        self._pass_accepted = 0
+
+    def __iter__(self):
+        while self.attempts < self.budget:
+            if self._cursor >= self.size:
+                if self.size == 0 or (self.attempts and not self._pass_accepted):
+                    self.infeasible = True
+                    return
+                self.rng.shuffle(self._order)
+                self._cursor = 0
+                self._pass_accepted = 0
+            index = self._order[self._cursor]
+            self._cursor += 1
+            self.attempts += 1
+            yield index
+
+    def accept(self):
+        self.accepted += 1
+        self._pass_accepted += 1
+
+    def shortfall(self, subtype, template, requested):
+        """``None`` when ``requested`` draws were accepted, otherwise the reason they were not."""
+        if self.accepted >= requested:
+            return None
+        if self.size == 0:
+            reason = NO_CANDIDATES
+        elif self.infeasible:
+            reason = INFEASIBLE
+        else:
+            reason = BUDGET_EXHAUSTED
+        return Shortfall(subtype=subtype.code, template=template.code, requested=requested,
+                         generated=self.accepted, attempts=self.attempts, reason=reason)
+
+
+def no_candidates(subtype, template, requested):
+    return Shortfall(subtype=subtype.code, template=template.code, requested=requested,
+                     generated=0, attempts=0, reason=NO_CANDIDATES)
+
+
+def attempt_budget(count):
+    return count * ATTEMPTS_PER_QUESTION
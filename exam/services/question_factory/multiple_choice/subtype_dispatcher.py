@@ -1,16 +1,21 @@
 # subtype_handler.py
+import random
+import threading
 from collections import defaultdict
+from concurrent.futures.process import BrokenProcessPool
 
-from django.db.models import Count, Prefetch, Q
+from django.db import connections
 
-from exam.models import QuestionTemplate, MultipleChoiceQuestion, Option
-from quran.models import Verse, Word, VerseTranslation
+from exam.models import QuestionTemplate
+from exam.services.graph_writer import bulk_insert_graph
+from exam.services.verse_window import verse_windows
 from .dispatchers.dispatchers import (
     VerseBeginningSubtypeDispatcher,
     VerseEndingSubtypeDispatcher, VerseTranslationSubtypeDispatcher,
     VerseDetailSubtypeDispatcher, VerseBeforeAfterSubtypeDispatcher, VerseHardBeginningSubtypeDispatcher,
     VerseHardEndingSubtypeDispatcher
 )
+from .generation_pool import generation_pools, generation_workers, process_subtypes
 from .utils import divide_and_spread_remainder
 
 subtype_dispatch = {
@@ -24,68 +29,140 @@ subtype_dispatch = {
 }
 
 
-def generate_questions(quiz, participation):
-    subtypes = list(quiz.subtypes.all())
-    question_counts = divide_and_spread_remainder(quiz.question_count, len(subtypes))
-
-    all_questions = []
-    all_options = []
-    all_messages = []
-
-    words_queryset = Word.objects.filter(type=1).order_by('word_number')
-    translation_queryset = VerseTranslation.objects.filter(translator_id=5)
-    verses = (
-        Verse.objects
-        .filter(id__gte=quiz.start_verse_id, id__lte=quiz.end_verse_id)
-        .prefetch_related(
-            Prefetch('words', queryset=words_queryset, to_attr='prefetched_words'),
-            Prefetch('versetranslation_set', queryset=translation_queryset, to_attr='prefetched_translation')
+def attach_inline_options(questions, options):
+    """Copies the unsaved ``Option`` objects made by the generators onto their questions."""
+    by_question = defaultdict(list)
+    for option in options:
+        by_question[id(option.question)].append(option)
+    for question in questions:
+        question_options = sorted(by_question[id(question)], key=lambda option: option.number)
+        question.set_options(
+            [option.text for option in question_options],
+            next((option.number for option in question_options if option.is_correct), None),
         )
-        .select_related('surah', 'text')
-        .annotate(word_count=Count("words", filter=Q(words__type=1)))
-        .filter(word_count__gt=1)
-    )
-
-    templates = QuestionTemplate.objects.filter(subtype__in=subtypes).order_by('code')
 
-    templates_by_subtype = defaultdict(list)
-    for template in templates:
-        templates_by_subtype[template.subtype_id].append(template)
 
-    for subtype, count in zip(subtypes, question_counts):
-        templates = templates_by_subtype.get(subtype.id, [])
+def dispatch_subtype(subtype, templates, quiz, participation, count, verse_range, seed):
+    """
+    Generates the questions of one subtype with a ``random.Random(seed)``, with
+    their options stored inline. Runs inline or in a generation worker; pool
+    threads close their database connections when done.
+    """
+    try:
         handler_factory = subtype_dispatch.get(subtype.code)
         if not handler_factory:
             raise NotImplementedError(f"No handler defined for subtype code {subtype.code}")
 
-        handler = handler_factory()
-
-        if not handler:
-            raise NotImplementedError(f"No handler defined for subtype code {subtype.code}")
-        result = handler.dispatch(
+        result = handler_factory().dispatch(
             templates=templates,
             subtype=subtype,
             quiz=quiz,
             participation=participation,
             count=count,
-            verses=verses,
+            verses=verse_windows.get(*verse_range).verses(),
+            rng=random.Random(seed),
         )
-        all_questions.extend(result.get('questions', []))
-        all_options.extend(result.get('options', []))
-        message = result.get('message')
+        questions = result.get('questions', [])
+        attach_inline_options(questions, result.get('options', []))
+        return {
+            'questions': questions,
+            'message': result.get('message'),
+            'shortfalls': result.get('shortfalls', []),
+        }
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def _run_jobs(jobs):
+    """
+    Results of ``dispatch_subtype`` for every job, in job order. With more than
+    one worker and job the subtypes run concurrently: CPU-bound subtypes in the
+    process pool, the rest in the thread pool.
+    """
+    if generation_workers() <= 1 or len(jobs) <= 1:
+        return [dispatch_subtype(*job) for job in jobs]
+
+    use_processes = generation_pools.processes_allowed()
+    cpu_bound = process_subtypes()
+    futures = []
+    for job in jobs:
+        pool = generation_pools.processes() if use_processes and job[0].code in cpu_bound \
+            else generation_pools.threads()
+        futures.append(pool.submit(dispatch_subtype, *job))
+
+    results = []
+    for job, future in zip(jobs, futures):
+        try:
+            results.append(future.result())
+        except BrokenProcessPool:
+            generation_pools.discard_processes()
+            results.append(dispatch_subtype(*job))
+    return results
+
+
+def build_questions(quiz, participation, question_count=None):
+    """
+    Runs the subtype dispatchers and returns the unsaved questions, with their
+    options stored inline, without writing anything. Subtypes are generated
+    concurrently when ``QUIZ_GENERATION_WORKERS`` is above one; each gets its
+    own seed and results are merged in subtype order.
+    """
+    subtypes = list(quiz.subtypes.all())
+    question_counts = divide_and_spread_remainder(question_count or quiz.question_count, len(subtypes))
+
+    all_questions = []
+    all_messages = []
+    all_shortfalls = []
+
+    verse_range = (quiz.start_verse_id, quiz.end_verse_id)
+
+    templates = QuestionTemplate.objects.filter(subtype__in=subtypes).order_by('code')
+
+    templates_by_subtype = defaultdict(list)
+    for template in templates:
+        templates_by_subtype[template.subtype_id].append(template)
+
+    jobs = [
+        (subtype, templates_by_subtype.get(subtype.id, []), quiz, participation, count, verse_range,
+         random.getrandbits(32))
+        for subtype, count in zip(subtypes, question_counts)
+    ]
+
+    for (subtype, templates, *_), result in zip(jobs, _run_jobs(jobs)):
+        questions = result['questions']
+        # questions built in a worker process carry copies of these instances
+        templates_by_id = {template.id: template for template in templates}
+        for question in questions:
+            question.participation = participation
+            question.template = templates_by_id.get(question.template_id, question.template)
+        all_questions.extend(questions)
+        all_shortfalls.extend(result['shortfalls'])
+        message = result['message']
         if isinstance(message, list):
             all_messages.extend(message)
         elif isinstance(message, str):
             all_messages.append(message)
 
+    return {
+        'message': all_messages,
+        'questions': all_questions,
+        'shortfalls': all_shortfalls,
+    }
+
+
+def generate_questions(quiz, participation):
+    result = build_questions(quiz, participation)
+    all_questions = result['questions']
+    all_messages = result['message']
+
     if all_questions:
-        MultipleChoiceQuestion.objects.bulk_create(all_questions)
         for i, question in enumerate(all_questions):
-            for j in range(4):
-                all_options[i * 4 + j].question = question
-        Option.objects.bulk_create(all_options)
+            question.position = i + 1
+        bulk_insert_graph(all_questions, ('participation_id', 'position'))
 
     return {
         'message': '\n'.join(m for m in all_messages if m),
         'questions': all_questions,
+        'shortfalls': [shortfall.as_dict() for shortfall in result['shortfalls']],
     }
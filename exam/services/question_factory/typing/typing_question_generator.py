@@ -1,6 +1,9 @@
 import random
 
 from exam.models import TypingQuestion, Quiz, TypingParticipation, QuizSubtype
+from exam.services.graph_writer import bulk_insert_graph
+from exam.services.random_sampler import random_sampler
+from exam.services.verse_window import get_verse_window
 from quran.models import Verse
 
 FIRST_WORD_CODE = 12
@@ -9,14 +12,12 @@ WHOLE_VERSE_CODE = 14
 
 
 class CommonTypingQuestionGenerator:
-    def __init__(self, quiz: Quiz):
+    def __init__(self, quiz: Quiz, version: int = None):
         self.quiz = quiz
+        self.version = quiz.content_version if version is None else version
         self.start_verse = quiz.start_verse
         self.end_verse = quiz.end_verse
-        self.verses = Verse.objects.filter(
-            id__gte=self.start_verse.id,
-            id__lte=self.end_verse.id,
-        ).select_related('text').order_by('id')
+        self.verses = list(get_verse_window(quiz))
 
     def generate(self):
         for subtype in self.quiz.subtypes.filter(code__in=[FIRST_WORD_CODE, LAST_WORD_CODE, WHOLE_VERSE_CODE]):
@@ -34,10 +35,11 @@ class CommonTypingQuestionGenerator:
                 title=display_text,
                 answer=answer,
                 step_index=i,
+                version=self.version,
                 template=subtype.templates.first()
             )
             questions.append(question)
-        TypingQuestion.objects.bulk_create(questions)
+        bulk_insert_graph(questions, ('quiz_id', 'version', 'template_id', 'step_index'))
 
     def _prepare_question_answer(self, verse: Verse, subtype_code: int):
         texts = [
@@ -89,26 +91,28 @@ class CommonTypingQuestionGenerator:
 
 
 class MiddleWordTypingQuestionGenerator:
-    def __init__(self, participation: TypingParticipation):
+    def __init__(self, participation: TypingParticipation = None, quiz=None):
+        # without a participation the questions are only built, e.g. for the participation pool
         self.participation = participation
-        self.quiz = participation.participation.quiz
+        self.quiz = quiz or participation.participation.quiz
         self.subtype = self.quiz.subtypes.first()
-        self.verses = Verse.objects.filter(
-            id__gte=self.quiz.start_verse.id,
-            id__lte=self.quiz.end_verse.id,
-        ).select_related('text', 'surah').order_by('?')[:self.quiz.question_count]
+        start_id, end_id = self.quiz.start_verse_id, self.quiz.end_verse_id
+        # without a question count every verse of the range is asked, in random order
+        count = self.quiz.question_count if self.quiz.question_count is not None else end_id - start_id + 1
+        verse_ids = random_sampler.sample_range(Verse, start_id, end_id, count)
+        self.verses = get_verse_window(self.quiz).subset(verse_ids)
         self.template = self.subtype.templates.first()
 
-    def generate(self):
-        verses = self.verses
+    def build(self):
         created_questions = []
-
-        for i, verse in enumerate(verses, start=1):
+        for i, verse in enumerate(self.verses, start=1):
             question = self._build_question_for_verse(verse, index=i)
             if question:
                 created_questions.append(question)
+        return created_questions
 
-        TypingQuestion.objects.bulk_create(created_questions)
+    def generate(self):
+        bulk_insert_graph(self.build(), ('participation_id', 'step_index'))
 
     def _build_question_for_verse(self, verse, index: int):
         text = verse.text.plain
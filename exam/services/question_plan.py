@@ -0,0 +1,154 @@
+import random
+from collections import defaultdict
+from itertools import cycle
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from exam.models import QuestionTemplate, MultipleChoiceParticipation, MultipleChoiceQuestion
+from exam.services.corpus_generation import corpus_generation
+from exam.services.graph_writer import bulk_insert_graph
+from exam.services.question_factory.multiple_choice.subtype_dispatcher import subtype_dispatch, \
+    attach_inline_options
+from exam.services.question_factory.multiple_choice.utils import divide_and_spread_remainder
+from exam.services.verse_window import get_verse_window
+
+# consecutive verses handed to the generator of one planned question
+PLAN_WINDOW = 8
+
+RENDERED_CACHE_KEY = 'exam:question_plan:{participation_id}'
+# seconds rendered questions are kept past the deadline, or at all while the attempt has not started
+RENDERED_TIMEOUT = 60 * 60
+
+
+def lazy_questions_enabled():
+    return getattr(settings, 'QUIZ_LAZY_MC_QUESTIONS', False)
+
+
+def plan_questions(quiz, rng=None):
+    """
+    Picks the template, a window of verse ids and a seed for every question of
+    ``quiz`` without generating anything. Windows are spread over the quiz range
+    so that questions of one participation rarely share a verse.
+    """
+    rng = rng or random.Random()
+    subtypes = list(quiz.subtypes.all())
+    verse_ids = [verse.id for verse in get_verse_window(quiz).verses()]
+    if not subtypes or not verse_ids:
+        return []
+
+    templates_by_subtype = defaultdict(list)
+    for template in QuestionTemplate.objects.filter(subtype__in=subtypes).order_by('code'):
+        templates_by_subtype[template.subtype_id].append(template)
+
+    starts = list(range(max(len(verse_ids) - PLAN_WINDOW + 1, 1)))
+    rng.shuffle(starts)
+    starts = cycle(starts)
+
+    plan = []
+    for subtype, count in zip(subtypes, divide_and_spread_remainder(quiz.question_count, len(subtypes))):
+        handler_factory = subtype_dispatch.get(subtype.code)
+        if not handler_factory:
+            raise NotImplementedError(f"No handler defined for subtype code {subtype.code}")
+        handler = handler_factory()
+        templates = [t for t in templates_by_subtype.get(subtype.id, []) if t.code in handler.generator_map]
+        if not templates:
+            continue
+
+        for template, template_count in zip(templates, divide_and_spread_remainder(count, len(templates))):
+            for _ in range(template_count):
+                start = next(starts)
+                plan.append([template.id, verse_ids[start:start + PLAN_WINDOW], rng.getrandbits(32)])
+    return plan
+
+
+def render_plan(participation):
+    """
+    Generates the unsaved questions of a planned participation, each with the
+    position of its plan entry. Every question is produced by its template's
+    generator from its verse window with a ``random.Random`` seeded from the
+    plan, so a plan renders the same titles and options for as long as the
+    corpus generation it records is current. Entries that render nothing are left out.
+    """
+    plan = participation.question_plan['questions']
+    templates = QuestionTemplate.objects.select_related('subtype').in_bulk({entry[0] for entry in plan})
+    quiz = participation.participation.quiz
+    window = get_verse_window(quiz)
+
+    questions = []
+    for position, (template_id, verse_ids, seed) in enumerate(plan, start=1):
+        template = templates.get(template_id)
+        handler_factory = subtype_dispatch.get(template.subtype.code) if template else None
+        generator = handler_factory().get_generator(template) if handler_factory else None
+        if generator is None:
+            continue
+
+        generator.rng = random.Random(seed)
+        result = generator.generate(
+            quiz=quiz,
+            participation=participation,
+            template=template,
+            count=1,
+            verses=window.subset(verse_ids),
+            subtype=template.subtype,
+        )
+        rendered = result.get('questions', [])[:1]
+        if not rendered:
+            continue
+        attach_inline_options(rendered, result.get('options', []))
+        rendered[0].position = position
+        questions.append(rendered[0])
+    return questions
+
+
+def _rendered_timeout(participation):
+    deadline = participation.participation.deadline
+    if deadline is None:
+        return RENDERED_TIMEOUT
+    return max(int((deadline - timezone.now()).total_seconds()), 0) + RENDERED_TIMEOUT
+
+
+def get_planned_questions(participation):
+    """
+    Rendered questions of a planned participation, addressed by position. The
+    rendered set is cached until past the deadline, so a corpus change during
+    the attempt does not alter what is served and graded. A render after the
+    cache entry is lost re-pins the plan to the current generation.
+    """
+    key = RENDERED_CACHE_KEY.format(participation_id=participation.id)
+    rows = cache.get(key)
+    if rows is None:
+        generation = corpus_generation.current()
+        rows = [
+            (q.position, q.template_id, q.title, q.option_texts, q.correct_option)
+            for q in render_plan(participation)
+        ]
+        cache.set(key, rows, _rendered_timeout(participation))
+        if participation.question_plan['generation'] != generation:
+            # the corpus moved since the plan was made; later renders have to match this one
+            participation.question_plan['generation'] = generation
+            MultipleChoiceParticipation.objects.filter(pk=participation.pk).update(
+                question_plan=participation.question_plan)
+
+    return [
+        MultipleChoiceQuestion(participation=participation, position=position, template_id=template_id,
+                               title=title, option_texts=option_texts, correct_option=correct_option)
+        for position, template_id, title, option_texts, correct_option in rows
+    ]
+
+
+def save_planned_questions(participation, positions):
+    """Persists the planned questions at ``positions``, for the review; returns them keyed by position."""
+    positions = set(positions)
+    questions = [q for q in get_planned_questions(participation) if q.position in positions]
+    bulk_insert_graph(questions, ('participation_id', 'position'))
+    transaction.on_commit(lambda: cache.delete(RENDERED_CACHE_KEY.format(participation_id=participation.id)))
+    return {q.position: q for q in questions}
+
+
+def provision_planned_questions(quiz, participation):
+    participation.question_plan = {'generation': corpus_generation.current(), 'questions': plan_questions(quiz)}
+    participation.save(update_fields=['question_plan'])
+    return {'message': '', 'questions': []}
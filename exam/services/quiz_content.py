@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from exam.choices import QuizCategory, ParticipationStatus
+from exam.models import Quiz, BaseParticipation, OrderingChunk, MatchingChunk, TypingQuestion
+from exam.services.question_factory.matching.matching_chunk_generator import MatchingChunkGenerator
+from exam.services.question_factory.ordering.ordering_chunk_generator import ordering_subtype_dispatcher
+from exam.services.question_factory.typing.typing_question_generator import CommonTypingQuestionGenerator
+
+# fields the chunks and questions of a quiz are generated from; subtypes are followed through m2m_changed
+CONTENT_FIELDS = ('category', 'start_verse_id', 'end_verse_id', 'chunk_size', 'question_count')
+CHUNKED_CATEGORIES = (QuizCategory.ORDERING, QuizCategory.MATCHING, QuizCategory.TYPING)
+CONTENT_LOCK_KEY = 'exam:quiz_content:lock:{quiz_id}'
+CONTENT_PENDING_KEY = 'exam:quiz_content:pending:{quiz_id}'
+PENDING_TIMEOUT = 60 * 10
+
+
+def content_changed(quiz, update_fields=None):
+    """Whether saving ``quiz`` changes a field its content is generated from; reads the stored row once."""
+    if quiz.pk is None:
+        return True
+    fields = [field for field in CONTENT_FIELDS
+              if update_fields is None or {field, field.removesuffix('_id')} & set(update_fields)]
+    if not fields:
+        return False
+    stored = Quiz.objects.filter(pk=quiz.pk).values_list(*fields).first()
+    return stored is None or stored != tuple(getattr(quiz, field) for field in fields)
+
+
+def acquire_content_lock(quiz_id, timeout=60 * 10):
+    return cache.add(CONTENT_LOCK_KEY.format(quiz_id=quiz_id), 1, timeout)
+
+
+def release_content_lock(quiz_id):
+    cache.delete(CONTENT_LOCK_KEY.format(quiz_id=quiz_id))
+
+
+def schedule_content_regeneration(quiz_id):
+    """
+    Regenerates the chunks of a quiz in a celery task once the transaction
+    commits. Changes committed before the task starts share a single run.
+    """
+    from exam.tasks import regenerate_quiz_content
+
+    def enqueue():
+        if cache.add(CONTENT_PENDING_KEY.format(quiz_id=quiz_id), 1, PENDING_TIMEOUT):
+            regenerate_quiz_content.delay(quiz_id)
+
+    transaction.on_commit(enqueue)
+
+
+def clear_content_pending(quiz_id):
+    """Called as the task starts, so changes committed from here on schedule another run."""
+    cache.delete(CONTENT_PENDING_KEY.format(quiz_id=quiz_id))
+
+
+def generate_content(quiz, version):
+    if quiz.category == QuizCategory.ORDERING:
+        ordering_subtype_dispatcher(quiz, force_regenerate=True, version=version)
+    elif quiz.category == QuizCategory.MATCHING:
+        MatchingChunkGenerator(quiz, chunk_size=quiz.chunk_size, version=version).generate()
+    elif quiz.category == QuizCategory.TYPING and has_shared_content(quiz):
+        # subtype 13 generates its questions per participation
+        CommonTypingQuestionGenerator(quiz, version=version).generate()
+
+
+def regenerate_content(quiz):
+    """
+    Writes the chunks of ``quiz`` as a new content version and moves the quiz
+    to it. Participations keep the version they started on; sets no
+    participation refers to are pruned. Returns the new version.
+    """
+    if quiz.category not in CHUNKED_CATEGORIES or not quiz.subtypes.exists():
+        return quiz.content_version
+
+    previous = quiz.content_version
+    version = previous + 1
+    with transaction.atomic():
+        generate_content(quiz, version)
+        Quiz.objects.filter(pk=quiz.pk).update(content_version=version)
+        # a participation created while this commits may still record the previous version
+        prune_content_versions(quiz.id, keep={previous, version})
+    quiz.content_version = version
+    return version
+
+
+def prune_content_versions(quiz_id, keep=()):
+    """
+    Deletes the chunk sets of a quiz that no participation refers to. Sets of
+    completed participations stay, as their matching progress and submitted
+    typing answers point at them.
+    """
+    in_use = (BaseParticipation.objects.filter(quiz_id=quiz_id)
+              .values_list('content_version', flat=True).distinct())
+    keep = set(keep) | set(in_use)
+    for model in (OrderingChunk, MatchingChunk, TypingQuestion):
+        model.objects.filter(quiz_id=quiz_id).exclude(version__in=keep).delete()
+
+
+def has_shared_content(quiz):
+    """Whether participations of ``quiz`` play the chunks or questions the quiz shares."""
+    if quiz.category in (QuizCategory.ORDERING, QuizCategory.MATCHING):
+        return True
+    if quiz.category == QuizCategory.TYPING:
+        subtype = quiz.subtypes.first()
+        return subtype is None or subtype.code != 13
+    return False
+
+
+def content_ready(quiz):
+    """
+    Whether the current chunk set of ``quiz`` exists. New quizzes get their
+    first set from the regeneration task, a moment after they are saved.
+    """
+    return not has_shared_content(quiz) or step_count(quiz, quiz.content_version) > 0
+
+
+def step_count(quiz, version):
+    """Steps of the chunk set ``version`` of ``quiz``."""
+    if quiz.category == QuizCategory.ORDERING:
+        return OrderingChunk.objects.filter(quiz=quiz, version=version).count()
+    if quiz.category == QuizCategory.MATCHING:
+        return MatchingChunk.objects.filter(quiz=quiz, version=version).count()
+    if quiz.category == QuizCategory.TYPING:
+        return TypingQuestion.objects.filter(quiz=quiz, version=version).count()
+    return 0
@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from exam.services.corpus_generation import corpus_generation
+
+
+class DenseIdSampler:
+    """
+    Constant-time random sampling of rows without ``ORDER BY RAND()``.
+
+    The sorted primary keys of every (model, filter) pair are read once with a
+    single ``values_list`` query and kept in memory for ``ttl`` seconds, or until
+    the corpus generation moves; samples
+    are random positions in that array, so deleted ids and gaps never bias the
+    result. Pass a seeded ``random.Random`` as ``rng`` for reproducible samples.
+    """
+
+    def __init__(self, ttl=60 * 30):
+        self.ttl = ttl
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def ids(self, model, **filters):
+        key = (model._meta.label_lower, tuple(sorted(filters.items())))
+        generation = corpus_generation.current()
+        cached = self._arrays.get(key)
+        if cached and cached[0] > time.monotonic() and cached[1] == generation:
+            return cached[2]
+
+        ids = list(model.objects.filter(**filters).order_by('pk').values_list('pk', flat=True))
+        with self._lock:
+            self._arrays[key] = (time.monotonic() + self.ttl, generation, ids)
+        return ids
+
+    @staticmethod
+    def _pick(ids, lo, hi, count, exclude, rng):
+        exclude = set(exclude)
+        available = hi - lo
+        if available <= 0 or count <= 0:
+            return []
+
+        # small windows: shuffle what is there instead of rejection sampling
+        if available <= count * 2 + len(exclude):
+            pool = [pk for pk in ids[lo:hi] if pk not in exclude]
+            return rng.sample(pool, min(count, len(pool)))
+
+        picked = []
+        seen = set(exclude)
+        attempts = 0
+        while len(picked) < count and attempts < count * 10:
+            attempts += 1
+            pk = ids[rng.randrange(lo, hi)]
+            if pk in seen:
+                continue
+            seen.add(pk)
+            picked.append(pk)
+        return picked
+
+    def sample(self, model, count, exclude=(), rng=None, **filters):
+        """Up to ``count`` distinct random primary keys of ``model`` rows matching ``filters``."""
+        ids = self.ids(model, **filters)
+        return self._pick(ids, 0, len(ids), count, exclude, rng or random)
+
+    def sample_range(self, model, low, high, count, exclude=(), rng=None, **filters):
+        """Like ``sample`` but limited to primary keys in ``low..high`` (inclusive)."""
+        ids = self.ids(model, **filters)
+        return self._pick(ids, bisect_left(ids, low), bisect_right(ids, high), count, exclude, rng or random)
+
+    def invalidate(self, model=None):
+        with self._lock:
+            if model is None:
+                self._arrays.clear()
+                return
+            label = model._meta.label_lower
+            for key in [k for k in self._arrays if k[0] == label]:
+                del self._arrays[key]
+
+
+def in_sampled_order(queryset, ids):
+    """Rows of ``queryset`` with the given primary keys, in the order of ``ids``."""
+    rows = queryset.in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+random_sampler = DenseIdSampler()
@@ -0,0 +1,221 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+
+from exam.services.corpus_generation import corpus_generation
+from exam.services.distractor_index import TRANSLATOR_ID
+from quran.models import Verse, Word, VerseTranslation
+from quran.serializers import remove_diacritics_with_map
+from quran.services.verse_strings import make_verse_strings
+
+TEXT_VARIANTS = ('plain', 'semi_tashkeel', 'simple_tashkeel', 'full_tashkeel', 'persian_friendly', 'fuzzy')
+
+WindowWord = namedtuple('WindowWord', ['arabic_text', 'clean_arabic_text', 'word_number'])
+WindowTranslation = namedtuple('WindowTranslation', ['text'])
+WindowSurah = namedtuple('WindowSurah', ['id', 'name'])
+WindowText = namedtuple('WindowText', TEXT_VARIANTS)
+
+
+class WindowVerse:
+    """
+    Read-only view of one verse of a ``VerseWindow``. It has the attributes the
+    question generators read from a prefetched ``Verse`` (``surah.name``,
+    ``text.full_tashkeel``, ``prefetched_words``, ``prefetched_translation``, ...)
+    and the ``VerseStrings`` of the verse.
+    """
+    __slots__ = ('_window', '_index')
+
+    def __init__(self, window, index):
+        self._window = window
+        self._index = index
+
+    @property
+    def id(self):
+        return self._window.ids[self._index]
+
+    pk = id
+
+    @property
+    def verse_number(self):
+        return self._window.verse_numbers[self._index]
+
+    @property
+    def surah_id(self):
+        return self._window.surah_ids[self._index]
+
+    @property
+    def surah(self):
+        return self._window.surahs[self.surah_id]
+
+    @property
+    def text(self):
+        return self._window.texts[self._index]
+
+    @property
+    def prefetched_words(self):
+        return self._window.words(self._index)
+
+    @property
+    def prefetched_translation(self):
+        translation = self._window.translations[self._index]
+        return [WindowTranslation(translation)] if translation is not None else []
+
+    @property
+    def strings(self):
+        return self._window.strings(self._index)
+
+    @property
+    def word_count(self):
+        return self._window.word_offsets[self._index + 1] - self._window.word_offsets[self._index]
+
+    def __repr__(self):
+        return f'<WindowVerse {self.id}>'
+
+
+class VerseWindow:
+    """
+    Immutable snapshot of the verses ``start_id..end_id`` in id order, kept in
+    column arrays: ids, verse numbers, surahs, the text variants, the type 1
+    words (arabic and clean, with per-verse offsets) and the translation of
+    ``TRANSLATOR_ID``. Built with three queries and shared by every generator
+    that works on the same range.
+    """
+
+    def __init__(self, start_id, end_id):
+        self.start_id = start_id
+        self.end_id = end_id
+
+        rows = (Verse.objects.filter(id__gte=start_id, id__lte=end_id).order_by('id')
+                .values_list('id', 'verse_number', 'surah_id', 'surah__name',
+                             *(f'text__{variant}' for variant in TEXT_VARIANTS)))
+        self.ids = array('q')
+        self.verse_numbers = array('l')
+        self.surah_ids = array('q')
+        self.surahs = {}
+        texts = []
+        for verse_id, verse_number, surah_id, surah_name, *variants in rows:
+            surah_id = surah_id or 0
+            self.ids.append(verse_id)
+            self.verse_numbers.append(verse_number or 0)
+            self.surah_ids.append(surah_id)
+            if surah_id not in self.surahs:
+                self.surahs[surah_id] = WindowSurah(surah_id, surah_name)
+            texts.append(WindowText(*(variant or '' for variant in variants)))
+        self.texts = tuple(texts)
+        self._positions = {verse_id: i for i, verse_id in enumerate(self.ids)}
+
+        arabic, clean = [], []
+        self.word_offsets = array('l', [0])
+        words = (Word.objects.filter(verse_id__gte=start_id, verse_id__lte=end_id, type=1)
+                 .order_by('verse_id', 'word_number').values_list('verse_id', 'arabic_text', 'word_number'))
+        numbers = array('l')
+        position = 0
+        for verse_id, arabic_text, word_number in words.iterator(chunk_size=5000):
+            index = self._positions.get(verse_id)
+            if index is None:
+                continue
+            while position < index:
+                self.word_offsets.append(len(arabic))
+                position += 1
+            arabic.append(arabic_text)
+            clean.append(remove_diacritics_with_map(arabic_text)[0])
+            numbers.append(word_number or 0)
+        while position < len(self.ids):
+            self.word_offsets.append(len(arabic))
+            position += 1
+        self.arabic_words = tuple(arabic)
+        self.clean_words = tuple(clean)
+        self.word_numbers = numbers
+
+        translations = dict(VerseTranslation.objects
+                            .filter(translator_id=TRANSLATOR_ID, verse_id__gte=start_id, verse_id__lte=end_id)
+                            .values_list('verse_id', 'text'))
+        self.translations = tuple(translations.get(verse_id) for verse_id in self.ids)
+        self._strings = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return (WindowVerse(self, i) for i in range(len(self.ids)))
+
+    def words(self, index):
+        start, end = self.word_offsets[index], self.word_offsets[index + 1]
+        return [WindowWord(self.arabic_words[i], self.clean_words[i], self.word_numbers[i]) for i in range(start, end)]
+
+    def strings(self, index):
+        """``VerseStrings`` of a verse, made from the window's words once and then reused."""
+        strings = self._strings.get(index)
+        if strings is None:
+            start, end = self.word_offsets[index], self.word_offsets[index + 1]
+            strings = make_verse_strings(self.arabic_words[start:end], self.surahs[self.surah_ids[index]].name,
+                                         self.verse_numbers[index])
+            self._strings[index] = strings
+        return strings
+
+    def get(self, verse_id):
+        index = self._positions.get(verse_id)
+        return WindowVerse(self, index) if index is not None else None
+
+    def subset(self, verse_ids):
+        """Verses of the window with the given ids, in the order of ``verse_ids``."""
+        return [WindowVerse(self, self._positions[verse_id]) for verse_id in verse_ids if verse_id in self._positions]
+
+    def between(self, low, high):
+        """Verses with ids in ``low..high``."""
+        return [WindowVerse(self, i) for i in range(bisect_left(self.ids, low), bisect_left(self.ids, high + 1))]
+
+    def verses(self, min_words=2):
+        """Verses with at least ``min_words`` words, as used by the multiple-choice generators."""
+        return [verse for verse in self if verse.word_count >= min_words]
+
+
+class VerseWindowCache:
+    """
+    Process-wide LRU of ``VerseWindow`` objects keyed by ``(start_id, end_id)``.
+    Holds at most ``VERSE_WINDOW_CACHE_SIZE`` windows, each for ``ttl`` seconds
+    and only while the corpus generation it was built under is current.
+    """
+
+    def __init__(self, ttl=60 * 60):
+        self.ttl = ttl
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'VERSE_WINDOW_CACHE_SIZE', 32)
+
+    def get(self, start_id, end_id):
+        key = (start_id, end_id)
+        now = time.monotonic()
+        generation = corpus_generation.current()
+        with self._lock:
+            cached = self._windows.get(key)
+            if cached and cached[0] > now and cached[1] == generation:
+                self._windows.move_to_end(key)
+                return cached[2]
+
+        window = VerseWindow(start_id, end_id)
+        with self._lock:
+            self._windows[key] = (now + self.ttl, generation, window)
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_size:
+                self._windows.popitem(last=False)
+        return window
+
+    def clear(self):
+        """Drops the windows of this process only."""
+        with self._lock:
+            self._windows.clear()
+
+
+verse_windows = VerseWindowCache()
+
+
+def get_verse_window(quiz):
+    return verse_windows.get(quiz.start_verse_id, quiz.end_verse_id)
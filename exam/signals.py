@@ -1,41 +1,50 @@
 # exam/signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.db import transaction
 from django.db.models import F
 from django.utils import timezone
 
-from exam.models import BaseParticipation, Quiz, OrderingChunk, MatchingChunk, TypingQuestion
+from exam.models import BaseParticipation, Quiz
 from exam.choices import QuizCategory
-from exam.services.question_factory.matching.matching_chunk_generator import MatchingChunkGenerator
-from exam.services.question_factory.ordering.ordering_chunk_generator import ordering_subtype_dispatcher
 from competition.models import DivisionMembership, Week
 from competition.choices import WeekStatusChoices
-from exam.services.question_factory.typing.typing_question_generator import CommonTypingQuestionGenerator
+from exam.services.participation_pool import discard_participation_pool
+from exam.services.question_bank import schedule_bank_fill
+from exam.services.quiz_content import content_changed, schedule_content_regeneration
+from exam.services.corpus_generation import invalidate_corpus_caches
+from quran.models import Verse, VerseText, Word, VerseTranslation
+
+
+@receiver(pre_save, sender=Quiz)
+def track_quiz_content_changes(sender, instance, update_fields=None, **kwargs):
+    instance._content_changed = content_changed(instance, update_fields)
 
 
 @receiver(post_save, sender=Quiz)
 def create_chunks_for_quiz(sender, instance, created, **kwargs):
     quiz = instance
-
-    if quiz.category == QuizCategory.ORDERING:
-        chunks = OrderingChunk.objects.filter(quiz=quiz)
-        if chunks.exists():
-            chunks.delete()
-        ordering_subtype_dispatcher(quiz)
-    elif quiz.category == QuizCategory.MATCHING:
-        chunks = MatchingChunk.objects.filter(quiz=quiz)
-        if chunks.exists():
-            chunks.delete()
-        generator = MatchingChunkGenerator(quiz, chunk_size=quiz.chunk_size)
-        generator.generate()
-    elif quiz.category == QuizCategory.TYPING and quiz.subtypes.first().code != 13:
-        chunks = TypingQuestion.objects.filter(quiz=quiz)
-        if chunks.exists():
-            chunks.delete()
-        generator = CommonTypingQuestionGenerator(quiz)
-        generator.generate()
+    # new quizzes get their content once their subtypes are set (see below); saves that leave the
+    # content fields alone (activation, schedule, scoring) keep it
+    if created or not getattr(quiz, '_content_changed', True):
+        return
+    discard_participation_pool(quiz)
+    if quiz.category == QuizCategory.MULTIPLE_CHOICE:
+        schedule_bank_fill(quiz.id, rebuild=True)
+    else:
+        schedule_content_regeneration(quiz.id)
+
+
+@receiver(m2m_changed, sender=Quiz.subtypes.through)
+def rebuild_question_bank_on_subtypes_change(sender, instance, action, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear') or not isinstance(instance, Quiz):
+        return
+    discard_participation_pool(instance)
+    if instance.category == QuizCategory.MULTIPLE_CHOICE:
+        schedule_bank_fill(instance.id, rebuild=True)
+    else:
+        schedule_content_regeneration(instance.id)
 
 
 @receiver(post_save, sender=BaseParticipation)
@@ -91,3 +100,10 @@ def update_weekly_and_total_scores(sender, instance, created, **kwargs):
         membership.save(update_fields=["weekly_score"])
 
 
+@receiver([post_save, post_delete], sender=Verse)
+@receiver([post_save, post_delete], sender=VerseText)
+@receiver([post_save, post_delete], sender=Word)
+@receiver([post_save, post_delete], sender=VerseTranslation)
+def invalidate_generator_caches(sender, **kwargs):
+    # after the commit, so no process rebuilds a cache from the old rows under the new generation
+    transaction.on_commit(invalidate_corpus_caches)
@@ -1,16 +1,32 @@
+import time
+
 from celery import shared_task
+from django.db import transaction
 from django.db.models import Q
 from django.utils.timezone import now
 
-from .models import Quiz
+from .choices import QuizCategory, ProvisioningStatus
+from .models import Quiz, BaseParticipation, PreparedParticipation
+from .services.participation_pool import pool_lead_time, fill_participation_pool, acquire_pool_lock, \
+    release_pool_lock, claim_prepared_questions
+from .services.provisioning import acquire_provisioning_slot, release_provisioning_slot, provision_content, \
+    mark_provisioned, provisioning_deadline, slot_retry_countdown
+from .services.question_bank import fill_question_bank, acquire_bank_lock, release_bank_lock, schedule_bank_fill, \
+    clear_bank_pending, request_bank_rebuild, take_bank_rebuild, bank_rebuild_requested
+from .services.quiz_content import acquire_content_lock, release_content_lock, clear_content_pending, \
+    regenerate_content
 
 
 @shared_task
 def activate_due_quizzes():
-    count = Quiz.objects.filter(
+    due = Quiz.objects.filter(
         is_active=False,
         quiz_start_datetime__lte=now()
-    ).update(is_active=True)
+    )
+    multiple_choice_ids = list(due.filter(category=QuizCategory.MULTIPLE_CHOICE).values_list('id', flat=True))
+    count = due.update(is_active=True)
+    for quiz_id in multiple_choice_ids:
+        schedule_bank_fill(quiz_id)
     return f"{count} quizzes activated."
 
 
@@ -20,4 +36,107 @@ def deactivate_due_quizzes():
              .filter(is_active=True, )
              .filter(Q(quiz_start_datetime__gte=now()) | Q(quiz_end_datetime__lte=now()))
              .update(is_active=False))
+    PreparedParticipation.objects.filter(quiz__quiz_end_datetime__lte=now()).delete()
     return f"{count} quizzes deactivated."
+
+
+@shared_task
+def fill_quiz_question_bank(quiz_id, rebuild=False):
+    clear_bank_pending(quiz_id)
+    if rebuild:
+        request_bank_rebuild(quiz_id)
+    quiz = Quiz.objects.filter(id=quiz_id, category=QuizCategory.MULTIPLE_CHOICE).first()
+    if not quiz:
+        return f"quiz {quiz_id} has no question bank."
+    if not acquire_bank_lock(quiz_id):
+        # the running fill tops the bank up and takes over a rebuild recorded meanwhile
+        return f"the bank of quiz {quiz_id} is being filled."
+    added = 0
+    try:
+        while True:
+            added += fill_question_bank(quiz, rebuild=take_bank_rebuild(quiz_id))
+            if not bank_rebuild_requested(quiz_id):
+                break
+    finally:
+        release_bank_lock(quiz_id)
+    if bank_rebuild_requested(quiz_id):
+        # requested after the last check but turned away by the lock
+        schedule_bank_fill(quiz_id, rebuild=True)
+    return f"{added} questions added to the bank of quiz {quiz_id}."
+
+
+@shared_task(bind=True, max_retries=10)
+def regenerate_quiz_content(self, quiz_id):
+    clear_content_pending(quiz_id)
+    if not acquire_content_lock(quiz_id):
+        raise self.retry(countdown=5)
+    try:
+        # read after taking the lock, so a run waiting on another one sees the latest content fields
+        quiz = Quiz.objects.filter(id=quiz_id).first()
+        if not quiz:
+            return f"quiz {quiz_id} does not exist."
+        version = regenerate_content(quiz)
+    finally:
+        release_content_lock(quiz_id)
+    return f"quiz {quiz_id} is on content version {version}."
+
+
+@shared_task(bind=True, max_retries=None)
+def provision_participation(self, participation_id, queued_at=None):
+    # participations of a busy quiz wait for a slot until the deadline instead of a retry count
+    queued_at = queued_at or time.time()
+    pending = BaseParticipation.objects.filter(id=participation_id, provisioning_status=ProvisioningStatus.PROVISIONING)
+    quiz_id = pending.values_list('quiz_id', flat=True).first()
+    if quiz_id is None:
+        return f"participation {participation_id} is not waiting for provisioning."
+
+    slot = acquire_provisioning_slot(quiz_id)
+    if slot is None:
+        if time.time() - queued_at >= provisioning_deadline():
+            mark_provisioned(participation_id, ProvisioningStatus.FAILED)
+            return f"participation {participation_id} found no provisioning slot."
+        raise self.retry(args=(participation_id, queued_at), countdown=slot_retry_countdown(self.request.retries))
+
+    try:
+        with transaction.atomic():
+            # the row lock keeps a duplicated task from generating the questions twice
+            participation = pending.select_for_update().first()
+            if participation is None:
+                return f"participation {participation_id} is already provisioned."
+            if not claim_prepared_questions(participation):
+                provision_content(participation)
+            mark_provisioned(participation_id, ProvisioningStatus.READY)
+    except Exception:
+        mark_provisioned(participation_id, ProvisioningStatus.FAILED)
+        raise
+    finally:
+        release_provisioning_slot(slot)
+    return f"participation {participation_id} is ready."
+
+
+@shared_task
+def prepare_participation_pools():
+    upcoming = Quiz.objects.filter(
+        category__in=[QuizCategory.MULTIPLE_CHOICE, QuizCategory.TYPING],
+        quiz_start_datetime__gt=now(),
+        quiz_start_datetime__lte=now() + pool_lead_time(),
+    )
+    quiz_ids = list(upcoming.values_list('id', flat=True))
+    for quiz_id in quiz_ids:
+        fill_quiz_participation_pool.delay(quiz_id)
+    return f"{len(quiz_ids)} participation pools scheduled."
+
+
+@shared_task
+def fill_quiz_participation_pool(quiz_id):
+    quiz = Quiz.objects.filter(id=quiz_id).first()
+    if not quiz:
+        return f"quiz {quiz_id} does not exist."
+    # the next beat run tops up whatever a concurrent fill leaves missing
+    if not acquire_pool_lock(quiz_id):
+        return f"participation pool of quiz {quiz_id} is already being filled."
+    try:
+        added = fill_participation_pool(quiz)
+    finally:
+        release_pool_lock(quiz_id)
+    return f"{added} participations prepared for quiz {quiz_id}."
@@ -1 +1,182 @@
-# Create your tests here.
+import random
+from datetime import timedelta
+from difflib import SequenceMatcher
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from exam.models import Quiz, OrderingChunk
+from exam.services.graph_writer import bulk_insert_graph, _assign_primary_keys
+from exam.services.mc_grading import answer_key_from_rows, parse_answers, grade
+from exam.services.question_factory.multiple_choice.generation_cost import GenerationCostBuffer, \
+    seconds_per_question
+from exam.services.question_factory.multiple_choice.providers.similarity_index import _BoundaryWords
+from exam.services.verse_window import VerseWindowCache
+from exam.services.question_factory.multiple_choice.sampling import IndexSampler, INFEASIBLE, \
+    BUDGET_EXHAUSTED, NO_CANDIDATES
+
+from quran.models import Surah, VerseText, Verse, Word
+
+SUBTYPE = SimpleNamespace(code=1)
+TEMPLATE = SimpleNamespace(code=10)
+
+
+class IndexSamplerTests(SimpleTestCase):
+    def test_each_pass_is_a_permutation(self):
+        sampler = IndexSampler(5, random.Random(1), budget=10)
+        drawn = []
+        for index in sampler:
+            drawn.append(index)
+            sampler.accept()
+        self.assertEqual(sorted(drawn[:5]), list(range(5)))
+        self.assertEqual(sorted(drawn[5:]), list(range(5)))
+        self.assertIsNone(sampler.shortfall(SUBTYPE, TEMPLATE, 10))
+
+    def test_stops_after_a_pass_without_accepted_draws(self):
+        sampler = IndexSampler(4, random.Random(1), budget=1000)
+        self.assertEqual(len(list(sampler)), 4)
+        shortfall = sampler.shortfall(SUBTYPE, TEMPLATE, 3)
+        self.assertEqual((shortfall.reason, shortfall.generated, shortfall.attempts), (INFEASIBLE, 0, 4))
+
+    def test_stops_at_the_budget(self):
+        sampler = IndexSampler(100, random.Random(1), budget=7)
+        for index in sampler:
+            if index % 2:
+                sampler.accept()
+        self.assertEqual(sampler.attempts, 7)
+        self.assertEqual(sampler.shortfall(SUBTYPE, TEMPLATE, 7).reason, BUDGET_EXHAUSTED)
+
+    def test_no_candidates(self):
+        sampler = IndexSampler(0, random.Random(1), budget=5)
+        self.assertEqual(list(sampler), [])
+        self.assertEqual(sampler.shortfall(SUBTYPE, TEMPLATE, 1).reason, NO_CANDIDATES)
+
+
+class GenerationCostTests(SimpleTestCase):
+    def setUp(self):
+        cache.delete_many(['exam:generation_cost:10', 'exam:generation_cost:11'])
+
+    @override_settings(QUESTION_GENERATION_COST_FLUSH_SECONDS=60)
+    def test_runs_are_summed_between_flushes(self):
+        costs = GenerationCostBuffer()
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            costs.add(10, 1.0, 10)
+            for _ in range(50):
+                costs.add(10, 2.0, 10)
+                costs.add(11, 1.0, 4)
+            self.assertEqual(set_many.call_count, 1)
+            self.assertEqual(seconds_per_question([10, 11])[10], 0.1)
+
+            costs.flush()
+        self.assertEqual(set_many.call_count, 2)
+        self.assertAlmostEqual(seconds_per_question([10])[10], 0.1 * 0.8 + 0.2 * 0.2)
+        self.assertAlmostEqual(seconds_per_question([11])[11], 0.25)
+
+
+class SimilarWordsTests(SimpleTestCase):
+    def test_letter_index_finds_every_word_a_full_scan_finds(self):
+        rng = random.Random(7)
+        words = _BoundaryWords()
+        for verse_id in range(3000):
+            word = ''.join(rng.choices('ابتسلمنهوي'[:rng.choice([4, 10])], k=rng.randint(1, 8)))
+            words.add(verse_id, word, word, '', '')
+        words.build_letter_index(0.7)
+
+        for word in rng.sample(list(words.vocabulary), 40) + ['ززز']:
+            scan = [c for c in words.vocabulary if c != word and SequenceMatcher(None, c, word).ratio() >= 0.7]
+            self.assertEqual([clean for _, clean in words.similar(word, 0.7)], scan, word)
+
+
+class GradingTests(SimpleTestCase):
+    def setUp(self):
+        # question 1 and 2 have inline options, question 3 uses Option rows 30-32
+        self.key = answer_key_from_rows([(1, ['a', 'b', 'c', 'd'], 2), (2, ['a', 'b', 'c', 'd'], 4), (3, [], None)],
+                                        [(3, 30, False), (3, 31, True), (3, 32, False)])
+
+    def test_grades_the_submission(self):
+        pairs = parse_answers({'answers': [{'question_id': 1, 'selected_option_id': 2},
+                                           {'question_id': '2', 'selected_option_id': 1},
+                                           {'question_id': 3, 'selected_option_id': None}]}, 3)
+        grading = grade(self.key, pairs)
+        self.assertEqual(grading.correct, {(1, 2)})
+        self.assertEqual((grading.correct_count, grading.wrong_count, grading.not_answered), (1, 1, 1))
+        self.assertEqual(self.key.legacy_ids, {3})
+
+    def test_legacy_options_are_option_ids(self):
+        grading = grade(self.key, [(3, 31)])
+        self.assertEqual(grading.correct, {(3, 31)})
+        with self.assertRaises(ValidationError):
+            grade(self.key, [(3, 2)])
+
+    def test_rejects_invalid_submissions(self):
+        with self.assertRaises(ValidationError):
+            parse_answers({'answers': [{'question_id': 1, 'selected_option_id': 2}]}, 3)
+        with self.assertRaises(ValidationError):
+            parse_answers({'answers': [{'question_id': 1, 'selected_option_id': 2}] * 2}, 2)
+        with self.assertRaises(ValidationError):
+            parse_answers({'answers': [{'question_id': 'x', 'selected_option_id': 2}]}, 1)
+        with self.assertRaises(ValidationError):
+            grade(self.key, [(9, 1)])
+        with self.assertRaises(ValidationError):
+            grade(self.key, [(1, 5)])
+
+
+class GraphWriterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        surah = Surah.objects.create(name='الفاتحة', arabic_name='الفاتحة', english_name='Al-Fatiha',
+                                     english_meaning='The Opening')
+        text = VerseText.objects.create(plain='', semi_tashkeel='', simple_tashkeel='', full_tashkeel='',
+                                        persian_friendly='', fuzzy='')
+        verse = Verse.objects.create(text=text, verse_number=1, surah=surah, page_number=1, section_number=1, juz=1)
+        user = get_user_model().objects.create(phone_number='09120000001')
+        cls.quiz = Quiz(title='q', category='ordering', start_verse=verse, end_verse=verse, creator=user,
+                        quiz_start_datetime=timezone.now(), quiz_end_datetime=timezone.now() + timedelta(hours=1),
+                        quiz_duration=60)
+        # no subtypes: nothing is generated for the quiz itself
+        cls.quiz.save()
+
+    def chunks(self, version, steps):
+        return [OrderingChunk(quiz=self.quiz, version=version, step_index=step, correct_order=[str(step)])
+                for step in steps]
+
+    def test_reads_primary_keys_back_by_the_whole_natural_key(self):
+        # an older set shares every field value of the new one, but no (version, step) pair
+        bulk_insert_graph(self.chunks(1, [1, 2]), ('quiz_id', 'version', 'step_index'))
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            chunks = bulk_insert_graph(self.chunks(2, [1, 2]) + self.chunks(1, [3]),
+                                       ('quiz_id', 'version', 'step_index'))
+        for chunk in chunks:
+            saved = OrderingChunk.objects.get(pk=chunk.pk)
+            self.assertEqual((saved.version, saved.step_index), (chunk.version, chunk.step_index))
+
+    def test_missing_rows_are_reported(self):
+        with self.assertRaisesMessage(RuntimeError, 'could not be read back'):
+            _assign_primary_keys(OrderingChunk, self.chunks(5, [1]), ('quiz_id', 'version', 'step_index'), 'default')
+
+
+class VerseWindowCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.surah = Surah.objects.create(name='الفاتحة', arabic_name='الفاتحة', english_name='Al-Fatiha',
+                                         english_meaning='The Opening')
+        text = VerseText.objects.create(plain='', semi_tashkeel='', simple_tashkeel='', full_tashkeel='',
+                                        persian_friendly='', fuzzy='')
+        cls.verse = Verse.objects.create(text=text, verse_number=1, surah=cls.surah, page_number=1,
+                                         section_number=1, juz=1)
+        Word.objects.create(arabic_text='a', word_number=1, verse=cls.verse, surah=cls.surah, type=1)
+
+    def test_word_changes_reach_the_windows_of_other_processes(self):
+        # two caches stand in for two worker processes sharing the cache
+        other_process = VerseWindowCache()
+        self.assertEqual(other_process.get(self.verse.id, self.verse.id).arabic_words, ('a',))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Word.objects.create(arabic_text='b', word_number=2, verse=self.verse, surah=self.surah, type=1)
+        self.assertEqual(other_process.get(self.verse.id, self.verse.id).arabic_words, ('a', 'b'))
@@ -1,8 +1,7 @@
 from datetime import timedelta
 
 from django.db import transaction
-from django.db.models import Q
-from django.shortcuts import get_object_or_404
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError, PermissionDenied
@@ -11,28 +10,47 @@ from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, GenericV
 
 from utils import status
 from utils.response import custom_response
-from .choices import QuizCategory
+from .choices import QuizCategory, ProvisioningStatus, ParticipationStatus
 from .models import Quiz, BaseParticipation, QuizLeaderboard, \
-    MultipleChoiceParticipation, OrderingParticipation, OrderingChunk, MultipleChoiceQuestion, MatchingChunk, \
-    MatchingParticipation, MatchingParticipationChunkProgress, TypingParticipation, \
-    TypingQuestion
+    MultipleChoiceParticipation, OrderingParticipation, MultipleChoiceQuestion, \
+    MatchingParticipation, MatchingParticipationChunkProgress, TypingParticipation
 from .permissions import IsAdminOrReadOnly, HasCompleteProfile
 from .serializers import QuizSerializer, BaseParticipationSerializer, UpdateCreateQuizSerializer, \
     CreateParticipationSerializer, MCParticipationReviewSerializer, QuizLeaderboardSerializer, \
     MultipleChoiceParticipationSerializer, OrderingChunkSerializer, \
     OrderingAnswerSerializer, OrderingParticipationSerializer, MultipleChoiceQuestionSerializer, \
     MatchingParticipationSerializer, MatchingChunkSerializer, MatchingAnswerSerializer, TypingQuestionSerializer, \
-    TypingParticipationSerializer, TypingAnswerSubmissionSerializer
+    TypingParticipationSerializer, TypingAnswerSubmissionSerializer, PlannedQuestionSerializer, \
+    QuizCapacitySerializer
+from .services.answer_keys import ordering_step, matching_step, typing_step, invalidate_participation_keys
+from .services.capacity import estimate_capacity
 from .services.participation import MCParticipationRestartService, MCParticipationSubmissionService, \
     OrderingParticipationRestartService, OrderingSubmissionService, MatchingSubmissionService, \
     MatchingParticipationRestartService, TypingParticipationRestartService, TypingAnswerSubmissionService
 from .services.question_factory.matching.matching_chunk_generator import MatchingChunkGenerator
-from .services.question_factory.multiple_choice.subtype_dispatcher import generate_questions as generate_mc_questions
+from .services.mc_review import get_cached_review, cache_review, invalidate_review
+from .services.participation_pool import claim_prepared_questions
+from .services.provisioning import async_provisioning_enabled, has_generated_content, provision_content, \
+    schedule_provisioning, wait_until_ready, claim_creation, record_creation, release_creation, retry_provisioning
+from .services.question_bank import provision_mc_questions
+from .services.quiz_content import step_count
+from .services.question_plan import get_planned_questions
 from .services.question_factory.ordering.ordering_chunk_generator import ordering_subtype_dispatcher
 from .services.question_factory.typing.typing_question_generator import CommonTypingQuestionGenerator, \
     MiddleWordTypingQuestionGenerator
 
 
+def provisioning_error(participation):
+    """Error response while the questions of ``participation`` are not generated, else ``None``."""
+    if participation.provisioning_status == ProvisioningStatus.PROVISIONING:
+        return custom_response(error={'message': 'The questions are being prepared'},
+                               status_code=status.CONFLICT_409)
+    if participation.provisioning_status == ProvisioningStatus.FAILED:
+        return custom_response(error={'message': 'Preparing the questions failed, please retry'},
+                               status_code=status.SERVER_ERROR_500)
+    return None
+
+
 class QuizViewSet(ModelViewSet):
     queryset = Quiz.objects.prefetch_related('subtypes').select_related('start_verse', 'end_verse').all()
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -41,10 +59,21 @@ class QuizViewSet(ModelViewSet):
         return {"request": self.request}
 
     def get_serializer_class(self):
+        if self.action == 'capacity':
+            return QuizCapacitySerializer
         if self.request.method in ['POST', 'PUT']:
             return UpdateCreateQuizSerializer
         return QuizSerializer
 
+    @action(detail=False, methods=['post'], url_path='capacity')
+    def capacity(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        report = estimate_capacity(data['start_verse'].id, data['end_verse'].id, data['subtypes'],
+                                   data['question_count'])
+        return custom_response(data=report)
+
 class QuizLeaderboardViewSet(ReadOnlyModelViewSet):
     serializer_class = QuizLeaderboardSerializer
     permission_classes = [IsAuthenticated]
@@ -68,7 +97,6 @@ class ParticipationViewSet(ModelViewSet):
             BaseParticipation.objects
             .select_related('quiz__start_verse', 'quiz__end_verse', 'quiz')
             .prefetch_related('quiz__subtypes')
-            .prefetch_related('quiz__chunks')
             .all()
         )
         if not self.request.user.is_staff:
@@ -79,53 +107,126 @@ class ParticipationViewSet(ModelViewSet):
         return {"request": self.request}
 
     def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        participation = self.get_queryset().get(pk=serializer.instance.pk)
+        # a repeated Idempotency-Key returns the participation it created; without one, a second
+        # request for the same quiz is turned away while the first is still running
+        user_id = request.user.id
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            claimed, participation_id = claim_creation(user_id, idempotency_key)
+            if not claimed:
+                if participation_id is None:
+                    return custom_response(error={'message': 'This participation is already being created'},
+                                           status_code=status.CONFLICT_409)
+                return self.participation_response(participation_id, status.OK_200)
+
+        quiz_key = f"quiz:{request.data.get('quiz')}"
+        if not claim_creation(user_id, quiz_key)[0]:
+            if idempotency_key:
+                release_creation(user_id, idempotency_key)
+            return custom_response(error={'message': 'This participation is already being created'},
+                                   status_code=status.CONFLICT_409)
+        try:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
+        except Exception:
+            if idempotency_key:
+                release_creation(user_id, idempotency_key)
+            raise
+        finally:
+            release_creation(user_id, quiz_key)
+
+        if idempotency_key:
+            record_creation(user_id, idempotency_key, serializer.instance.pk)
+        return self.participation_response(serializer.instance.pk, status.CREATED_201)
+
+    def participation_response(self, participation_id, status_code):
+        participation = self.get_queryset().get(pk=participation_id)
         output_serializer = BaseParticipationSerializer(participation, context=self.get_serializer_context())
         return custom_response(
             data={
                 'participation': output_serializer.data,
             },
-            status_code=status.CREATED_201
+            status_code=status_code
         )
 
     def perform_create(self, serializer):
         with transaction.atomic():
-            participation = serializer.save(user=self.request.user)
-            quiz = participation.quiz
+            quiz = serializer.validated_data['quiz']
+            participation = serializer.save(user=self.request.user, content_version=quiz.content_version)
 
             if quiz.category == QuizCategory.MULTIPLE_CHOICE:
-                multiple_choice_participation = MultipleChoiceParticipation.objects.create(participation=participation)
-                generate_mc_questions(participation=multiple_choice_participation, quiz=quiz)
+                MultipleChoiceParticipation.objects.create(participation=participation)
             elif quiz.category == QuizCategory.ORDERING:
-                chunk_count = len(quiz.chunks.all())
+                chunk_count = step_count(quiz, participation.content_version)
                 OrderingParticipation.objects.create(participation=participation, total_steps=chunk_count)
             elif quiz.category == QuizCategory.MATCHING:
-                chunk_count = len(quiz.matching_chunks.all())
+                chunk_count = step_count(quiz, participation.content_version)
                 MatchingParticipation.objects.create(participation=participation, total_steps=chunk_count)
             elif quiz.category == QuizCategory.TYPING:
-                total_steps = len(quiz.typing_questions.all())
-                typing_participation = TypingParticipation.objects.create(participation=participation,
-                                                                          total_steps=total_steps)
-                generator = MiddleWordTypingQuestionGenerator(typing_participation)
-                if quiz.subtypes.first().code == 13:
-                    generator.generate()
+                total_steps = step_count(quiz, participation.content_version)
+                TypingParticipation.objects.create(participation=participation, total_steps=total_steps)
+
+            if has_generated_content(participation) and not claim_prepared_questions(participation):
+                if async_provisioning_enabled():
+                    schedule_provisioning(participation)
+                else:
+                    provision_content(participation)
 
         return participation
 
+    @action(detail=True, methods=['get'], url_path='ready')
+    def ready(self, request, pk=None):
+        """Provisioning state of a participation; ``?wait=<seconds>`` holds the request until it changes."""
+        participation = self.get_object()
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            return custom_response(error={'message': 'wait must be a number of seconds'},
+                                   status_code=status.BAD_REQUEST_400)
+
+        if wait > 0 and participation.provisioning_status == ProvisioningStatus.PROVISIONING:
+            participation.provisioning_status = wait_until_ready(participation.id, wait)
+        serializer = self.get_serializer(participation)
+        return custom_response(data={
+            'ready': participation.provisioning_status == ProvisioningStatus.READY,
+            'participation': serializer.data,
+        })
+
+    @action(detail=True, methods=['post'], url_path='provision')
+    def provision(self, request, pk=None):
+        """Prepares the questions of a participation whose provisioning failed once more."""
+        participation = self.get_object()
+        if async_provisioning_enabled():
+            retried = retry_provisioning(participation)
+        else:
+            with transaction.atomic():
+                retried = (BaseParticipation.objects.select_for_update()
+                           .filter(pk=participation.pk, provisioning_status=ProvisioningStatus.FAILED).first()) is not None
+                if retried:
+                    provision_content(participation)
+                    participation.provisioning_status = ProvisioningStatus.READY
+                    participation.save(update_fields=['provisioning_status'])
+        if not retried:
+            return custom_response(error={'message': 'Only a participation whose preparation failed can be retried'},
+                                   status_code=status.CONFLICT_409)
+        serializer = self.get_serializer(participation)
+        return custom_response(data={
+            'ready': participation.provisioning_status == ProvisioningStatus.READY,
+            'participation': serializer.data,
+        })
+
 
 class MultipleChoiceParticipationViewSet(GenericViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = MultipleChoiceParticipation.objects.prefetch_related('questions', 'questions__options').all()
+    queryset = MultipleChoiceParticipation.objects.select_related('participation').all()
 
     def get_serializer_class(self):
         if self.action == 'question':
             return MultipleChoiceQuestionSerializer
         elif self.action == 'restart':
             return BaseParticipationSerializer
-        elif self.action == 'submit':
+        elif self.action in ('submit', 'review'):
             return MCParticipationReviewSerializer
         else:
             return MultipleChoiceParticipationSerializer
@@ -142,6 +243,10 @@ class MultipleChoiceParticipationViewSet(GenericViewSet):
         base_participation = mc_participation.participation
         quiz = base_participation.quiz
 
+        error = provisioning_error(base_participation)
+        if error:
+            return error
+
         now = timezone.now()
 
         if not base_participation.started_at or not base_participation.deadline:
@@ -152,7 +257,13 @@ class MultipleChoiceParticipationViewSet(GenericViewSet):
         if base_participation.deadline < now:
             return custom_response(error={'message': 'the deadline is passed'})
 
-        questions = MultipleChoiceQuestion.objects.prefetch_related('options').filter(participation=mc_participation)
+        if mc_participation.is_planned:
+            serializer = PlannedQuestionSerializer(get_planned_questions(mc_participation), many=True)
+            return custom_response(data=serializer.data)
+
+        questions = list(MultipleChoiceQuestion.objects.filter(participation=mc_participation).order_by('position', 'id'))
+        # questions from before inline options read their Option rows; one query for all of them
+        prefetch_related_objects([q for q in questions if not q.has_inline_options], 'options')
         serializer = self.get_serializer_class()(questions, many=True)
         return custom_response(data=serializer.data)
 
@@ -161,15 +272,17 @@ class MultipleChoiceParticipationViewSet(GenericViewSet):
         old_mc_participation = self.get_object()
         base_participation = old_mc_participation.participation
         quiz = base_participation.quiz
+        invalidate_participation_keys(mc_participation_id=old_mc_participation.id)
 
         service = MCParticipationRestartService(quiz=quiz, old_participation=base_participation, user=request.user)
 
         try:
             with transaction.atomic():
                 new_participation = service.get_participation()
+                invalidate_review(new_participation.id)
                 MultipleChoiceParticipation.objects.filter(participation=new_participation).delete()
                 new_mc_participation = MultipleChoiceParticipation.objects.create(participation=new_participation)
-                generate_mc_questions(participation=new_mc_participation, quiz=quiz)
+                provision_mc_questions(quiz=quiz, participation=new_mc_participation)
         except ValidationError as e:
             return custom_response(error={'detail': str(e.detail)}, status_code=status.BAD_REQUEST_400)
 
@@ -189,8 +302,23 @@ class MultipleChoiceParticipationViewSet(GenericViewSet):
             return custom_response(error={'detail': str(e.detail)}, status_code=status.BAD_REQUEST_400)
 
         serializer = self.get_serializer_class()(updated_participation, context={'request': request})
+        cache_review(updated_participation.id, serializer.data)
         return custom_response(data={'participation': serializer.data})
 
+    @action(detail=True, methods=['get'], url_path='review')
+    def review(self, request, pk=None):
+        mc_participation = self.get_object()
+        base_participation = mc_participation.participation
+        if base_participation.status != ParticipationStatus.COMPLETED:
+            return custom_response(error={'message': 'The participation is not submitted yet'},
+                                   status_code=status.BAD_REQUEST_400)
+
+        review = get_cached_review(base_participation.id)
+        if review is None:
+            review = self.get_serializer_class()(base_participation, context={'request': request}).data
+            cache_review(base_participation.id, review)
+        return custom_response(data={'participation': review})
+
 
 class OrderingParticipationViewSet(GenericViewSet):
     permission_classes = [IsAuthenticated]
@@ -228,11 +356,7 @@ class OrderingParticipationViewSet(GenericViewSet):
         if base_participation.deadline < now:
             return custom_response(error={'message': 'Deadline is passed'}, status_code=status.BAD_REQUEST_400)
 
-        chunk = get_object_or_404(
-            OrderingChunk,
-            quiz=quiz,
-            step_index=ordering_participation.current_step
-        )
+        chunk = ordering_step(quiz.id, base_participation.content_version, ordering_participation.current_step)
 
         serializer = self.get_serializer_class()(chunk)
         return custom_response(data=serializer.data)
@@ -258,7 +382,6 @@ class OrderingParticipationViewSet(GenericViewSet):
         old_ordering_participation = self.get_object()
         base_participation = old_ordering_participation.participation
         quiz = base_participation.quiz
-        total_steps = len(quiz.chunks.all())
 
         service = OrderingParticipationRestartService(
             quiz=quiz,
@@ -272,7 +395,7 @@ class OrderingParticipationViewSet(GenericViewSet):
                 OrderingParticipation.objects.filter(participation=new_participation).delete()
                 new_ordering_participation = OrderingParticipation.objects.create(
                     participation=new_participation,
-                    total_steps=total_steps
+                    total_steps=step_count(quiz, new_participation.content_version)
                 )
         except ValidationError as e:
             return custom_response(error={'detail': str(e.detail)}, status_code=status.BAD_REQUEST_400)
@@ -317,11 +440,7 @@ class MatchingParticipationViewSet(GenericViewSet):
         if base_participation.deadline < now:
             return custom_response(error={'message': 'Deadline is passed'}, status_code=status.BAD_REQUEST_400)
 
-        chunk = get_object_or_404(
-            MatchingChunk,
-            quiz=quiz,
-            step_index=matching_participation.current_step
-        )
+        chunk = matching_step(quiz.id, base_participation.content_version, matching_participation.current_step)
 
         serializer = self.get_serializer_class()(chunk)
 
@@ -336,11 +455,11 @@ class MatchingParticipationViewSet(GenericViewSet):
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        chunk = MatchingChunk.objects.get(quiz=quiz, step_index=participation.current_step)
+        chunk = matching_step(quiz.id, base_participation.content_version, participation.current_step)
 
         chunk_progress, _ = MatchingParticipationChunkProgress.objects.get_or_create(
             participation=participation,
-            chunk=chunk,
+            chunk_id=chunk.id,
             defaults={"matched_pairs": []}
         )
 
@@ -359,7 +478,6 @@ class MatchingParticipationViewSet(GenericViewSet):
         old_matching_participation = self.get_object()
         base_participation = old_matching_participation.participation
         quiz = base_participation.quiz
-        total_steps = len(quiz.chunks.all())
 
         service = MatchingParticipationRestartService(
             quiz=quiz,
@@ -373,7 +491,7 @@ class MatchingParticipationViewSet(GenericViewSet):
                 MatchingParticipation.objects.filter(participation=new_participation).delete()
                 new_ordering_participation = MatchingParticipation.objects.create(
                     participation=new_participation,
-                    total_steps=total_steps
+                    total_steps=step_count(quiz, new_participation.content_version)
                 )
         except ValidationError as e:
             return custom_response(error={'detail': e.detail}, status_code=status.BAD_REQUEST_400)
@@ -408,6 +526,10 @@ class TypingParticipationViewSet(GenericViewSet):
         base_participation = participation.participation
         quiz = base_participation.quiz
 
+        error = provisioning_error(base_participation)
+        if error:
+            return error
+
         now = timezone.now()
         if not base_participation.started_at or not base_participation.deadline:
             base_participation.started_at = now
@@ -417,8 +539,7 @@ class TypingParticipationViewSet(GenericViewSet):
         if base_participation.deadline < now:
             return custom_response(error={'message': 'The deadline is passed'})
 
-        question = get_object_or_404(TypingQuestion.objects.filter(Q(quiz=quiz) | Q(participation=participation)),
-                                     step_index=participation.current_step)
+        question = typing_step(participation, quiz.id, base_participation.content_version, participation.current_step)
         serializer = self.get_serializer_class()(question)
 
         return custom_response(data=serializer.data)
@@ -428,7 +549,8 @@ class TypingParticipationViewSet(GenericViewSet):
         old_typing_participation = self.get_object()
         base_participation = old_typing_participation.participation
         quiz = base_participation.quiz
-        total_steps = len(quiz.chunks.all())
+        invalidate_participation_keys(typing_participation_id=old_typing_participation.id,
+                                      step_indexes=range(old_typing_participation.total_steps + 1))
 
         service = TypingParticipationRestartService(
             quiz=quiz,
@@ -442,7 +564,7 @@ class TypingParticipationViewSet(GenericViewSet):
                 TypingParticipation.objects.filter(participation=new_participation).delete()
                 new_typing_participation = TypingParticipation.objects.create(
                     participation=new_participation,
-                    total_steps=total_steps
+                    total_steps=step_count(quiz, new_participation.content_version)
                 )
                 if quiz.subtypes.first().code == 13:
                     generator = MiddleWordTypingQuestionGenerator(new_typing_participation)
@@ -459,7 +581,7 @@ class TypingParticipationViewSet(GenericViewSet):
         service = TypingAnswerSubmissionService(participation)
         question = service.get_current_question()
         answer_serializer = TypingAnswerSubmissionSerializer(data=request.data,
-                                                             context={'question_type': question.template.code})
+                                                             context={'question_type': question.template_code})
         answer_serializer.is_valid(raise_exception=True)
         user_input = answer_serializer.data['answer']
         result = service.submit(user_input)
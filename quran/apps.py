@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuranConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quran'
+
+    def ready(self):
+        import quran.signals
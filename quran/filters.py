@@ -13,6 +13,7 @@ from quran.models import (
                   Word,
                     TafseerAudio
     )
+from quran.services.interval_index import filter_by_aya_range
 
 
 class SurahFilter(django_filters.FilterSet):
@@ -71,9 +72,9 @@ class TranslatorFilter(django_filters.FilterSet):
 class VerseTranslationFilter(django_filters.FilterSet):
     verse = django_filters.NumberFilter(label='verse')
     translator = django_filters.ModelChoiceFilter(
-        queryset=Translator.objects.filter(translation_type='verse').distinct(),
+        queryset=Translator.objects.filter(translation_type='verse'),
         label='translator'
-    )                       #  تغییر باید بکند و بهینه تر شود فعلا تستی هست 
+    )
     surah = django_filters.NumberFilter(label='surah')
 
     class Meta:
@@ -84,7 +85,7 @@ class VerseTranslationFilter(django_filters.FilterSet):
 class WordMeaningFilter(django_filters.FilterSet):
     verse = django_filters.NumberFilter(label='verse')
     translator = django_filters.ModelChoiceFilter(
-        queryset=Translator.objects.filter(translation_type='word').distinct(),
+        queryset=Translator.objects.filter(translation_type='word'),
         label='translator'
     )   
     surah = django_filters.NumberFilter(label='surah')
@@ -94,9 +95,50 @@ class WordMeaningFilter(django_filters.FilterSet):
         model = WordMeaning
         fields = ['verse', 'surah', 'translator', 'root_id']
 
-class TafseerFilter(django_filters.FilterSet):
+class AyaRangeFilterSet(django_filters.FilterSet):
+    """
+    Adds ``aya_from``/``aya_to`` to filtersets of models with ``from_aya``/``to_aya`` ranges.
+    Returns the segments covering any verse of the requested range of ``surah``;
+    a single verse can be requested with ``aya_from`` alone.
+    """
+    aya_from = django_filters.NumberFilter(method='filter_aya_range', label='aya_from')
+    aya_to = django_filters.NumberFilter(method='filter_aya_range', label='aya_to')
+
+    def is_valid(self) -> bool:
+        if not super().is_valid():
+            return False
+        data = self.form.cleaned_data
+        if data.get('surah') is None and (data.get('aya_from') is not None or data.get('aya_to') is not None):
+            self.form.add_error('surah', 'surah is required with aya_from/aya_to.')
+            return False
+        return True
+
+    def filter_aya_range(self, queryset: QuerySet[Any], name: str, value: Any) -> QuerySet[Any]:
+        # applied once for both bounds in filter_queryset
+        return queryset
+
+    def filter_queryset(self, queryset: QuerySet[Any]) -> QuerySet[Any]:
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        aya_from = data.get('aya_from')
+        aya_to = data.get('aya_to')
+        surah = data.get('surah')
+        if surah is None or (aya_from is None and aya_to is None):
+            return queryset
+
+        translator = data.get('translator')
+        return filter_by_aya_range(
+            queryset,
+            surah_id=int(surah),
+            from_aya=aya_from if aya_from is not None else aya_to,
+            to_aya=aya_to if aya_to is not None else aya_from,
+            translator_id=translator.id if translator else None,
+        )
+
+
+class TafseerFilter(AyaRangeFilterSet):
     translator = django_filters.ModelChoiceFilter(
-        queryset=Translator.objects.filter(translation_type='tafseer').distinct(),
+        queryset=Translator.objects.filter(translation_type='tafseer'),
         label='translator'
     )
     surah = django_filters.NumberFilter(label='surah')
@@ -105,23 +147,23 @@ class TafseerFilter(django_filters.FilterSet):
 
     class Meta:
         model = Tafseer
-        fields = ['translator', 'surah', 'from_aya', 'to_aya']
+        fields = ['translator', 'surah', 'from_aya', 'to_aya', 'aya_from', 'aya_to']
 
-class TranslationAudioFilter(django_filters.FilterSet):
+class TranslationAudioFilter(AyaRangeFilterSet):
     translator = django_filters.ModelChoiceFilter(
-        queryset=Translator.objects.filter(translation_type='audio').distinct(),
+        queryset=Translator.objects.filter(translation_type='audio'),
         label='translator')
     surah = django_filters.NumberFilter(label='surah')
     from_aya = django_filters.NumberFilter(label='from_aya')
     to_aya = django_filters.NumberFilter(label='to_aya')
     class Meta:
         model = TranslationAudio
-        fields = ['translator', 'surah', 'from_aya', 'to_aya']
+        fields = ['translator', 'surah', 'from_aya', 'to_aya', 'aya_from', 'aya_to']
 
 
-class TafseerAudioFilter(django_filters.FilterSet):
+class TafseerAudioFilter(AyaRangeFilterSet):
     translator = django_filters.ModelChoiceFilter(
-        queryset=Translator.objects.filter(translation_type='audioTafseer').distinct(),
+        queryset=Translator.objects.filter(translation_type='audioTafseer'),
         label='translator'
     )
     surah = django_filters.NumberFilter(label='surah')
@@ -130,7 +172,7 @@ class TafseerAudioFilter(django_filters.FilterSet):
 
     class Meta:
         model = TafseerAudio
-        fields = ['translator', 'surah', 'from_aya', 'to_aya']
+        fields = ['translator', 'surah', 'from_aya', 'to_aya', 'aya_from', 'aya_to']
 
 class QariFilter(django_filters.FilterSet):
 
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quran.services.verse_strings import rebuild_verse_strings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-verse strings (text from words, first words, reference labels) used by the quizzes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        created = rebuild_verse_strings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{created} verse strings written.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from quran.services.word_gloss import rebuild_word_glosses
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the per-word gloss table from WordMeaning.meanings. Edits through the ORM keep it in '
+            'sync; run this after loading WordMeaning rows with raw SQL or bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--translator', type=int, action='append', dest='translators',
+                            help='Only rebuild the given word translator (can be repeated).')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        created = rebuild_word_glosses(translator_ids=options['translators'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{created} word glosses written.'))
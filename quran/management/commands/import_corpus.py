@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quran.services.bulk_import import IMPORT_TARGETS, import_records, iter_records
+
+
+class Command(BaseCommand):
+    help = 'Bulk import Quran corpus data (translations, words, tafseer, search table, ...) from CSV/JSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=sorted(IMPORT_TARGETS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'], dest='file_format',
+                            help='Source format; guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--method', choices=['auto', 'native', 'bulk'], default='auto',
+                            help='native = COPY / LOAD DATA, bulk = bulk_create, auto picks native when available.')
+        parser.add_argument('--translator', type=int,
+                            help='Translator id for rows that do not carry one; limits --replace and the rebuild.')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete the existing rows (of --translator, if given) before loading.')
+        parser.add_argument('--keep-indexes', action='store_true',
+                            help='Do not drop secondary indexes during the load.')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Do not rebuild glosses, coverage, search_table, verse strings and page caches afterwards.')
+
+    def handle(self, *args, **options):
+        model = IMPORT_TARGETS[options['target']]
+        started = time.monotonic()
+        try:
+            result = import_records(
+                model,
+                iter_records(options['path'], options['file_format']),
+                batch_size=options['batch_size'],
+                method=options['method'],
+                translator_id=options['translator'],
+                replace=options['replace'],
+                rebuild_indexes=not options['keep_indexes'],
+                rebuild=not options['skip_derived'],
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        method = 'native load' if result['native'] else 'bulk_create'
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['loaded']} {model._meta.verbose_name_plural} rows imported via {method} "
+            f"in {time.monotonic() - started:.1f}s ({result['indexes']} indexes rebuilt)."
+        ))
+        if result['rebuilt']:
+            self.stdout.write(f"Rebuilt: {', '.join(result['rebuilt'])}")
+        for name in result['stale']:
+            if name not in IMPORT_TARGETS:
+                self.stderr.write(self.style.WARNING(
+                    f"{name} could not be cleared on this cache backend and are served until they expire."
+                ))
+                continue
+            self.stderr.write(self.style.WARNING(
+                f"{name} could not be rebuilt on this database backend and is now out of date; "
+                f"re-import it with `import_corpus {name} <path>`."
+            ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from quran.services.translator_catalog import refresh_coverage
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-translator coverage statistics and rebuild the cached translator catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--translator', type=int, action='append', dest='translators',
+                            help='Only refresh the given translator (can be repeated).')
+        parser.add_argument('--no-import-stamp', action='store_false', dest='imported',
+                            help='Do not update last_imported_at (e.g. for a plain recount).')
+
+    def handle(self, *args, **options):
+        count = refresh_coverage(translator_ids=options['translators'], imported=options['imported'])
+        self.stdout.write(self.style.SUCCESS(f'{count} translator coverages refreshed.'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0002_delete_unwantedword'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tafseer',
+            index=models.Index(fields=['surah', 'translator', 'from_aya', 'to_aya'], name='quran_tafse_surah_i_a34dab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tafseeraudio',
+            index=models.Index(fields=['surah', 'translator', 'from_aya', 'to_aya'], name='quran_tafse_surah_i_d7e002_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translationaudio',
+            index=models.Index(fields=['surah', 'translator', 'from_aya', 'to_aya'], name='quran_trans_surah_i_531cdb_idx'),
+        ),
+    ]
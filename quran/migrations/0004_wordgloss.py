@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0003_tafseer_interval_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordGloss',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word_number', models.PositiveSmallIntegerField(verbose_name='شماره کلمه')),
+                ('gloss', models.TextField(verbose_name='ترجمه کلمه')),
+                ('root_id', models.IntegerField(blank=True, null=True, verbose_name='شناسه ریشه')),
+                ('translator', models.ForeignKey(limit_choices_to={'translation_type': 'word'}, on_delete=django.db.models.deletion.CASCADE, related_name='word_glosses', to='quran.translator', verbose_name='منبع')),
+                ('verse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='word_glosses', to='quran.verse', verbose_name='آیه')),
+            ],
+            options={
+                'verbose_name': 'ترجمه تک\u200cکلمه',
+                'verbose_name_plural': 'ترجمه\u200cهای تک\u200cکلمه',
+                'unique_together': {('translator', 'verse', 'word_number')},
+            },
+        ),
+    ]
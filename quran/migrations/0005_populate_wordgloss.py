@@ -0,0 +1,112 @@
+import json
+from collections import defaultdict
+
+from django.db import migrations
+
+# frozen copy of quran.services.word_gloss as of this migration; the service may change with the models
+GLOSS_KEYS = ('gloss', 'meaning', 'translation', 'text', 'fa', 'persian', 'en', 'english')
+WORD_NUMBER_KEYS = ('word_number', 'number', 'index', 'position')
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _gloss_text(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, dict):
+        for key in GLOSS_KEYS:
+            text = _gloss_text(value.get(key))
+            if text:
+                return text
+        return None
+    if isinstance(value, (list, tuple)):
+        parts = [text for text in (_gloss_text(v) for v in value) if text]
+        return '، '.join(parts) or None
+    return str(value)
+
+
+def _gloss_from_item(item, default_number):
+    text = _gloss_text(item)
+    if not text:
+        return None
+    if isinstance(item, dict):
+        number = next((_to_int(item[k]) for k in WORD_NUMBER_KEYS if k in item), None)
+        return (number if number is not None else default_number), text, _to_int(item.get('root_id'))
+    return default_number, text, None
+
+
+def _extract_glosses(meanings):
+    if isinstance(meanings, str):
+        try:
+            meanings = json.loads(meanings)
+        except ValueError:
+            return [(None, meanings.strip(), None)] if meanings.strip() else []
+
+    if isinstance(meanings, (list, tuple)):
+        glosses = [_gloss_from_item(item, position) for position, item in enumerate(meanings, start=1)]
+        return [g for g in glosses if g]
+
+    if isinstance(meanings, dict):
+        if meanings and all(_to_int(key) is not None for key in meanings):
+            glosses = [_gloss_from_item(value, _to_int(key)) for key, value in meanings.items()]
+            return [g for g in glosses if g]
+        gloss = _gloss_from_item(meanings, None)
+        return [gloss] if gloss else []
+
+    return []
+
+
+def forwards(apps, schema_editor):
+    WordMeaning = apps.get_model('quran', 'WordMeaning')
+    WordGloss = apps.get_model('quran', 'WordGloss')
+    WordGloss.objects.all().delete()
+
+    next_number = defaultdict(lambda: 1)
+    seen = set()
+    batch = []
+    rows = (WordMeaning.objects.order_by('translator_id', 'verse_id', 'id')
+            .values_list('translator_id', 'verse_id', 'meanings', 'root_id'))
+    for translator_id, verse_id, meanings, row_root_id in rows.iterator(chunk_size=2000):
+        glosses = _extract_glosses(meanings)
+        for word_number, gloss, root_id in glosses:
+            pair = (translator_id, verse_id)
+            if word_number is None:
+                word_number = next_number[pair]
+            next_number[pair] = max(next_number[pair], word_number + 1)
+
+            key = (translator_id, verse_id, word_number)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if root_id is None and len(glosses) == 1:
+                root_id = row_root_id
+            batch.append(WordGloss(translator_id=translator_id, verse_id=verse_id, word_number=word_number,
+                                   gloss=gloss, root_id=root_id))
+            if len(batch) >= 2000:
+                WordGloss.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        WordGloss.objects.bulk_create(batch)
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('quran', 'WordGloss').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0004_wordgloss'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0005_populate_wordgloss'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslatorCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verse_count', models.PositiveIntegerField(default=0, verbose_name='تعداد آیات پوشش داده شده')),
+                ('surah_coverage', models.CharField(default='000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000000', max_length=114, verbose_name='نقشه پوشش سوره\u200cها')),
+                ('text_size', models.BigIntegerField(default=0, verbose_name='حجم کل متن')),
+                ('last_imported_at', models.DateTimeField(blank=True, null=True, verbose_name='آخرین ورود داده')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='زمان محاسبه')),
+                ('translator', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='coverage', to='quran.translator', verbose_name='مترجم / منبع')),
+            ],
+            options={
+                'verbose_name': 'پوشش مترجم',
+                'verbose_name_plural': 'پوشش مترجمان',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0006_translatorcoverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerseString',
+            fields=[
+                ('verse', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='strings', serialize=False, to='quran.verse', verbose_name='آیه')),
+                ('text', models.TextField(verbose_name='متن آیه از کلمات')),
+                ('signature', models.CharField(max_length=200, verbose_name='دو کلمه اول')),
+                ('reference_fa', models.CharField(max_length=200, verbose_name='نشانی فارسی')),
+                ('reference_ar', models.CharField(max_length=200, verbose_name='نشانی عربی')),
+            ],
+            options={
+                'verbose_name': 'رشته\u200cهای آیه',
+                'verbose_name_plural': 'رشته\u200cهای آیات',
+            },
+        ),
+    ]
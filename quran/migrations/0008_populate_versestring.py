@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+# frozen copy of quran.services.verse_strings as of this migration; the service may change with the models
+BATCH_SIZE = 2000
+
+
+def forwards(apps, schema_editor):
+    Verse = apps.get_model('quran', 'Verse')
+    Word = apps.get_model('quran', 'Word')
+    VerseString = apps.get_model('quran', 'VerseString')
+
+    words = defaultdict(list)
+    rows = (Word.objects.filter(type=1, verse__isnull=False)
+            .order_by('verse_id', 'word_number').values_list('verse_id', 'arabic_text'))
+    for verse_id, arabic in rows.iterator(chunk_size=5000):
+        words[verse_id].append(arabic)
+
+    VerseString.objects.all().delete()
+    batch = []
+    for verse_id, surah_name, verse_number in (Verse.objects.order_by('id')
+                                               .values_list('id', 'surah__name', 'verse_number')):
+        verse_words = words.get(verse_id, [])
+        batch.append(VerseString(
+            verse_id=verse_id,
+            text=' '.join(verse_words),
+            signature=' '.join(verse_words[:2]),
+            reference_fa=f'آیه {verse_number} سوره {surah_name}',
+            reference_ar=f'سوره {surah_name} آيه {verse_number}',
+        ))
+        if len(batch) >= BATCH_SIZE:
+            VerseString.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        VerseString.objects.bulk_create(batch)
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('quran', 'VerseString').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quran', '0007_versestring'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -109,6 +109,22 @@ class Translator(models.Model):
         return f"{self.name} ({self.get_translation_type_display()})"
 
 
+class TranslatorCoverage(models.Model):
+    translator = models.OneToOneField(Translator, on_delete=models.CASCADE, related_name='coverage', verbose_name='مترجم / منبع')
+    verse_count = models.PositiveIntegerField(default=0, verbose_name='تعداد آیات پوشش داده شده')
+    surah_coverage = models.CharField(max_length=114, default='0' * 114, verbose_name='نقشه پوشش سوره‌ها')
+    text_size = models.BigIntegerField(default=0, verbose_name='حجم کل متن')
+    last_imported_at = models.DateTimeField(null=True, blank=True, verbose_name='آخرین ورود داده')
+    computed_at = models.DateTimeField(auto_now=True, verbose_name='زمان محاسبه')
+
+    class Meta:
+        verbose_name = 'پوشش مترجم'
+        verbose_name_plural = 'پوشش مترجمان'
+
+    def __str__(self):
+        return f'{self.translator.name} - {self.verse_count}'
+
+
 class VerseTranslation(models.Model):
     verse = models.ForeignKey(Verse, on_delete=models.PROTECT, verbose_name='آیه', related_name='translations')
     translator = models.ForeignKey(Translator, on_delete=models.PROTECT, verbose_name='مترجم / منبع', related_name='verse_translations')
@@ -144,6 +160,37 @@ class WordMeaning(models.Model):
         return f"{self.arabic_word} - {self.persian_word or '-'}"
     
 
+class WordGloss(models.Model):
+    verse = models.ForeignKey(Verse, on_delete=models.CASCADE, related_name='word_glosses', verbose_name='آیه')
+    word_number = models.PositiveSmallIntegerField(verbose_name='شماره کلمه')
+    translator = models.ForeignKey(Translator, on_delete=models.CASCADE, limit_choices_to={'translation_type': 'word'}, verbose_name='منبع', related_name='word_glosses')
+    gloss = models.TextField(verbose_name='ترجمه کلمه')
+    root_id = models.IntegerField(null=True, blank=True, verbose_name='شناسه ریشه')
+
+    class Meta:
+        verbose_name = 'ترجمه تک‌کلمه'
+        verbose_name_plural = 'ترجمه‌های تک‌کلمه'
+        unique_together = ('translator', 'verse', 'word_number')
+
+    def __str__(self):
+        return f'{self.verse_id}:{self.word_number} - {self.gloss}'
+
+
+class VerseString(models.Model):
+    verse = models.OneToOneField(Verse, on_delete=models.CASCADE, primary_key=True, related_name='strings', verbose_name='آیه')
+    text = models.TextField(verbose_name='متن آیه از کلمات')
+    signature = models.CharField(max_length=200, verbose_name='دو کلمه اول')
+    reference_fa = models.CharField(max_length=200, verbose_name='نشانی فارسی')
+    reference_ar = models.CharField(max_length=200, verbose_name='نشانی عربی')
+
+    class Meta:
+        verbose_name = 'رشته‌های آیه'
+        verbose_name_plural = 'رشته‌های آیات'
+
+    def __str__(self):
+        return self.reference_fa
+
+
 class Root(models.Model):
     root_code = models.CharField(max_length=50, verbose_name='کد ریشه')
     root_arabic = models.CharField(max_length=50, verbose_name='ریشه عربی')
@@ -177,6 +224,9 @@ class Tafseer(models.Model):
     class Meta:
         verbose_name = 'تفسیر'
         verbose_name_plural = 'تفاسیر'
+        indexes = [
+            models.Index(fields=['surah', 'translator', 'from_aya', 'to_aya']),
+        ]
 
 class TranslationAudio(models.Model):
     custom_id = models.IntegerField(verbose_name='شناسه صوت')
@@ -188,6 +238,9 @@ class TranslationAudio(models.Model):
     class Meta:
         verbose_name = 'فایل صوتی ترجمه'
         verbose_name_plural = 'فایل‌های صوتی ترجمه'
+        indexes = [
+            models.Index(fields=['surah', 'translator', 'from_aya', 'to_aya']),
+        ]
 
 
 
@@ -263,6 +316,9 @@ class TafseerAudio(models.Model):
     class Meta:
         verbose_name = 'فایل صوتی تفسیر'
         verbose_name_plural = 'فایل‌های صوتی تفسیر'
+        indexes = [
+            models.Index(fields=['surah', 'translator', 'from_aya', 'to_aya']),
+        ]
 
     def __str__(self):
         return f'{self.translator.name} - سوره {self.surah.name} ({self.from_aya} تا {self.to_aya})'
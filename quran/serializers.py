@@ -565,6 +565,16 @@ class TranslatorSerializer(serializers.ModelSerializer):
         model = Translator
         fields = '__all__'
 
+class TranslatorCatalogSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    language = serializers.CharField()
+    translation_type = serializers.CharField()
+    verse_count = serializers.IntegerField()
+    surah_coverage = serializers.CharField()
+    text_size = serializers.IntegerField()
+    last_imported_at = serializers.DateTimeField(allow_null=True)
+
 class WordMeaningSerializer(serializers.ModelSerializer):
     class Meta:
         model = WordMeaning
@@ -575,6 +585,13 @@ class TafseerSerializer(serializers.ModelSerializer):
         model = Tafseer
         fields = '__all__'
 
+class WordGlossSerializer(serializers.Serializer):
+    word_id = serializers.IntegerField(read_only=True)
+    verse_id = serializers.IntegerField(read_only=True)
+    word_number = serializers.IntegerField(read_only=True)
+    gloss = serializers.CharField(read_only=True, allow_null=True)
+    root_id = serializers.IntegerField(read_only=True, allow_null=True)
+
 class TranslationAudioSerializer(serializers.ModelSerializer):
     class Meta:
         model = TranslationAudio
@@ -0,0 +1,342 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models, transaction
+
+from exam.choices import DistractorKind
+from exam.services.corpus_generation import invalidate_corpus_caches
+from exam.services.distractor_index import TRANSLATOR_ID, build_distractor_index
+from quran.models import (
+    Verse,
+    VerseText,
+    Word,
+    VerseTranslation,
+    WordMeaning,
+    Tafseer,
+    TranslationAudio,
+    TafseerAudio,
+    SearchTable,
+)
+from quran.services.interval_index import aya_range_index
+from quran.services.translator_catalog import refresh_coverage
+from quran.services.verse_strings import rebuild_verse_strings
+from quran.services.word_gloss import rebuild_word_glosses
+
+IMPORT_TARGETS = {
+    'verse_text': VerseText,
+    'verse': Verse,
+    'word': Word,
+    'verse_translation': VerseTranslation,
+    'word_meaning': WordMeaning,
+    'tafseer': Tafseer,
+    'translation_audio': TranslationAudio,
+    'tafseer_audio': TafseerAudio,
+    'search_table': SearchTable,
+}
+
+# targets whose rows feed the ``search_table`` materialized view and the cached page layouts
+TEXT_TARGETS = {VerseText, Verse, Word, SearchTable}
+RANGE_TARGETS = {Tafseer, TranslationAudio, TafseerAudio}
+# targets the question generators of exam read, directly or through the distractor index
+CORPUS_TARGETS = TEXT_TARGETS | {VerseTranslation}
+
+# ``cache_page`` key prefixes of the quran endpoints that render page layouts
+PAGE_CACHE_PREFIXES = ('cache1', 'word_gloss', 'qari_list')
+
+
+def iter_records(path: str, file_format: Optional[str] = None) -> Iterator[dict]:
+    """
+    Streams dict records out of a CSV, JSON-lines or JSON file.
+
+    CSV and JSON lines are read row by row; a plain JSON file must hold a list
+    of objects (or ``{"results": [...]}``) and is loaded at once.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        elif file_format in ('jsonl', 'ndjson'):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        elif file_format == 'json':
+            data = json.load(source)
+            if isinstance(data, dict):
+                data = data.get('results', [])
+            yield from data
+        else:
+            raise ValueError(f'Unsupported import format: {file_format!r}')
+
+
+class RecordCoercer:
+    """Maps loosely named source records onto concrete column values of ``model``."""
+
+    def __init__(self, model, defaults: Optional[Dict[str, object]] = None):
+        self.model = model
+        self.defaults = defaults or {}
+        self.fields = {}
+        for field in model._meta.concrete_fields:
+            self.fields[field.name] = field
+            self.fields[field.attname] = field
+
+    def coerce(self, record: dict) -> Dict[str, object]:
+        values = {}
+        for key, value in record.items():
+            field = self.fields.get(key)
+            if field is None:
+                continue
+            values[field.attname] = self._value(field, value)
+        for attname, value in self.defaults.items():
+            values.setdefault(attname, value)
+        return values
+
+    def _value(self, field, value):
+        if value == '' and (field.null or not isinstance(field, (models.CharField, models.TextField))):
+            return None
+        if isinstance(field, models.JSONField) and isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
+
+
+def _copy_text(field, value) -> str:
+    """One column in the tab separated text format shared by PostgreSQL COPY and MySQL LOAD DATA."""
+    if value is None:
+        return r'\N'
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, bool):
+        value = '1' if value else '0'
+    value = str(value)
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def native_load_available() -> bool:
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'mysql':
+        options = settings.DATABASES[connection.alias].get('OPTIONS', {})
+        return bool(options.get('local_infile'))
+    return False
+
+
+class BulkLoader:
+    """
+    Writes coerced rows of one model in batches of ``batch_size``.
+
+    ``native`` uses ``COPY ... FROM STDIN`` on PostgreSQL and
+    ``LOAD DATA LOCAL INFILE`` on MySQL (needs ``local_infile`` in the database
+    OPTIONS); otherwise rows go through ``bulk_create``.
+    """
+
+    def __init__(self, model, batch_size: int = 5000, native: bool = False):
+        self.model = model
+        self.batch_size = batch_size
+        self.native = native
+        self.loaded = 0
+        self._batch: List[dict] = []
+
+    def add(self, values: dict) -> None:
+        self._batch.append(values)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        if self.native:
+            self._native_write(self._batch)
+        else:
+            self.model.objects.bulk_create([self.model(**values) for values in self._batch],
+                                           batch_size=self.batch_size)
+        self.loaded += len(self._batch)
+        self._batch = []
+
+    def _native_write(self, batch: List[dict]) -> None:
+        # records may carry different keys; the batch loads the union, and a record without a
+        # column gets the field default, as ``bulk_create`` would give it
+        column_names = list(dict.fromkeys(name for values in batch for name in values))
+        fields = {field.attname: field for field in self.model._meta.concrete_fields}
+        buffer = io.StringIO()
+        for values in batch:
+            buffer.write('\t'.join(
+                _copy_text(fields[c], values[c] if c in values else fields[c].get_default())
+                for c in column_names))
+            buffer.write('\n')
+
+        table = self.model._meta.db_table
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(fields[c].column) for c in column_names)
+        if connection.vendor == 'postgresql':
+            self._copy(f'COPY {quote(table)} ({columns}) FROM STDIN', buffer.getvalue())
+        else:
+            self._load_data(table, columns, buffer.getvalue())
+
+    def _copy(self, sql: str, data: str) -> None:
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                raw.copy_expert(sql, io.StringIO(data))
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(data)
+
+    def _load_data(self, table: str, columns: str, data: str) -> None:
+        handle, path = tempfile.mkstemp(suffix='.tsv')
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8', newline='') as tmp:
+                tmp.write(data)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {connection.ops.quote_name(table)} "
+                    f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                    f"LINES TERMINATED BY '\\n' ({columns})",
+                    [path],
+                )
+        finally:
+            os.unlink(path)
+
+
+def drop_secondary_indexes(model) -> list:
+    """Removes the ``Meta.indexes`` of ``model`` and returns them so they can be re-created."""
+    indexes = list(model._meta.indexes)
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(model, index)
+    return indexes
+
+
+def restore_secondary_indexes(model, indexes: Iterable) -> None:
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.add_index(model, index)
+
+
+def refresh_search_table() -> bool:
+    """Refreshes the ``search_table`` materialized view where the backend has one."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('REFRESH MATERIALIZED VIEW search_table')
+    return True
+
+
+def invalidate_page_caches() -> bool:
+    """
+    Deletes the cached page layouts. Only django-redis can find them by prefix;
+    other backends keep them until they expire, as the cache also holds locks,
+    answer keys and idempotency records that must survive an import.
+    """
+    if not hasattr(cache, 'delete_pattern'):
+        return False
+    for prefix in PAGE_CACHE_PREFIXES:
+        cache.delete_pattern(f'*cache_page.{prefix}.*')
+        cache.delete_pattern(f'*cache_header.{prefix}.*')
+    return True
+
+
+def rebuild_derived(model, translator_ids=None, stale=None) -> List[str]:
+    """
+    Rebuilds what is derived from ``model`` after a load: word glosses,
+    translator coverage and catalog, interval trees, the ``search_table`` view,
+    verse strings, the distractor index, the question generators' process
+    caches and cached page layouts. Runs inside one transaction.
+    What could not be rebuilt on this backend is appended to ``stale``.
+    """
+    rebuilt = []
+    stale = stale if stale is not None else []
+    with transaction.atomic():
+        if model is WordMeaning:
+            rebuild_word_glosses(translator_ids=translator_ids)
+            rebuilt.append('word glosses')
+        if 'translator' in {f.name for f in model._meta.concrete_fields}:
+            refresh_coverage(translator_ids=translator_ids)
+            rebuilt.append('translator coverage')
+        if model in TEXT_TARGETS:
+            if refresh_search_table():
+                rebuilt.append('search_table')
+            elif model is not SearchTable:
+                # a plain table outside PostgreSQL: it only changes when it is imported itself
+                stale.append('search_table')
+        if model in (Verse, Word):
+            rebuild_verse_strings()
+            rebuilt.append('verse strings')
+        if model is VerseTranslation:
+            if translator_ids is None or TRANSLATOR_ID in translator_ids:
+                build_distractor_index(kinds=[DistractorKind.TRANSLATION])
+                rebuilt.append('distractor index')
+        elif model in CORPUS_TARGETS:
+            build_distractor_index()
+            rebuilt.append('distractor index')
+    if model in CORPUS_TARGETS:
+        invalidate_corpus_caches()
+        rebuilt.append('question generator caches')
+    if model in RANGE_TARGETS:
+        aya_range_index.invalidate(model)
+        rebuilt.append('aya range index')
+    if invalidate_page_caches():
+        rebuilt.append('page caches')
+    else:
+        stale.append('page caches')
+    return rebuilt
+
+
+def delete_existing(queryset) -> None:
+    """
+    Deletes the rows an import replaces. Rows nothing refers to go in one
+    statement without per-row signals, as ``rebuild_derived`` rebuilds what
+    the receivers would; rows other tables cascade from take the regular path.
+    """
+    if any(relation.on_delete is not models.DO_NOTHING for relation in queryset.model._meta.related_objects):
+        queryset.delete()
+    else:
+        queryset._raw_delete(queryset.db)
+
+
+def import_records(model, records: Iterable[dict], batch_size: int = 5000, method: str = 'auto',
+                   translator_id: Optional[int] = None, replace: bool = False,
+                   rebuild_indexes: bool = True, rebuild: bool = True) -> Dict[str, object]:
+    """
+    Loads ``records`` into ``model`` and rebuilds derived data.
+
+    ``method`` is ``auto`` (native bulk load when the backend supports it),
+    ``native`` or ``bulk``. With ``replace`` the existing rows (of
+    ``translator_id`` if given) are deleted first. Secondary indexes are dropped
+    for the load and re-created afterwards when ``rebuild_indexes`` is set.
+    """
+    if method == 'native' and connection.vendor not in ('postgresql', 'mysql'):
+        raise ValueError(f'Native bulk load is not available on {connection.vendor}.')
+    native = method == 'native' or (method == 'auto' and native_load_available())
+    defaults = {'translator_id': translator_id} if translator_id is not None else {}
+    coercer = RecordCoercer(model, defaults)
+    loader = BulkLoader(model, batch_size=batch_size, native=native)
+
+    dropped = drop_secondary_indexes(model) if rebuild_indexes else []
+    try:
+        with transaction.atomic():
+            if replace:
+                existing = model.objects.all()
+                if translator_id is not None:
+                    existing = existing.filter(translator_id=translator_id)
+                delete_existing(existing)
+            for record in records:
+                loader.add(coercer.coerce(record))
+            loader.flush()
+    finally:
+        if dropped:
+            restore_secondary_indexes(model, dropped)
+
+    translator_ids = [translator_id] if translator_id is not None else None
+    stale = []
+    rebuilt = rebuild_derived(model, translator_ids, stale) if rebuild else []
+    return {'loaded': loader.loaded, 'native': native, 'indexes': len(dropped), 'rebuilt': rebuilt,
+            'stale': stale}
@@ -0,0 +1,147 @@
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+# shared generation of the trees of a model, moved on every change so all processes reload them
+GENERATION_KEY = 'quran:aya_range_index:generation:{label}'
+
+
+class IntervalTree:
+    """
+    Static augmented interval tree over closed integer intervals.
+
+    Intervals are kept sorted by their start and laid out as an implicit
+    balanced binary tree (the middle of every slice is the node), with the
+    maximum end of each subtree stored next to it. Overlap queries run in
+    O(log n + k).
+    """
+
+    __slots__ = ('starts', 'ends', 'payloads', 'max_ends')
+
+    def __init__(self, intervals: Iterable[Tuple[int, int, Any]]):
+        ordered = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self.starts = [item[0] for item in ordered]
+        self.ends = [item[1] for item in ordered]
+        self.payloads = [item[2] for item in ordered]
+        self.max_ends = [0] * len(ordered)
+        self._build(0, len(ordered))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        max_end = self.ends[mid]
+        max_end = max(max_end, self._build(lo, mid), self._build(mid + 1, hi))
+        self.max_ends[mid] = max_end
+        return max_end
+
+    def overlapping(self, start: int, end: int) -> List[Any]:
+        """Payloads of every interval intersecting ``[start, end]``, ordered by interval start."""
+        if start > end:
+            start, end = end, start
+        result: List[Any] = []
+        self._collect(0, len(self.starts), start, end, result)
+        return result
+
+    def covering(self, point: int) -> List[Any]:
+        return self.overlapping(point, point)
+
+    def _collect(self, lo: int, hi: int, start: int, end: int, result: List[Any]) -> None:
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self.max_ends[mid] < start:
+            return
+        self._collect(lo, mid, start, end, result)
+        if self.starts[mid] > end:
+            # everything to the right starts even later
+            return
+        if self.ends[mid] >= start:
+            result.append(self.payloads[mid])
+        self._collect(mid + 1, hi, start, end, result)
+
+
+class AyaRangeIndex:
+    """
+    Process-wide cache of interval trees for models with ``from_aya``/``to_aya``
+    ranges (``Tafseer``, ``TafseerAudio``, ``TranslationAudio``), one tree per
+    (model, translator, surah).
+
+    Trees are loaded lazily with a single query that is fully served by the
+    (surah, translator, from_aya, to_aya) index and expire after ``ttl`` seconds.
+    Every tree remembers the generation of its model in the shared cache and is
+    reloaded once that moves; saves and deletes (see ``quran.signals``) and the
+    corpus importer move it. Writes that bypass both, such as
+    ``queryset.update()``, must call ``invalidate`` themselves.
+    """
+
+    def __init__(self, ttl: int = 60 * 30):
+        self.ttl = ttl
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def _key(self, model, translator_id, surah_id):
+        return model._meta.label_lower, int(translator_id), int(surah_id)
+
+    def _generation(self, label):
+        return cache.get(GENERATION_KEY.format(label=label), 0)
+
+    def get_tree(self, model, translator_id, surah_id) -> IntervalTree:
+        key = self._key(model, translator_id, surah_id)
+        generation = self._generation(key[0])
+        cached = self._trees.get(key)
+        if cached and cached[0] > time.monotonic() and cached[1] == generation:
+            return cached[2]
+
+        rows = (
+            model.objects
+            .filter(surah_id=surah_id, translator_id=translator_id)
+            .values_list('from_aya', 'to_aya', 'id')
+        )
+        tree = IntervalTree(rows)
+        with self._lock:
+            self._trees[key] = (time.monotonic() + self.ttl, generation, tree)
+        return tree
+
+    def lookup(self, model, translator_id, surah_id, from_aya: int, to_aya: Optional[int] = None) -> List[int]:
+        """Ids of the segments covering any verse in ``from_aya..to_aya`` (a single verse if ``to_aya`` is omitted)."""
+        if to_aya is None:
+            to_aya = from_aya
+        return self.get_tree(model, translator_id, surah_id).overlapping(int(from_aya), int(to_aya))
+
+    def invalidate(self, model) -> None:
+        """Drops the trees of ``model`` in this process and, through the shared generation, in all others."""
+        label = model._meta.label_lower
+        generation_key = GENERATION_KEY.format(label=label)
+        if not cache.add(generation_key, 1, None):
+            cache.incr(generation_key)
+        with self._lock:
+            for key in [k for k in self._trees if k[0] == label]:
+                del self._trees[key]
+
+
+aya_range_index = AyaRangeIndex()
+
+
+def filter_by_aya_range(queryset: QuerySet, surah_id, from_aya, to_aya=None, translator_id=None) -> QuerySet:
+    """
+    Restrict ``queryset`` to segments overlapping ``from_aya..to_aya`` of a surah.
+
+    With a translator the ids come from the in-memory interval tree; otherwise
+    the overlap condition is pushed down to the composite index.
+    """
+    if to_aya is None:
+        to_aya = from_aya
+    from_aya, to_aya = sorted((int(from_aya), int(to_aya)))
+
+    if translator_id is not None:
+        ids = aya_range_index.lookup(queryset.model, translator_id, surah_id, from_aya, to_aya)
+        return queryset.filter(id__in=ids)
+
+    return queryset.filter(surah_id=surah_id, from_aya__lte=to_aya, to_aya__gte=from_aya)
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.utils.timezone import now
+
+from quran.models import (
+    Translator,
+    TranslatorCoverage,
+    VerseTranslation,
+    WordMeaning,
+    WordGloss,
+    Tafseer,
+    TranslationAudio,
+    TafseerAudio,
+)
+
+CATALOG_CACHE_KEY = 'quran:translator_catalog'
+COVERAGE_PENDING_KEY = 'quran:translator_coverage:pending:{translator_id}'
+PENDING_TIMEOUT = 60 * 10
+SURAH_COUNT = 114
+
+# translation_type -> (source model, text column used for ``text_size`` or None)
+VERSE_SOURCES = {
+    'verse': (VerseTranslation, 'text'),
+    'word': (WordMeaning, None),
+}
+RANGE_SOURCES = {
+    'tafseer': (Tafseer, 'text'),
+    'audio': (TranslationAudio, None),
+    'audioTafseer': (TafseerAudio, None),
+}
+
+
+def _bitmap(surah_ids: Iterable[Optional[int]]) -> str:
+    bits = ['0'] * SURAH_COUNT
+    for surah_id in surah_ids:
+        if surah_id and 1 <= surah_id <= SURAH_COUNT:
+            bits[surah_id - 1] = '1'
+    return ''.join(bits)
+
+
+def _text_size(queryset, column: str) -> int:
+    return queryset.aggregate(size=Sum(Length(column)))['size'] or 0
+
+
+def _merged_length(ranges: List[Tuple[int, int]]) -> int:
+    """Number of distinct verses covered by possibly overlapping ``(from_aya, to_aya)`` ranges."""
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted((min(a, b), max(a, b)) for a, b in ranges):
+        if current_end is None or start > current_end + 1:
+            if current_end is not None:
+                total += current_end - current_start + 1
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start + 1
+    return total
+
+
+def compute_coverage(translator: Translator) -> Dict[str, object]:
+    """Coverage statistics of one translator read from its source table."""
+    translation_type = translator.translation_type
+
+    if translation_type in VERSE_SOURCES:
+        model, text_column = VERSE_SOURCES[translation_type]
+        rows = model.objects.filter(translator_id=translator.id)
+        verse_count = rows.values('verse_id').distinct().count()
+        surah_ids = rows.values_list('surah_id', flat=True).distinct()
+        if text_column:
+            text_size = _text_size(rows, text_column)
+        else:
+            text_size = _text_size(WordGloss.objects.filter(translator_id=translator.id), 'gloss')
+        return {'verse_count': verse_count, 'surah_coverage': _bitmap(surah_ids), 'text_size': text_size}
+
+    if translation_type in RANGE_SOURCES:
+        model, text_column = RANGE_SOURCES[translation_type]
+        rows = model.objects.filter(translator_id=translator.id)
+        ranges = defaultdict(list)
+        for surah_id, from_aya, to_aya in rows.values_list('surah_id', 'from_aya', 'to_aya').iterator(chunk_size=2000):
+            ranges[surah_id].append((from_aya, to_aya))
+        verse_count = sum(_merged_length(surah_ranges) for surah_ranges in ranges.values())
+        text_size = _text_size(rows, text_column) if text_column else 0
+        return {'verse_count': verse_count, 'surah_coverage': _bitmap(ranges), 'text_size': text_size}
+
+    return {'verse_count': 0, 'surah_coverage': _bitmap(()), 'text_size': 0}
+
+
+def refresh_coverage(translator_ids=None, imported: bool = True) -> int:
+    """
+    Recomputes ``TranslatorCoverage`` for the given translators (all of them by default)
+    and rebuilds the cached catalog. Meant to run right after an import; ``imported``
+    stamps ``last_imported_at``.
+    """
+    translators = Translator.objects.all()
+    if translator_ids:
+        translators = translators.filter(id__in=translator_ids)
+
+    stamp = now()
+    refreshed = 0
+    for translator in translators:
+        values = compute_coverage(translator)
+        if imported:
+            values['last_imported_at'] = stamp
+        with transaction.atomic():
+            TranslatorCoverage.objects.update_or_create(translator=translator, defaults=values)
+        refreshed += 1
+
+    invalidate_catalog()
+    build_catalog()
+    return refreshed
+
+
+def schedule_coverage_refresh(translator_id) -> None:
+    """
+    Recomputes the coverage of a translator in a celery task once the
+    transaction commits. Edits committed before the task starts share a single run.
+    """
+    from quran.tasks import refresh_translator_coverage
+
+    def enqueue():
+        if cache.add(COVERAGE_PENDING_KEY.format(translator_id=translator_id), 1, PENDING_TIMEOUT):
+            refresh_translator_coverage.delay([translator_id], imported=False)
+
+    transaction.on_commit(enqueue)
+
+
+def clear_coverage_pending(translator_ids) -> None:
+    """Called as the task starts, so edits committed from here on schedule another run."""
+    cache.delete_many([COVERAGE_PENDING_KEY.format(translator_id=translator_id) for translator_id in translator_ids])
+
+
+def build_catalog() -> List[dict]:
+    """Catalog rows read from ``Translator`` and ``TranslatorCoverage`` only, stored in the cache."""
+    catalog = []
+    for translator in Translator.objects.select_related('coverage').order_by('id'):
+        coverage = getattr(translator, 'coverage', None)
+        catalog.append({
+            'id': translator.id,
+            'name': translator.name,
+            'language': translator.language,
+            'translation_type': translator.translation_type,
+            'verse_count': coverage.verse_count if coverage else 0,
+            'surah_coverage': coverage.surah_coverage if coverage else _bitmap(()),
+            'text_size': coverage.text_size if coverage else 0,
+            'last_imported_at': coverage.last_imported_at if coverage else None,
+        })
+    cache.set(CATALOG_CACHE_KEY, catalog, timeout=None)
+    return catalog
+
+
+def get_catalog() -> List[dict]:
+    catalog = cache.get(CATALOG_CACHE_KEY)
+    if catalog is None:
+        catalog = build_catalog()
+    return catalog
+
+
+def invalidate_catalog() -> None:
+    cache.delete(CATALOG_CACHE_KEY)
@@ -0,0 +1,97 @@
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+
+from quran.models import Verse, VerseString, Word
+
+VerseStrings = namedtuple('VerseStrings', ['text', 'signature', 'reference_fa', 'reference_ar'])
+
+
+def make_verse_strings(words, surah_name, verse_number) -> VerseStrings:
+    """
+    Strings the question generators show for a verse: its type 1 words joined
+    with spaces, the first two words (ordering questions), and the reference
+    label with Persian (``آیه``) and Arabic (``آيه``) spelling.
+    """
+    return VerseStrings(
+        text=' '.join(words),
+        signature=' '.join(words[:2]),
+        reference_fa=f'آیه {verse_number} سوره {surah_name}',
+        reference_ar=f'سوره {surah_name} آيه {verse_number}',
+    )
+
+
+def _words_by_verse(word_model, verse_ids=None):
+    words = word_model.objects.filter(type=1, verse__isnull=False)
+    if verse_ids is not None:
+        words = words.filter(verse_id__in=verse_ids)
+    by_verse = defaultdict(list)
+    rows = words.order_by('verse_id', 'word_number').values_list('verse_id', 'arabic_text')
+    for verse_id, arabic in rows.iterator(chunk_size=5000):
+        by_verse[verse_id].append(arabic)
+    return by_verse
+
+
+def compute_verse_strings(verse_ids, verse_model=Verse, word_model=Word):
+    """``verse_id -> VerseStrings`` computed from ``Word`` rows, without reading the table."""
+    verse_ids = list(verse_ids)
+    words = _words_by_verse(word_model, verse_ids)
+    return {
+        verse_id: make_verse_strings(words.get(verse_id, []), surah_name, verse_number)
+        for verse_id, surah_name, verse_number in (verse_model.objects.filter(id__in=verse_ids)
+                                                   .values_list('id', 'surah__name', 'verse_number'))
+    }
+
+
+def populate_verse_strings(verse_model, word_model, verse_string_model, verse_ids=None, batch_size=2000) -> int:
+    """Rebuilds ``VerseString`` rows (all, or of ``verse_ids``); usable with historical models in migrations."""
+    existing = verse_string_model.objects.all()
+    verses = verse_model.objects.order_by('id')
+    if verse_ids is not None:
+        verse_ids = list(verse_ids)
+        existing = existing.filter(verse_id__in=verse_ids)
+        verses = verses.filter(id__in=verse_ids)
+    existing.delete()
+
+    words = _words_by_verse(word_model, verse_ids)
+    rows = (
+        verse_string_model(verse_id=verse_id, **make_verse_strings(words.get(verse_id, []), surah_name,
+                                                                   verse_number)._asdict())
+        for verse_id, surah_name, verse_number in verses.values_list('id', 'surah__name', 'verse_number')
+    )
+    created = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            verse_string_model.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+            batch = []
+    if batch:
+        verse_string_model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+def rebuild_verse_strings(verse_ids=None, batch_size=2000) -> int:
+    with transaction.atomic():
+        return populate_verse_strings(Verse, Word, VerseString, verse_ids, batch_size)
+
+
+def get_verse_strings(verse_ids):
+    """
+    ``verse_id -> VerseStrings`` read from the table in one query. Verses the
+    table does not cover yet are computed from their words.
+    """
+    verse_ids = set(verse_ids)
+    if not verse_ids:
+        return {}
+    strings = {
+        verse_id: VerseStrings(*values)
+        for verse_id, *values in (VerseString.objects.filter(verse_id__in=verse_ids)
+                                  .values_list('verse_id', *VerseStrings._fields))
+    }
+    missing = verse_ids - strings.keys()
+    if missing:
+        strings.update(compute_verse_strings(missing))
+    return strings
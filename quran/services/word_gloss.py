@@ -0,0 +1,185 @@
+import json
+from collections import defaultdict
+from typing import Any, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+
+from quran.models import Word, WordMeaning, WordGloss
+
+GLOSS_KEYS = ('gloss', 'meaning', 'translation', 'text', 'fa', 'persian', 'en', 'english')
+WORD_NUMBER_KEYS = ('word_number', 'number', 'index', 'position')
+
+Gloss = Tuple[Optional[int], str, Optional[int]]
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _gloss_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, dict):
+        for key in GLOSS_KEYS:
+            text = _gloss_text(value.get(key))
+            if text:
+                return text
+        return None
+    if isinstance(value, (list, tuple)):
+        parts = [text for text in (_gloss_text(v) for v in value) if text]
+        return '، '.join(parts) or None
+    return str(value)
+
+
+def _gloss_from_item(item: Any, default_number: Optional[int]) -> Optional[Gloss]:
+    text = _gloss_text(item)
+    if not text:
+        return None
+    if isinstance(item, dict):
+        number = next((_to_int(item[k]) for k in WORD_NUMBER_KEYS if k in item), None)
+        return (number if number is not None else default_number), text, _to_int(item.get('root_id'))
+    return default_number, text, None
+
+
+def extract_glosses(meanings: Any) -> List[Gloss]:
+    """
+    Normalises a ``WordMeaning.meanings`` value into ``(word_number, gloss, root_id)`` tuples.
+
+    Accepted shapes: a list of strings or objects (position gives the word number
+    unless the object carries one), an object keyed by word number, a single
+    gloss object, or any of those serialised as a JSON string. ``word_number`` is
+    ``None`` when the value holds one gloss without a position.
+    """
+    if isinstance(meanings, str):
+        try:
+            meanings = json.loads(meanings)
+        except ValueError:
+            return [(None, meanings.strip(), None)] if meanings.strip() else []
+
+    if isinstance(meanings, (list, tuple)):
+        glosses = [_gloss_from_item(item, position) for position, item in enumerate(meanings, start=1)]
+        return [g for g in glosses if g]
+
+    if isinstance(meanings, dict):
+        if meanings and all(_to_int(key) is not None for key in meanings):
+            glosses = [_gloss_from_item(value, _to_int(key)) for key, value in meanings.items()]
+            return [g for g in glosses if g]
+        gloss = _gloss_from_item(meanings, None)
+        return [gloss] if gloss else []
+
+    return []
+
+
+def iter_word_glosses(word_meaning_model, translator_ids=None, verse_ids=None) -> Iterator[dict]:
+    """
+    Streams normalised gloss rows out of the ``WordMeaning`` table.
+
+    Rows that hold a single gloss without a position (one row per word) are
+    numbered by their order within the (translator, verse) pair.
+    """
+    queryset = word_meaning_model.objects.order_by('translator_id', 'verse_id', 'id')
+    if translator_ids:
+        queryset = queryset.filter(translator_id__in=translator_ids)
+    if verse_ids:
+        queryset = queryset.filter(verse_id__in=verse_ids)
+
+    next_number = defaultdict(lambda: 1)
+    seen = set()
+    rows = queryset.values_list('translator_id', 'verse_id', 'meanings', 'root_id')
+    for translator_id, verse_id, meanings, row_root_id in rows.iterator(chunk_size=2000):
+        glosses = extract_glosses(meanings)
+        for word_number, gloss, root_id in glosses:
+            pair = (translator_id, verse_id)
+            if word_number is None:
+                word_number = next_number[pair]
+            next_number[pair] = max(next_number[pair], word_number + 1)
+
+            key = (translator_id, verse_id, word_number)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if root_id is None and len(glosses) == 1:
+                root_id = row_root_id
+            yield {
+                'translator_id': translator_id,
+                'verse_id': verse_id,
+                'word_number': word_number,
+                'gloss': gloss,
+                'root_id': root_id,
+            }
+
+
+def populate_word_glosses(word_meaning_model, word_gloss_model, translator_ids=None, batch_size=2000,
+                          verse_ids=None) -> int:
+    """Rebuilds ``WordGloss`` rows from ``WordMeaning``, optionally limited to some translators and verses."""
+    existing = word_gloss_model.objects.all()
+    if translator_ids:
+        existing = existing.filter(translator_id__in=translator_ids)
+    if verse_ids:
+        existing = existing.filter(verse_id__in=verse_ids)
+    existing.delete()
+
+    created = 0
+    batch = []
+    for row in iter_word_glosses(word_meaning_model, translator_ids, verse_ids):
+        batch.append(word_gloss_model(**row))
+        if len(batch) >= batch_size:
+            word_gloss_model.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+            batch = []
+    if batch:
+        word_gloss_model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+def rebuild_word_glosses(translator_ids=None, batch_size=2000) -> int:
+    with transaction.atomic():
+        return populate_word_glosses(WordMeaning, WordGloss, translator_ids, batch_size)
+
+
+def rebuild_verse_glosses(translator_id, verse_id) -> int:
+    """Rebuilds the glosses of one verse of one translator, after its ``WordMeaning`` rows change."""
+    with transaction.atomic():
+        return populate_word_glosses(WordMeaning, WordGloss, [translator_id], verse_ids=[verse_id])
+
+
+def get_aligned_glosses(translator_id, page_number=None, verse_from=None, verse_to=None) -> List[dict]:
+    """
+    Glosses of a mushaf page or a verse-id range, aligned with ``Word`` rows by
+    (verse, word_number). Words without a gloss are returned with ``gloss=None``.
+    """
+    words = Word.objects.filter(type=1, verse__isnull=False)
+    if page_number is not None:
+        words = words.filter(page=page_number)
+    else:
+        words = words.filter(verse_id__gte=verse_from, verse_id__lte=verse_to)
+    words = list(words.order_by('verse_id', 'word_number').values_list('id', 'verse_id', 'word_number'))
+
+    verse_ids = {verse_id for _, verse_id, _ in words}
+    gloss_map = {
+        (verse_id, word_number): (gloss, root_id)
+        for verse_id, word_number, gloss, root_id in (
+            WordGloss.objects
+            .filter(translator_id=translator_id, verse_id__in=verse_ids)
+            .values_list('verse_id', 'word_number', 'gloss', 'root_id')
+        )
+    }
+
+    result = []
+    for word_id, verse_id, word_number in words:
+        gloss, root_id = gloss_map.get((verse_id, word_number), (None, None))
+        result.append({
+            'word_id': word_id,
+            'verse_id': verse_id,
+            'word_number': word_number,
+            'gloss': gloss,
+            'root_id': root_id,
+        })
+    return result
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from quran.models import Tafseer, TafseerAudio, TranslationAudio, Translator, TranslatorCoverage, Surah, Verse, \
+    Word, WordMeaning, VerseTranslation
+from quran.services.interval_index import aya_range_index
+from quran.services.translator_catalog import invalidate_catalog, schedule_coverage_refresh
+from quran.services.verse_strings import rebuild_verse_strings
+from quran.services.word_gloss import rebuild_verse_glosses
+
+
+@receiver([post_save, post_delete], sender=Tafseer)
+@receiver([post_save, post_delete], sender=TafseerAudio)
+@receiver([post_save, post_delete], sender=TranslationAudio)
+def invalidate_aya_range_index(sender, **kwargs):
+    # after the commit, so no process reloads the old rows under the new generation
+    transaction.on_commit(lambda: aya_range_index.invalidate(sender))
+
+
+@receiver([post_save, post_delete], sender=Translator)
+@receiver([post_save, post_delete], sender=TranslatorCoverage)
+def invalidate_translator_catalog(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver([post_save, post_delete], sender=VerseTranslation)
+@receiver([post_save, post_delete], sender=WordMeaning)
+@receiver([post_save, post_delete], sender=Tafseer)
+@receiver([post_save, post_delete], sender=TranslationAudio)
+@receiver([post_save, post_delete], sender=TafseerAudio)
+def refresh_translator_coverage(sender, instance, **kwargs):
+    # bulk loads skip this; import_corpus refreshes the coverage of what it loaded itself
+    if instance.translator_id:
+        schedule_coverage_refresh(instance.translator_id)
+
+
+@receiver(post_save, sender=Verse)
+def refresh_verse_strings(sender, instance, **kwargs):
+    rebuild_verse_strings([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Word)
+def refresh_word_verse_strings(sender, instance, **kwargs):
+    if instance.type == 1 and instance.verse_id:
+        rebuild_verse_strings([instance.verse_id])
+
+
+@receiver(post_save, sender=Surah)
+def refresh_surah_verse_strings(sender, instance, created, **kwargs):
+    if not created:
+        rebuild_verse_strings(Verse.objects.filter(surah=instance).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=WordMeaning)
+def refresh_word_glosses(sender, instance, **kwargs):
+    # bulk loads skip this; import_corpus rebuilds the glosses itself, build_word_glosses rebuilds them all
+    rebuild_verse_glosses(instance.translator_id, instance.verse_id)
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from quran.services.translator_catalog import refresh_coverage, clear_coverage_pending
+
+
+@shared_task
+def refresh_translator_coverage(translator_ids=None, imported=True):
+    if translator_ids:
+        clear_coverage_pending(translator_ids)
+    count = refresh_coverage(translator_ids=translator_ids, imported=imported)
+    return f"{count} translator coverages refreshed."
@@ -1 +1,237 @@
-# Create your tests here.
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from quran.models import Surah, VerseText, Verse, Translator, VerseTranslation, WordMeaning, Tafseer, Word, \
+    VerseString, WordGloss
+from quran.services.interval_index import AyaRangeIndex
+from quran.services.translator_catalog import refresh_coverage
+from quran.services.verse_strings import get_verse_strings
+from quran.services.word_gloss import extract_glosses, rebuild_word_glosses
+
+
+def explain(sql):
+    """Return the plan rows of ``sql`` as a list of strings for the current backend."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def full_table_temp_or_filesort(plan):
+    """Plan rows that sort or deduplicate a whole table through a temporary structure."""
+    if connection.vendor == 'sqlite':
+        details = [str(row.get('detail', '')) for row in plan]
+        uses_temp = [d for d in details if 'USE TEMP B-TREE' in d]
+        full_scans = [d for d in details if d.startswith('SCAN') and 'USING' not in d]
+        return uses_temp if uses_temp and full_scans else []
+
+    if connection.vendor == 'mysql':
+        return [
+            row for row in plan
+            if 'Using temporary' in str(row.get('Extra') or '')
+            or ('Using filesort' in str(row.get('Extra') or '') and row.get('type') == 'ALL')
+        ]
+
+    text = '\n'.join(str(value) for row in plan for value in row.values())
+    if ('Unique' in text or 'HashAggregate' in text) and 'Seq Scan' in text:
+        return [text]
+    return []
+
+
+class ListEndpointQueryPlanTests(APITestCase):
+    """
+    Captures the SQL issued by the translation/tafseer list endpoints and fails when
+    a DISTINCT or a full-table temporary/filesort plan comes back.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        surah = Surah.objects.create(name='الفاتحة', arabic_name='الفاتحة', english_name='Al-Fatiha',
+                                     english_meaning='The Opening')
+        verse_translator = Translator.objects.create(name='verse', translation_type='verse')
+        word_translator = Translator.objects.create(name='word', translation_type='word')
+        tafseer_translator = Translator.objects.create(name='tafseer', translation_type='tafseer')
+        cls.translators = {'verse': verse_translator, 'word': word_translator, 'tafseer': tafseer_translator}
+        cls.surah = surah
+
+        for number in range(1, 8):
+            text = VerseText.objects.create(plain='', semi_tashkeel='', simple_tashkeel='', full_tashkeel='',
+                                            persian_friendly='', fuzzy='')
+            verse = Verse.objects.create(text=text, verse_number=number, surah=surah, page_number=1,
+                                         section_number=1, juz=1)
+            VerseTranslation.objects.create(verse=verse, translator=verse_translator, surah=surah,
+                                            text=f'translation {number}')
+            WordMeaning.objects.create(verse=verse, translator=word_translator, surah=surah,
+                                       meanings=[f'meaning {number}'])
+        Tafseer.objects.create(translator=tafseer_translator, surah=surah, from_aya=1, to_aya=4, text='tafseer')
+        Tafseer.objects.create(translator=tafseer_translator, surah=surah, from_aya=5, to_aya=7, text='tafseer')
+
+    def get_endpoints(self):
+        surah_id = self.surah.id
+        return [
+            reverse('translator-list'),
+            reverse('translator-list') + '?translation_type=verse',
+            reverse('verse_translation-list'),
+            reverse('verse_translation-list') + f'?surah={surah_id}&translator={self.translators["verse"].id}',
+            reverse('word_meaning-list'),
+            reverse('word_meaning-list') + f'?surah={surah_id}&translator={self.translators["word"].id}',
+            reverse('tafseer-list'),
+            reverse('tafseer-list') + f'?surah={surah_id}&translator={self.translators["tafseer"].id}',
+        ]
+
+    def test_list_endpoints_avoid_distinct_and_temporary_sorts(self):
+        for url in self.get_endpoints():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+                selects = [q['sql'] for q in captured.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+                self.assertTrue(selects)
+                for sql in selects:
+                    self.assertNotIn('DISTINCT', sql.upper(), sql)
+                    plan = explain(sql)
+                    self.assertEqual(full_table_temp_or_filesort(plan), [], f'{sql}\n{plan}')
+
+
+class TranslatorCatalogTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.surah = Surah.objects.create(name='الفاتحة', arabic_name='الفاتحة', english_name='Al-Fatiha',
+                                         english_meaning='The Opening')
+        cls.verse_translator = Translator.objects.create(name='verse', translation_type='verse')
+        cls.tafseer_translator = Translator.objects.create(name='tafseer', translation_type='tafseer')
+        for number in range(1, 4):
+            text = VerseText.objects.create(plain='', semi_tashkeel='', simple_tashkeel='', full_tashkeel='',
+                                            persian_friendly='', fuzzy='')
+            verse = Verse.objects.create(text=text, verse_number=number, surah=cls.surah, page_number=1,
+                                         section_number=1, juz=1)
+            VerseTranslation.objects.create(verse=verse, translator=cls.verse_translator, surah=cls.surah,
+                                            text='abcd')
+        Tafseer.objects.create(translator=cls.tafseer_translator, surah=cls.surah, from_aya=1, to_aya=4, text='ab')
+        Tafseer.objects.create(translator=cls.tafseer_translator, surah=cls.surah, from_aya=3, to_aya=6, text='abc')
+
+    def test_catalog_is_served_from_precomputed_coverage(self):
+        refresh_coverage()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('translator-catalog'))
+        self.assertEqual(response.status_code, 200)
+        quran_queries = [q['sql'] for q in captured.captured_queries if '"quran_' in q['sql'] or '`quran_' in q['sql']]
+        self.assertEqual(quran_queries, [])
+
+        rows = {row['id']: row for row in response.data}
+        verse_row = rows[self.verse_translator.id]
+        self.assertEqual(verse_row['verse_count'], 3)
+        self.assertEqual(verse_row['text_size'], 12)
+        self.assertEqual(verse_row['surah_coverage'], '1' + '0' * 113)
+        self.assertIsNotNone(verse_row['last_imported_at'])
+
+        tafseer_row = rows[self.tafseer_translator.id]
+        self.assertEqual(tafseer_row['verse_count'], 6)
+        self.assertEqual(tafseer_row['text_size'], 5)
+
+
+class VerseStringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.surah = Surah.objects.create(name='بقره', arabic_name='x', english_name='x', english_meaning='x')
+        text = VerseText.objects.create(plain='', semi_tashkeel='', simple_tashkeel='', full_tashkeel='',
+                                        persian_friendly='', fuzzy='')
+        cls.verse = Verse.objects.create(text=text, verse_number=7, surah=cls.surah, page_number=1,
+                                         section_number=1, juz=1)
+        for number, arabic in enumerate(['a', 'b', 'c'], start=1):
+            Word.objects.create(arabic_text=arabic, word_number=number, verse=cls.verse, surah=cls.surah, type=1)
+
+    def test_strings_follow_word_changes(self):
+        strings = VerseString.objects.get(verse=self.verse)
+        self.assertEqual((strings.text, strings.signature), ('a b c', 'a b'))
+        self.assertEqual(strings.reference_fa, 'آیه 7 سوره بقره')
+        self.assertEqual(strings.reference_ar, 'سوره بقره آيه 7')
+
+        Word.objects.filter(verse=self.verse, word_number=3).get().delete()
+        self.assertEqual(VerseString.objects.get(verse=self.verse).text, 'a b')
+
+    def test_missing_rows_are_computed_from_words(self):
+        VerseString.objects.all().delete()
+        with CaptureQueriesContext(connection) as captured:
+            strings = get_verse_strings([self.verse.id])
+        self.assertEqual(len([q for q in captured.captured_queries if q['sql'].startswith('SELECT')]), 3)
+        self.assertEqual(strings[self.verse.id].text, 'a b c')
+
+
+class AyaRangeIndexTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.surah = Surah.objects.create(name='الفاتحة', arabic_name='الفاتحة', english_name='Al-Fatiha',
+                                         english_meaning='The Opening')
+        cls.translator = Translator.objects.create(name='tafseer', translation_type='tafseer')
+        cls.tafseer = Tafseer.objects.create(translator=cls.translator, surah=cls.surah, from_aya=1, to_aya=4,
+                                             text='ab')
+
+    def test_changes_reach_the_trees_of_other_processes(self):
+        # two indexes stand in for two worker processes sharing the cache
+        this_process, other_process = AyaRangeIndex(), AyaRangeIndex()
+        self.assertEqual(other_process.lookup(Tafseer, self.translator.id, self.surah.id, 5), [])
+
+        Tafseer.objects.filter(pk=self.tafseer.pk).update(to_aya=6)
+        this_process.invalidate(Tafseer)
+        self.assertEqual(other_process.lookup(Tafseer, self.translator.id, self.surah.id, 5), [self.tafseer.id])
+
+    def test_rejects_malformed_range_parameters(self):
+        response = self.client.get(reverse('tafseer-audio-list'), {'surah': 'one', 'aya_number': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('surah', response.data)
+
+        response = self.client.get(reverse('tafseer-list'), {'aya_from': 2})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('surah', response.data)
+
+
+class WordGlossTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.surah = Surah.objects.create(name='الفاتحة', arabic_name='الفاتحة', english_name='Al-Fatiha',
+                                         english_meaning='The Opening')
+        cls.translator = Translator.objects.create(name='word', translation_type='word')
+        text = VerseText.objects.create(plain='', semi_tashkeel='', simple_tashkeel='', full_tashkeel='',
+                                        persian_friendly='', fuzzy='')
+        cls.verse = Verse.objects.create(text=text, verse_number=1, surah=cls.surah, page_number=1,
+                                         section_number=1, juz=1)
+        for number in range(1, 4):
+            Word.objects.create(arabic_text=str(number), word_number=number, verse=cls.verse, surah=cls.surah,
+                                type=1, page=1)
+        cls.meaning = WordMeaning.objects.create(verse=cls.verse, translator=cls.translator, surah=cls.surah,
+                                                 meanings=['in the name', {'gloss': 'of god', 'root_id': 9}])
+
+    def test_meanings_shapes_are_normalised(self):
+        self.assertEqual(extract_glosses('{"3": "x", "1": {"meaning": "y"}}'), [(3, 'x', None), (1, 'y', None)])
+        self.assertEqual(extract_glosses({'word_number': 2, 'fa': 'z'}), [(2, 'z', None)])
+        self.assertEqual(extract_glosses(None), [])
+
+    def test_glosses_follow_word_meaning_edits(self):
+        glosses = WordGloss.objects.filter(verse=self.verse).order_by('word_number')
+        self.assertEqual([(g.word_number, g.gloss, g.root_id) for g in glosses],
+                         [(1, 'in the name', None), (2, 'of god', 9)])
+
+        self.meaning.meanings = ['in the name', 'of god', 'the merciful']
+        self.meaning.save()
+        self.assertEqual(WordGloss.objects.filter(verse=self.verse).count(), 3)
+
+        WordGloss.objects.all().delete()
+        self.assertEqual(rebuild_word_glosses(), 3)
+
+    def test_page_endpoint_aligns_glosses_with_words(self):
+        response = self.client.get(reverse('word_gloss-list'), {'translator': self.translator.id, 'page_number': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['word_number'], row['gloss']) for row in response.data],
+                         [(1, 'in the name'), (2, 'of god'), (3, None)])
+
+        response = self.client.get(reverse('word_gloss-list'), {'page_number': 1})
+        self.assertEqual(response.status_code, 400)
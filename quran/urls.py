@@ -40,6 +40,7 @@ router.register(prefix=r'qari', viewset=views.QariViewSet, basename='qari_list')
 router.register(prefix=r'translator', viewset=views.TranslatorViewSet, basename='translator')
 router.register(prefix=r'verse/translation', viewset=views.VerseTranslationViewSet, basename='verse_translation')
 router.register(prefix=r'word/meaning', viewset=views.WordMeaningViewSet, basename='word_meaning')
+router.register(prefix=r'word/gloss', viewset=views.WordGlossViewSet, basename='word_gloss')
 router.register(prefix=r'tafseer', viewset=views.TafseerViewSet, basename='tafseer')
 router.register(prefix=r'translation/audio', viewset=views.TranslationAudioViewSet, basename='translation_audio')
 router.register(r'tafseer-audio', views.TafseerAudioViewSet, basename='tafseer-audio')
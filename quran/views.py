@@ -1,4 +1,5 @@
 from typing import Any, List, Dict, Optional, Union
+from rest_framework.decorators import action
 from rest_framework import permissions, generics, viewsets, filters, status
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -37,6 +38,9 @@ from quran.filters import (
                     QariFilter,
                       TafseerAudioFilter
     )
+from quran.services.interval_index import filter_by_aya_range
+from quran.services.word_gloss import get_aligned_glosses
+from quran.services.translator_catalog import get_catalog
 from quran.paginations import StandardResultSetPagination, QuranResultPagination, SearchPagination
 from quran.serializers import (
     SurahFullSerializer,
@@ -57,7 +61,9 @@ from quran.serializers import (
                                   VerseTextSerializer,
                                     WordSerializer,
                                       SearchTableSerializer,
-                                        TafseerAudioSerializer
+                                        TafseerAudioSerializer,
+                                          WordGlossSerializer,
+                                            TranslatorCatalogSerializer
 )
 
 class SurahViewSet(viewsets.ReadOnlyModelViewSet):
@@ -347,7 +353,7 @@ class AudioCollectionViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class TranslatorViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Translator.objects.all().distinct().reverse()
+    queryset = Translator.objects.all()
     serializer_class = TranslatorSerializer
     permission_classes = [permissions.AllowAny]
     # pagination_class = StandardResultSetPagination
@@ -357,8 +363,24 @@ class TranslatorViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['id', 'name']
     ordering = ['id']
 
+    @action(detail=False, methods=['get'], url_path='catalog', pagination_class=None)
+    def catalog(self, request: Request) -> Response:
+        """
+        Every translator with its precomputed coverage (verse count, 114-char surah
+        bitmap, text size, last import). Served from the cache / ``TranslatorCoverage``
+        only; optional ``translation_type`` and ``language`` filters.
+        """
+        catalog = get_catalog()
+        translation_type = request.query_params.get('translation_type')
+        language = request.query_params.get('language')
+        if translation_type:
+            catalog = [row for row in catalog if row['translation_type'] == translation_type]
+        if language:
+            catalog = [row for row in catalog if row['language'] == language]
+        return Response(TranslatorCatalogSerializer(catalog, many=True).data)
+
 class VerseTranslationViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = VerseTranslation.objects.all().select_related('verse', 'surah', 'translator').distinct()
+    queryset = VerseTranslation.objects.all()
     serializer_class = VerseTranslationSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultSetPagination
@@ -369,7 +391,7 @@ class VerseTranslationViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['id']
 
 class WordMeaningViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = WordMeaning.objects.all().select_related('surah', 'verse', 'translator').distinct()
+    queryset = WordMeaning.objects.all()
     serializer_class = WordMeaningSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultSetPagination
@@ -379,8 +401,54 @@ class WordMeaningViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['id']
     ordering = ['id']
 
+class WordGlossViewSet(viewsets.GenericViewSet):
+    """
+    Per-word glosses of a mushaf page (``page_number``) or a verse-id range
+    (``verse_from``/``verse_to``) for one word translator, aligned with ``Word`` ids.
+
+    Usage example:
+        ?translator=2&page_number=3
+        ?translator=2&verse_from=8&verse_to=20
+    """
+    serializer_class = WordGlossSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    max_verse_range = 300
+
+    def _get_int_param(self, name: str) -> Optional[int]:
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+
+    @method_decorator(cache_page(60 * 60 * 2, key_prefix='word_gloss'))
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        translator_id = self._get_int_param('translator')
+        page_number = self._get_int_param('page_number')
+        verse_from = self._get_int_param('verse_from')
+        verse_to = self._get_int_param('verse_to')
+
+        if translator_id is None:
+            raise ValidationError({'translator': 'This parameter is required.'})
+
+        if page_number is None:
+            if verse_from is None:
+                raise ValidationError({'detail': 'Either page_number or verse_from/verse_to is required.'})
+            verse_to = verse_to if verse_to is not None else verse_from
+            if verse_to < verse_from:
+                raise ValidationError({'verse_to': 'verse_to must not be smaller than verse_from.'})
+            if verse_to - verse_from + 1 > self.max_verse_range:
+                raise ValidationError({'verse_to': f'At most {self.max_verse_range} verses can be requested at once.'})
+
+        glosses = get_aligned_glosses(translator_id, page_number=page_number, verse_from=verse_from, verse_to=verse_to)
+        serializer = self.get_serializer(glosses, many=True)
+        return Response(serializer.data)
+
 class TafseerViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Tafseer.objects.all().select_related('translator', 'surah').distinct()
+    queryset = Tafseer.objects.all()
     serializer_class = TafseerSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = StandardResultSetPagination
@@ -414,11 +482,22 @@ class TafseerAudioViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         queryset = TafseerAudio.objects.select_related('translator', 'surah').order_by('from_aya')
 
-        aya_number = self.request.query_params.get('aya_number')
-        surah_id = self.request.query_params.get('surah')
+        params = {}
+        for name in ('aya_number', 'surah', 'translator'):
+            value = self.request.query_params.get(name)
+            try:
+                params[name] = int(value) if value else None
+            except ValueError:
+                raise ValidationError({name: 'A valid integer is required.'})
+        aya_number, surah_id, translator_id = params['aya_number'], params['surah'], params['translator']
 
         if aya_number and surah_id:
-            queryset = queryset.filter(surah_id=surah_id, from_aya__lte=aya_number, to_aya__gte=aya_number)
+            queryset = filter_by_aya_range(
+                queryset,
+                surah_id=surah_id,
+                from_aya=aya_number,
+                translator_id=translator_id,
+            )
 
         return queryset
 